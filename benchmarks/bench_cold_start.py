@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Cold versus warm Ollama requests with and without model warm-up and residency.
+
+Runs a mock Ollama that takes --load-time seconds to load a model that is not
+loaded and unloads it after each request's keep_alive. A client sends
+--requests analyses with --gap idle seconds between them, longer than
+--keep-alive, which is how a quiet Dragon keeps landing on cold starts. The
+same traffic then runs with startup warm-up and the residency scheduler
+(which reloads frequently used models before they expire). Reports cold and
+warm request counts, their median latency and the loads the mock performed.
+
+    python benchmarks/bench_cold_start.py --load-time 2 --keep-alive 2s --gap 3 --requests 6
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import SAMPLE_CONFIG, load_variant, write_results
+from mock_servers import MockSettings, start_server
+
+
+def run_scenario(module, name, args, warm_up, resident_models):
+    settings = MockSettings(latency=args.latency, tokens=args.tokens, token_delay=0.0, load_time=args.load_time)
+    server = start_server(settings)
+    dragon_class = getattr(module, f"Dragon{SAMPLE_CONFIG['CLASS_SUFFIX']}")
+    dragon_class.OLLAMA_RESIDENCY_INTERVAL = max(args.gap / 2, 0.5)
+    dragon_class.OLLAMA_RESIDENT_MIN_SCORE = 0.5  # One recent request is enough to keep the model loaded
+    dragon = dragon_class(use_result_cache=False, discover_models=False, preprocessor=False, chunker=False,
+                          keep_alive=args.keep_alive, warm_up=False, resident_models=resident_models)
+    dragon.ollama_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        if warm_up:
+            dragon.warm_up()  # What a Dragon does in the background at startup, here once the mock URL is set
+        model = f"ollama:{SAMPLE_CONFIG['DEFAULT_MODEL']}"
+        latencies = []
+        for index in range(args.requests):
+            if index:
+                time.sleep(args.gap)
+            start = time.perf_counter()
+            dragon.analyze(os.urandom(1024), model, "Describe this input.")
+            latencies.append(time.perf_counter() - start)
+        stats = dragon.get_residency_stats()['models'].get(dragon._ollama_tag(model), {})
+    finally:
+        dragon.close()
+        server.shutdown()
+    return {
+        'scenario': name,
+        'requests': args.requests,
+        'cold_requests': stats.get('cold_requests'),
+        'warm_requests': stats.get('warm_requests'),
+        'cold_p50_ms': stats.get('cold_p50_ms'),
+        'warm_p50_ms': stats.get('warm_p50_ms'),
+        'first_request_ms': round(latencies[0] * 1000, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+        'mock_loads': settings.loads
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--load-time', type=float, default=2.0, help="Mock seconds to load a model")
+    parser.add_argument('--keep-alive', default="2s", help="Dragon keep_alive (stands in for Ollama's 5 minute default)")
+    parser.add_argument('--gap', type=float, default=3.0, help="Idle seconds between requests")
+    parser.add_argument('--requests', type=int, default=6)
+    parser.add_argument('--latency', type=float, default=0.1, help="Mock seconds to answer once the model is loaded")
+    parser.add_argument('--tokens', type=int, default=5)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    workdir = Path(tempfile.mkdtemp(prefix="dragon_bench_cold_"))
+    os.chdir(workdir)  # Logs land in the scratch directory
+    module = load_variant(workdir)
+    results = [
+        run_scenario(module, 'keep_alive only', args, warm_up=False, resident_models=0),
+        run_scenario(module, 'warm-up + residency', args, warm_up=True, resident_models=1)
+    ]
+    write_results({
+        'benchmark': 'cold_start',
+        'load_time_s': args.load_time,
+        'keep_alive': args.keep_alive,
+        'gap_s': args.gap,
+        'results': results
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
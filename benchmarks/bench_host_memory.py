@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Resident memory of several Dragon variants: one process each versus dragon_host.py.
+
+Renders four variants (image, audio, document and data, like the built-in
+Dragonsight, Dragonsong, DragonScript and DragonLab), starts each one alone
+under dragon_host.py, then all of them together, and reads every server's
+RSS once its pages have been served. The separate figure is the sum of the
+single-variant processes, which is what running the Dragons side by side costs.
+
+    python benchmarks/bench_host_memory.py
+"""
+
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from pathlib import Path
+
+from common import REPO_ROOT, render_variant, write_results
+
+VARIANTS = [
+    {'type': 'sight', 'TYPE': 'Sight', 'data_type': 'image', 'DATA_TYPE': 'Image', 'CLASS_SUFFIX': 'Eye'},
+    {'type': 'song', 'TYPE': 'Song', 'data_type': 'audio', 'DATA_TYPE': 'Audio', 'CLASS_SUFFIX': 'Ear'},
+    {'type': 'script', 'TYPE': 'Script', 'data_type': 'document', 'DATA_TYPE': 'Document', 'CLASS_SUFFIX': 'Reader'},
+    {'type': 'lab', 'TYPE': 'Lab', 'data_type': 'data', 'DATA_TYPE': 'Data', 'CLASS_SUFFIX': 'Analyst'},
+]
+
+
+def render_variants(output_dir):
+    """Render every variant under its own file name, returning the paths"""
+    paths = []
+    for variant in VARIANTS:
+        name = variant['type']
+        path = render_variant(output_dir, {**variant, 'instance': name, 'method_suffix': name, 'input_component': f"{name}_input"})
+        paths.append(path.rename(Path(output_dir) / f"dragon{name}_gradio.py"))
+    return paths
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    """Resident set size of a running process (Linux /proc, falling back to ps)"""
+    status = Path(f"/proc/{pid}/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    output = subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True).stdout
+    return round(int(output.strip()) / 1024, 1)
+
+
+def measure(paths, workdir, timeout, settle):
+    """Start dragon_host.py with the given variants, load each page once and return the server's RSS in MB"""
+    port = free_port()
+    server = subprocess.Popen([sys.executable, str(REPO_ROOT / 'dragon_host.py'), '--host', '127.0.0.1', '--port', str(port)]
+                              + [path.name for path in paths], cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + timeout
+        pages = ['/'] + [f"/{path.stem.removeprefix('dragon').removesuffix('_gradio')}/" for path in paths]
+        while True:
+            try:
+                for page in pages:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}{page}", timeout=5).read()
+                break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"dragon_host.py did not serve {', '.join(path.name for path in paths)}")
+                time.sleep(0.25)
+        time.sleep(settle)  # Let the background refreshers and pools settle
+        return rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--timeout', type=float, default=120.0, help="Seconds to wait for a server to come up")
+    parser.add_argument('--settle', type=float, default=2.0, help="Seconds to wait after the pages load before reading RSS")
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    workdir = Path(tempfile.mkdtemp(prefix="dragon_bench_host_"))
+    paths = render_variants(workdir)
+    
+    separate = {path.stem: measure([path], workdir, args.timeout, args.settle) for path in paths}
+    hosted = measure(paths, workdir, args.timeout, args.settle)
+    total = round(sum(separate.values()), 1)
+    write_results({
+        'benchmark': 'host_memory',
+        'variants': [path.stem for path in paths],
+        'separate_rss_mb': separate,
+        'separate_total_rss_mb': total,
+        'hosted_rss_mb': hosted,
+        'saved_mb': round(total - hosted, 1),
+        'hosted_fraction': round(hosted / total, 3) if total else None
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark input ingest: the old read/encode + re-read/md5 path against the
+single-pass chunked encode_file() (SHA-256 digest and base64 in one read).
+
+Each mode runs in a fresh subprocess so peak memory figures are independent.
+
+    python benchmarks/bench_ingest.py --size-mb 500
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+from common import load_variant, write_results
+
+
+def old_ingest(path):
+    """The previous implementation: encode from one full read, hash from a second"""
+    with open(path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('utf-8')
+    with open(path, 'rb') as f:
+        digest = hashlib.md5(f.read()).hexdigest()
+    return encoded, digest
+
+
+def run_mode(mode, path):
+    module = load_variant(tempfile.mkdtemp(prefix="dragon_bench_ingest_"))
+    ingest = old_ingest if mode == 'old' else module.encode_file
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    encoded, digest = ingest(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(json.dumps({
+        'mode': mode,
+        'seconds': round(elapsed, 3),
+        'peak_alloc_mb': round(peak / 1024 / 1024, 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'encoded_mb': round(len(encoded) / 1024 / 1024, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=500)
+    parser.add_argument('--file', help="Use an existing file instead of generating one")
+    parser.add_argument('--mode', choices=['old', 'new'], help=argparse.SUPPRESS)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    if args.mode:
+        run_mode(args.mode, args.file)
+        return
+    
+    path = args.file
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="dragon_bench_ingest_"), "input.bin")
+        with open(path, 'wb') as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+    
+    results = []
+    for mode in ('old', 'new'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode, '--file', path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    
+    if not args.file:
+        Path(path).unlink()
+    write_results({'benchmark': 'ingest', 'input_mb': round(os.path.getsize(path) / 1024 / 1024, 1) if args.file else args.size_mb,
+                   'results': results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
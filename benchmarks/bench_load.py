@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Load-test the Dragon request path against local mock Ollama/OpenAI servers.
+
+Starts benchmarks/mock_servers.py with the given latency, failure rate and
+streaming behaviour, then drives the rendered Dragon class at each
+concurrency level (closed loop: N clients each sending back-to-back
+requests for --duration seconds). Every level runs in a fresh process, so
+its peak RSS is independent of the others. Reports throughput, p50/p95/p99
+latency and peak RSS per level as JSON.
+
+Requests turned away by admission control count as rejected (the client
+waits --retry-after seconds, then tries again). Compare saturation with and
+without limits against a mock that only generates --capacity answers at once:
+
+    python benchmarks/bench_load.py --concurrency 1 4 16 64 --latency 0.5 --failure-rate 0.02 --stream
+    python benchmarks/bench_load.py --concurrency 64 256 --capacity 4 --max-concurrency 0 --provider-limit 0
+    python benchmarks/bench_load.py --concurrency 64 256 --capacity 4
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+from common import SAMPLE_CONFIG, load_variant, write_results
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+async def one_request(dragon, path, model, stream):
+    """Send one analysis, returning (outcome, latency seconds, time to first output or None)"""
+    start = time.perf_counter()
+    if not stream:
+        analysis = await dragon.aanalyze(path, model, "Describe this input.")
+        if analysis.get(SAMPLE_CONFIG['output_key']):
+            return 'ok', time.perf_counter() - start, None
+        return 'rejected' if analysis['error'] == dragon._busy_message() else 'failed', time.perf_counter() - start, None
+    first = None
+    output = ''
+    stream_analysis = getattr(dragon, f"aanalyze_{SAMPLE_CONFIG['type']}_stream")
+    async for output, _, _ in stream_analysis(path, model, "Describe this input."):
+        if first is None and output:
+            first = time.perf_counter() - start
+    if output == f"❌ {dragon._busy_message()}":
+        return 'rejected', time.perf_counter() - start, None
+    return 'ok' if output and not output.startswith('❌') else 'failed', time.perf_counter() - start, first
+
+
+async def drive(dragon, path, model, concurrency, duration, stream, retry_after):
+    latencies, first_outputs = [], []
+    outcomes = {'failed': 0, 'rejected': 0}
+    deadline = time.perf_counter() + duration
+    
+    async def client():
+        while time.perf_counter() < deadline:
+            outcome, latency, first = await one_request(dragon, path, model, stream)
+            if outcome == 'ok':
+                latencies.append(latency)
+                if first is not None:
+                    first_outputs.append(first)
+                continue
+            outcomes[outcome] += 1
+            if outcome == 'rejected':
+                await asyncio.sleep(retry_after)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies, first_outputs, outcomes, time.perf_counter() - start
+
+
+def run_level(args):
+    """One concurrency level in this (fresh) process; prints a JSON result line"""
+    workdir = Path(tempfile.mkdtemp(prefix="dragon_bench_load_"))
+    os.chdir(workdir)  # Logs and caches land in the scratch directory
+    os.environ.setdefault('OPENAI_API_KEY', 'mock')
+    module = load_variant(workdir, {'OPENAI_ENDPOINT': f"{args.url}/v1/chat/completions"})
+    # A limit of 0 turns that limit off, to measure the unprotected path
+    max_concurrency = args.max_concurrency or 1_000_000
+    provider_limit = {} if args.provider_limit is None else {'max_concurrency': args.provider_limit or None}
+    dragon = getattr(module, f"Dragon{SAMPLE_CONFIG['CLASS_SUFFIX']}")(
+        use_result_cache=False, discover_models=False, preprocessor=False, chunker=False,
+        max_concurrency=max_concurrency, max_queue=args.max_queue if args.max_concurrency else 0,
+        http_config={'ollama': provider_limit, 'openai': provider_limit}
+    )
+    dragon.ollama_url = args.url
+    
+    path = workdir / "input.bin"
+    path.write_bytes(os.urandom(args.payload_kb * 1024))
+    model = 'openai:gpt-4o' if args.provider == 'openai' else f"ollama:{SAMPLE_CONFIG['DEFAULT_MODEL']}"
+    
+    latencies, first_outputs, outcomes, elapsed = asyncio.run(
+        drive(dragon, str(path), model, args.worker, args.duration, args.stream, args.retry_after)
+    )
+    dragon.close()
+    
+    latencies.sort()
+    first_outputs.sort()
+    ms = lambda value: None if value is None else round(value * 1000, 1)
+    print(json.dumps({
+        'concurrency': args.worker,
+        'requests': len(latencies) + sum(outcomes.values()),
+        'successes': len(latencies),
+        'failures': outcomes['failed'],
+        'rejected': outcomes['rejected'],
+        'seconds': round(elapsed, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'first_output_p50_ms': ms(percentile(first_outputs, 50)),
+        'first_output_p95_ms': ms(percentile(first_outputs, 95)),
+        'peak_rss_mb': peak_rss_mb()
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per concurrency level")
+    parser.add_argument('--provider', choices=['ollama', 'openai'], default='ollama')
+    parser.add_argument('--stream', action='store_true', help="Use the streaming (UI) path instead of analyze()")
+    parser.add_argument('--payload-kb', type=int, default=64, help="Size of the input file sent with every request")
+    parser.add_argument('--latency', type=float, default=0.5, help="Mock server seconds before each answer")
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--mock-no-stream', action='store_true', help="Mock answers streaming requests with one JSON body")
+    parser.add_argument('--capacity', type=int, help="Mock generates only this many answers at once (default: unlimited)")
+    parser.add_argument('--max-concurrency', type=int, default=8, help="Dragon analyses admitted at once (0: no admission control)")
+    parser.add_argument('--max-queue', type=int, default=32, help="Dragon analyses allowed to wait for a slot")
+    parser.add_argument('--provider-limit', type=int, help="Concurrent calls per provider (default: the Dragon's own, 0: unlimited)")
+    parser.add_argument('--retry-after', type=float, default=0.25, help="Seconds a rejected client waits before trying again")
+    parser.add_argument('--url', help="Use an already running mock (or real) server instead of starting one")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    if args.worker:
+        run_level(args)
+        return
+    
+    server = None
+    url = args.url
+    if not url:
+        server = subprocess.Popen(
+            [sys.executable, str(Path(__file__).with_name('mock_servers.py')), '--port', '0',
+             '--latency', str(args.latency), '--jitter', str(args.jitter), '--failure-rate', str(args.failure_rate),
+             '--tokens', str(args.tokens), '--token-delay', str(args.token_delay), '--seed', '13']
+            + (['--no-stream'] if args.mock_no_stream else [])
+            + (['--capacity', str(args.capacity)] if args.capacity else []),
+            stdout=subprocess.PIPE, text=True
+        )
+        url = json.loads(server.stdout.readline())['url']
+    
+    results = []
+    try:
+        for concurrency in args.concurrency:
+            command = [sys.executable, __file__, '--worker', str(concurrency), '--url', url, '--duration', str(args.duration),
+                       '--provider', args.provider, '--payload-kb', str(args.payload_kb), '--max-concurrency', str(args.max_concurrency),
+                       '--max-queue', str(args.max_queue), '--retry-after', str(args.retry_after)]
+            if args.provider_limit is not None:
+                command += ['--provider-limit', str(args.provider_limit)]
+            if args.stream:
+                command.append('--stream')
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    
+    write_results({
+        'benchmark': 'load',
+        'provider': args.provider,
+        'stream': args.stream,
+        'payload_kb': args.payload_kb,
+        'admission': {'max_concurrency': args.max_concurrency, 'max_queue': args.max_queue, 'provider_limit': args.provider_limit},
+        'mock': None if args.url else {'latency': args.latency, 'jitter': args.jitter, 'failure_rate': args.failure_rate,
+                                        'tokens': args.tokens, 'token_delay': args.token_delay, 'stream': not args.mock_no_stream,
+                                        'capacity': args.capacity},
+        'results': results
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
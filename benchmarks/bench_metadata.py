@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark metadata extraction against growing descriptor lists and outputs.
+
+Compares the precompiled MetadataMatcher (one tokenization pass per output)
+with the old per-descriptor substring scan, and reports where the two
+disagree (the old scan also tagged substrings, e.g. "art" inside "start").
+
+Also times each scan MetadataMatcher.match makes over an output (lowercase
+copy, tokens, quotes, whitespace word count) against a single fused finditer
+pass that collects all three, to show whether folding them together pays.
+
+    python benchmarks/bench_metadata.py --descriptors 10 300 1000 --words 200 5000 20000
+"""
+
+import re
+import time
+import random
+import string
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import load_variant, write_results
+
+
+def make_vocabulary(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))))
+    return sorted(words)
+
+
+def make_descriptors(vocabulary, count, rng):
+    """Mostly single words, with every tenth descriptor a two-word phrase"""
+    descriptors = []
+    for i in range(count):
+        word = vocabulary[i]
+        descriptors.append(f"{word} {rng.choice(vocabulary)}" if i % 10 == 9 else word)
+    return descriptors
+
+
+def make_output(vocabulary, count, rng):
+    words = [rng.choice(vocabulary) for _ in range(count)]
+    for i in range(0, count, 50):
+        words[i] = f'"{words[i]}"'
+    return ' '.join(words).capitalize() + '.'
+
+
+def legacy_extract(descriptors, text, extension):
+    """The previous implementation: one substring scan of the output per descriptor"""
+    content_lower = text.lower()
+    tags = [desc for desc in descriptors if desc in content_lower]
+    quoted_content = re.findall(r'"([^"]*)"', text)
+    clean_content = re.sub(r'[^\w\s-]', '', text.lower())
+    words = clean_content.split()[:4]
+    return {
+        'tags': list(set(tags)),
+        'quoted_content': quoted_content,
+        'suggested_filename': '_'.join(words) + '.' + extension,
+        'word_count': len(text.split()),
+        'char_count': len(text)
+    }
+
+
+# Quotes, word tokens and whitespace runs in one alternation (the fused alternative to match()'s separate scans)
+FUSED = re.compile(r'"([^"]*)"|(\w+)|(\s+)|[^\w\s"]+|"')
+SPACE = re.compile(r'\s+')
+
+
+def single_pass(text):
+    """Token set, quoted content and word count from one finditer over the output"""
+    tokens, quotes, gaps = set(), [], 0
+    for match in FUSED.finditer(text):
+        quoted, token, space = match.groups()
+        if token is not None:
+            tokens.add(token.lower())
+        elif space is not None:
+            gaps += 1
+        elif quoted is not None:
+            quotes.append(quoted)
+            tokens.update(word.lower() for word in re.findall(r'\w+', quoted))
+            gaps += len(SPACE.findall(quoted))
+    # Whitespace runs separate words; leading and trailing runs do not
+    words = gaps + 1 - text[:1].isspace() - text[-1:].isspace() if text.strip() else 0
+    return tokens, quotes, words
+
+
+def time_passes(module, text, repeat):
+    """Milliseconds for each scan match() makes over the output, and for the fused single pass"""
+    token, quote = module.MetadataMatcher.TOKEN, module.MetadataMatcher.QUOTE
+    lower = text.lower()
+    passes = {
+        'lower_ms': lambda: text.lower(),
+        'tokens_ms': lambda: set(token.findall(lower)),
+        'quotes_ms': lambda: quote.findall(text),
+        'word_count_ms': lambda: len(text.split()),
+        'single_pass_ms': lambda: single_pass(text)
+    }
+    timings = {name: round(best_of(fn, repeat) * 1000, 3) for name, fn in passes.items()}
+    timings['separate_passes_ms'] = round(sum(value for name, value in timings.items() if name != 'single_pass_ms'), 3)
+    timings['single_pass_agrees'] = single_pass(text) == (set(token.findall(lower)), quote.findall(text), len(text.split()))
+    return timings
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--descriptors', type=int, nargs='+', default=[10, 300, 1000])
+    parser.add_argument('--words', type=int, nargs='+', default=[200, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=13)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(max(args.descriptors) * 3, rng)
+    module = load_variant(Path(tempfile.mkdtemp(prefix="dragon_bench_metadata_")))
+    dragon = module.DragonEye(use_result_cache=False, discover_models=False)
+    
+    passes = []
+    for word_count in args.words:
+        passes.append({'words': word_count, **time_passes(module, make_output(vocabulary, word_count, rng), args.repeat)})
+    
+    results = []
+    for descriptor_count in args.descriptors:
+        descriptors = make_descriptors(vocabulary, descriptor_count, rng)
+        dragon.metadata_matcher = module.MetadataMatcher(descriptors)
+        compile_ms = best_of(lambda: module.MetadataMatcher(descriptors), args.repeat) * 1000
+        for word_count in args.words:
+            text = make_output(vocabulary, word_count, rng)
+            new = dragon.extract_bench_metadata(text)
+            old = legacy_extract(descriptors, text, 'jpg')
+            results.append({
+                'descriptors': descriptor_count,
+                'words': word_count,
+                'compile_ms': round(compile_ms, 3),
+                'matcher_ms': round(best_of(lambda: dragon.extract_bench_metadata(text), args.repeat) * 1000, 3),
+                'legacy_ms': round(best_of(lambda: legacy_extract(descriptors, text, 'jpg'), args.repeat) * 1000, 3),
+                'tags': len(new['tags']),
+                'substring_only_tags': len(set(old['tags']) - set(new['tags'])),
+                'other_fields_match': all(new[key] == old[key] for key in ('quoted_content', 'suggested_filename', 'word_count', 'char_count')),
+            })
+    
+    dragon.close()
+    write_results({'benchmark': 'metadata', 'results': results, 'passes': passes}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_recent_logs against growing JSONL logs.
+
+Compares the backward tail read with the old full-file scan to show that
+recent-log latency stays flat as the log grows from 1k to 1M entries. Then
+rotates each log into a gzip archive and times a read that spans segments
+(the active file holds one entry, the rest must come from the archive):
+served from the in-memory tail rotation keeps of the newest archive, and
+cold (a fresh reader, as after a restart, has to decompress the archive
+once). Also reports the archive's compression ratio.
+
+    python benchmarks/bench_recent_logs.py --sizes 1000 10000 100000 1000000
+"""
+
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import load_variant, write_results
+
+
+def make_entry(i):
+    return {
+        'timestamp': f"2025-01-01T00:00:{i % 60:02d}.000000",
+        'file_path': f"/data/asset_{i}.jpg",
+        'file_name': f"asset_{i}.jpg",
+        'file_hash': f"{i:032x}",
+        'model_used': 'ollama:llava',
+        'api_used': 'Ollama (llava)',
+        'prompt': 'Describe this image in detail.',
+        'description': 'A red portrait with soft light. ' * 4,
+        'metadata': {'tags': ['portrait', 'red', 'light'], 'quoted_content': [],
+                     'suggested_filename': 'a_red_portrait.jpg', 'word_count': 24, 'char_count': 132}
+    }
+
+
+def write_log(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps(make_entry(i)) + '\n')
+
+
+def full_scan(path, limit):
+    """The previous implementation: parse every line, keep the last `limit`"""
+    logs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                logs.append(json.loads(line))
+    return logs[-limit:]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-full-scan', action='store_true', help="Only time the tail read")
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    workdir = Path(tempfile.mkdtemp(prefix="dragon_bench_logs_"))
+    module = load_variant(workdir)
+    dragon = module.DragonEye(use_result_cache=False, discover_models=False)
+    
+    results = []
+    for size in args.sizes:
+        dragon.log_file = workdir / f"logs_{size}.jsonl"
+        dragon.log_segments = module.LogSegments(dragon.log_file)
+        write_log(dragon.log_file, size)
+        row = {
+            'entries': size,
+            'log_bytes': dragon.log_file.stat().st_size,
+            'tail_read_ms': round(best_of(lambda: dragon._tail_log_entries(args.limit), args.repeat) * 1000, 3),
+            'get_recent_logs_ms': round(best_of(lambda: dragon.get_recent_logs(args.limit), args.repeat) * 1000, 3),
+        }
+        if not args.skip_full_scan:
+            row['full_scan_ms'] = round(best_of(lambda: full_scan(dragon.log_file, args.limit), 1) * 1000, 3)
+        
+        archive = dragon.log_segments.rotate()
+        write_log(dragon.log_file, 1)
+        row.update({
+            'archive_bytes': archive.stat().st_size,
+            'compression_ratio': round(row['log_bytes'] / archive.stat().st_size, 1),
+            'tail_across_segments_ms': round(best_of(lambda: dragon._tail_log_entries(args.limit), args.repeat) * 1000, 3),
+            'tail_across_segments_cold_ms': round(best_of(lambda: module.LogSegments(dragon.log_file).tail(args.limit), args.repeat) * 1000, 3),
+        })
+        results.append(row)
+        for path in dragon.log_segments.segments():
+            path.unlink()
+    
+    dragon.close()
+    write_results({'benchmark': 'recent_logs', 'limit': args.limit, 'results': results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
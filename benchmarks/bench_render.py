@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Render many variants with the tokenized template versus one str.replace pass per config key.
+
+The old DragonSetup.replace_placeholders scanned the whole template once per
+config key for every variant; TemplateRenderer splits it into literal and
+placeholder segments once, then each variant is a single join.
+
+    python benchmarks/bench_render.py --variants 1 10 100
+"""
+
+import time
+import argparse
+
+from common import REPO_ROOT, SAMPLE_CONFIG, write_results
+from setup_dragon import DragonSetup, TemplateRenderer
+
+
+def replace_per_key(content, config):
+    """The previous implementation: one full pass over the template per config key"""
+    for key, value in config.items():
+        content = content.replace(f"{{{{{key}}}}}", str(value))
+    return content
+
+
+def configs(count):
+    setup = DragonSetup()
+    setup.config.update(setup.color_schemes["purple"])
+    setup.config.update(SAMPLE_CONFIG)
+    setup.finalize_config()
+    return [{**setup.config, 'type': f"bench{index}", 'PORT': str(7860 + index)} for index in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variants', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    template = (REPO_ROOT / DragonSetup().template_file).read_text(encoding='utf-8')
+    results = []
+    for count in args.variants:
+        variants = configs(count)
+        
+        start = time.perf_counter()
+        old = [replace_per_key(template, config) for config in variants]
+        per_key = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        renderer = TemplateRenderer(template)
+        new = [renderer.render(config)[0] for config in variants]
+        tokenized = time.perf_counter() - start
+        
+        results.append({
+            'variants': count,
+            'per_key_replace_ms': round(per_key * 1000, 2),
+            'tokenized_ms': round(tokenized * 1000, 2),
+            'speedup': round(per_key / tokenized, 1) if tokenized else None,
+            'identical_output': old == new
+        })
+    
+    write_results({
+        'benchmark': 'render',
+        'template_bytes': len(template.encode('utf-8')),
+        'placeholders': len(TemplateRenderer(template).names),
+        'config_keys': len(configs(1)[0]),
+        'results': results
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Half-open circuit breaker check for abandoned streams.
+
+Opens the provider and model breakers of a generated Dragon, lets their
+recovery timeout lapse so the next stream is the half-open probe, reads a few
+partial outputs from a slow mock Ollama and then closes the stream the way a
+disconnecting client does. Fails (exit code 1) unless both breakers let a new
+probe through afterwards.
+
+    python benchmarks/check_breaker_abort.py --chunks 3
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import SAMPLE_CONFIG, load_variant, write_results
+from mock_servers import MockSettings, start_server
+
+
+async def abort_stream(dragon, path, model, chunks):
+    """Read `chunks` non-empty partial outputs, then close the stream; returns whether the probe was held meanwhile"""
+    stream_analysis = getattr(dragon, f"aanalyze_{SAMPLE_CONFIG['type']}_stream")
+    stream = stream_analysis(path, model, "Describe this input.")
+    seen = 0
+    held = False
+    try:
+        async for output, _, _ in stream:
+            if output:
+                seen += 1
+                held = not any(breaker.allow() for breaker in dragon._breakers_for(model))
+            if seen >= chunks:
+                break
+    finally:
+        await stream.aclose()
+    return held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=3, help="Partial outputs to read before disconnecting")
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="dragon_check_breaker_"))
+    os.chdir(workdir)  # Logs land in the scratch directory
+    module = load_variant(workdir)
+    server = start_server(MockSettings(latency=0.0, tokens=args.chunks + 50, token_delay=0.05))
+    dragon = getattr(module, f"Dragon{SAMPLE_CONFIG['CLASS_SUFFIX']}")(
+        use_result_cache=False, discover_models=False, preprocessor=False, chunker=False, warm_up=False
+    )
+    dragon.ollama_url = f"http://127.0.0.1:{server.server_port}"
+
+    path = workdir / "input.bin"
+    path.write_bytes(os.urandom(1024))
+    model = f"ollama:{SAMPLE_CONFIG['DEFAULT_MODEL']}"
+    breakers = dragon._breakers_for(model)
+    for breaker in breakers:
+        breaker.state = 'open'
+        breaker.opened_at = 0.0  # Recovery timeout long past: the next call is the half-open probe
+
+    try:
+        held = asyncio.run(abort_stream(dragon, str(path), model, args.chunks))
+        states = [breaker.state for breaker in breakers]
+        reopened = [breaker.allow() for breaker in breakers]
+    finally:
+        dragon.close()
+        server.shutdown()
+
+    passed = held and all(reopened)
+    write_results({
+        'benchmark': 'breaker_abort',
+        'chunks_read': args.chunks,
+        'probe_held_while_streaming': held,
+        'states_after_abort': states,
+        'probe_allowed_after_abort': reopened,
+        'passed': passed
+    }, args.output)
+
+    if not passed:
+        print("❌ Abandoned half-open stream left a breaker without a probe slot" if held
+              else "❌ Stream did not run as the half-open probe", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for headless use of a generated Dragon.
+
+Imports the rendered variant in fresh interpreters and fails (exit code 1) if
+the median time to import it and construct a headless Dragon exceeds the
+budget, or if gradio/pandas were loaded along the way.
+
+    python benchmarks/check_import_time.py --budget-ms 400
+"""
+
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from common import SAMPLE_CONFIG, render_variant, write_results
+
+PROBE = """
+import sys, time, json
+sys.path.insert(0, {directory!r})
+start = time.perf_counter()
+import {module} as variant
+imported = time.perf_counter()
+dragon = variant.{cls}(discover_models=False, use_result_cache=False)
+constructed = time.perf_counter()
+dragon.close()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'total_ms': (constructed - start) * 1000,
+    'heavy_modules': [name for name in ('gradio', 'pandas') if name in sys.modules]
+}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=400.0)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix="dragon_bench_import_")
+    path = render_variant(directory)
+    probe = PROBE.format(directory=directory, module=path.stem, cls=f"Dragon{SAMPLE_CONFIG['CLASS_SUFFIX']}")
+    
+    # First run compiles the .pyc; it is not counted
+    subprocess.run([sys.executable, '-c', probe], capture_output=True, check=True, cwd=directory)
+    runs = [json.loads(subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                                      cwd=directory).stdout) for _ in range(args.runs)]
+    
+    median_ms = statistics.median(run['total_ms'] for run in runs)
+    heavy = sorted({name for run in runs for name in run['heavy_modules']})
+    passed = median_ms <= args.budget_ms and not heavy
+    write_results({
+        'benchmark': 'import_time',
+        'budget_ms': args.budget_ms,
+        'median_import_ms': round(statistics.median(run['import_ms'] for run in runs), 1),
+        'median_total_ms': round(median_ms, 1),
+        'heavy_modules_loaded': heavy,
+        'passed': passed
+    }, args.output)
+    
+    if not passed:
+        print("❌ Import-time budget exceeded" if not heavy else f"❌ Headless import loaded {', '.join(heavy)}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
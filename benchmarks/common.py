@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Dragon Benchmark Helpers
+Copyright © 2025 Seed13 Productions. All rights reserved.
+
+Renders the Dragon template into a throwaway variant and imports it, so the
+benchmarks exercise exactly the code setup_dragon.py would generate.
+"""
+
+import sys
+import json
+import tempfile
+import importlib.util
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from setup_dragon import DragonSetup  # noqa: E402
+
+# Representative configuration (an image Dragon, like Dragonsight)
+SAMPLE_CONFIG = {
+    "TYPE": "Bench", "type": "bench", "DATA_TYPE": "Image", "data_type": "image",
+    "DESCRIPTION": "Benchmark variant", "EMOJI": "🐉", "CLASS_SUFFIX": "Eye", "instance": "bench",
+    "DEFAULT_MODEL": "llava", "MODEL_KEYWORDS": "['llava', 'vision']",
+    "OPENAI_MODELS": "['openai:gpt-4o']", "GOOGLE_MODELS": "['google:gemini-pro']",
+    "method_suffix": "bench", "DEFAULT_OPENAI_MODEL": "gpt-4o",
+    "TIMEOUT_SECONDS": "60", "API_TIMEOUT": "30",
+    "PORT": "7899", "GRADIO_COMPONENT": "Image", "GRADIO_TYPE": "filepath",
+    "COMPONENT_PARAMS": "height=300", "INPUT_LABEL": "📁 Upload Image File",
+    "OUTPUT_LABEL": "📜 Image Analysis", "ANALYZE_BUTTON": "🔍 Analyze Image", "TAB_ICON": "🔍",
+    "input_param": "image_data", "output_param": "description",
+    "DEFAULT_PROMPT": "Describe this image in detail.",
+    "METADATA_DESCRIPTORS": "['portrait', 'landscape', 'red', 'blue', 'art', 'light']",
+    "FILE_EXTENSION": "jpg", "input_data": "image_data_encoded", "output_var": "result",
+    "input_key": "images", "output_key": "description", "input_component": "bench_input",
+    "output_component": "description_output", "OUTPUT_COLUMN": "Description",
+    "OUTPUT_TYPE": "Description", "output_type": "description", "result_key": "result",
+}
+
+
+def render_variant(output_dir, config=None):
+    """Render the template with SAMPLE_CONFIG (plus any overrides) into output_dir and return the file path"""
+    setup = DragonSetup()
+    setup.config.update(setup.color_schemes["purple"])
+    setup.config.update(SAMPLE_CONFIG)
+    setup.finalize_config()
+    setup.config.update(config or {})
+    
+    template = (REPO_ROOT / setup.template_file).read_text(encoding='utf-8')
+    output_file = Path(output_dir) / f"dragon{SAMPLE_CONFIG['type']}_gradio.py"
+    output_file.write_text(setup.replace_placeholders(template), encoding='utf-8')
+    return output_file
+
+
+def load_variant(output_dir=None, config=None):
+    """Render and import the sample variant, returning the module"""
+    output_dir = Path(output_dir or tempfile.mkdtemp(prefix="dragon_bench_"))
+    path = render_variant(output_dir, config)
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_results(results, output_file=None):
+    """Print results as JSON (and save them when output_file is given)"""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output_file:
+        Path(output_file).write_text(text + '\n', encoding='utf-8')
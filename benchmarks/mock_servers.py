@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Ollama and OpenAI HTTP APIs, for load tests and offline UI work.
+
+Serves /api/tags and /api/generate (Ollama, NDJSON streaming) and
+/v1/chat/completions (OpenAI, SSE streaming) on one port, with configurable
+latency, jitter, failure rate and token streaming. --capacity makes it behave
+like a real local Ollama: only that many requests generate at once and the
+rest wait, so overload shows up as growing latency. --load-time does the same
+for model loading: an Ollama model that is not loaded takes that long before
+answering, stays loaded for the request's keep_alive (default 5m), and the
+load is reported as load_duration.
+
+    python benchmarks/mock_servers.py --port 11434 --latency 0.5 --failure-rate 0.05
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MODELS = ['llava:latest', 'llama3:latest']
+
+
+class MockSettings:
+    """Behaviour shared by every request to one mock server"""
+    
+    def __init__(self, latency=0.5, jitter=0.0, failure_rate=0.0, stream=True, tokens=20, token_delay=0.01, seed=None, capacity=None,
+                 load_time=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.stream = stream
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.capacity = threading.BoundedSemaphore(capacity) if capacity else None
+        self.load_time = load_time
+        self.loaded = {}  # Ollama model -> time.monotonic() when it is unloaded
+        self.requests = 0
+        self.failures = 0
+        self.loads = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def draw(self):
+        """Delay before answering and whether this request fails"""
+        with self._lock:
+            self.requests += 1
+            delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+        return delay, failed
+    
+    @staticmethod
+    def keep_alive_seconds(value):
+        """Seconds an Ollama keep_alive (number or duration such as "30m") keeps the model loaded"""
+        if value is None:
+            return 300
+        if isinstance(value, (int, float)):
+            return float('inf') if value < 0 else value
+        if value.startswith('-'):
+            return float('inf')
+        units = {'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600}
+        return sum(float(number) * units[unit] for number, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value))
+    
+    def load(self, model, keep_alive):
+        """Load the model if it is not loaded (sleeping load_time) and restart its keep-alive; returns seconds spent loading"""
+        model = model if ':' in model else f"{model}:latest"  # Ollama treats "llava" and "llava:latest" as one model
+        now = time.monotonic()
+        with self._lock:
+            cold = self.loaded.get(model, 0) <= now
+            self.loads += cold
+        load_seconds = self.load_time if cold else 0.0
+        time.sleep(load_seconds)
+        with self._lock:
+            self.loaded[model] = time.monotonic() + self.keep_alive_seconds(keep_alive)
+        return load_seconds
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    settings = MockSettings()
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_chunk(self, data):
+        self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+        self.wfile.flush()
+    
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+    
+    def do_GET(self):
+        if self.path.rstrip('/') == '/api/tags':
+            self._send_json(200, {'models': [{'name': name} for name in MODELS]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+    
+    def do_POST(self):
+        body = self._read_body()
+        if self.path.rstrip('/') not in ('/api/generate', '/v1/chat/completions'):
+            self._send_json(404, {'error': 'not found'})
+            return
+        
+        if self.path.startswith('/api/') and not body.get('prompt'):
+            # Ollama loads the model (and restarts its keep-alive) when asked to generate without a prompt
+            load_seconds = self.settings.load(body.get('model'), body.get('keep_alive'))
+            self._send_json(200, {'model': body.get('model'), 'response': '', 'done': True, 'done_reason': 'load',
+                                  'load_duration': int(load_seconds * 1e9)})
+            return
+        
+        capacity = self.settings.capacity
+        if capacity is not None:
+            capacity.acquire()
+        try:
+            load_seconds = self.settings.load(body.get('model'), body.get('keep_alive')) if self.path.startswith('/api/') else 0.0
+            delay, failed = self.settings.draw()
+            time.sleep(delay)
+            if failed:
+                self._send_json(500, {'error': 'mock failure'})
+                return
+            
+            words = [f"token{i} " for i in range(self.settings.tokens)]
+            streaming = body.get('stream') and self.settings.stream
+            if self.path.startswith('/api/'):
+                self._ollama(body, words, streaming, load_seconds)
+            else:
+                self._openai(body, words, streaming)
+        finally:
+            if capacity is not None:
+                capacity.release()
+    
+    def _ollama(self, body, words, streaming, load_seconds=0.0):
+        timings = {'eval_count': len(words), 'eval_duration': int(len(words) * self.settings.token_delay * 1e9),
+                   'load_duration': int(load_seconds * 1e9)}
+        if not streaming:
+            self._send_json(200, {'model': body.get('model'), 'response': ''.join(words), 'done': True, **timings})
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for word in words:
+            self._send_chunk((json.dumps({'response': word, 'done': False}) + '\n').encode('utf-8'))
+            time.sleep(self.settings.token_delay)
+        done = {'response': '', 'done': True, **timings}
+        self._send_chunk((json.dumps(done) + '\n').encode('utf-8'))
+        self.wfile.write(b'0\r\n\r\n')
+    
+    def _openai(self, body, words, streaming):
+        if not streaming:
+            self._send_json(200, {
+                'object': 'chat.completion', 'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(words)}, 'finish_reason': 'stop'}],
+                'usage': {'completion_tokens': len(words)}
+            })
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for word in words:
+            event = {'object': 'chat.completion.chunk', 'choices': [{'index': 0, 'delta': {'content': word}}]}
+            self._send_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+            time.sleep(self.settings.token_delay)
+        self._send_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b'0\r\n\r\n')
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Bursts of hundreds of connections must not be refused
+    
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream (cancelled hedges, closed streams) are expected, not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(settings=None, host='127.0.0.1', port=0):
+    """Serve the mock APIs on a background thread, returning the server (server.server_port is the bound port)"""
+    handler = type('BoundMockHandler', (MockHandler,), {'settings': settings or MockSettings()})
+    server = MockServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="dragon-mock-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds before each answer starts")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Uniform +/- seconds added to the latency")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument('--no-stream', action='store_true', help="Answer streaming requests with one JSON body")
+    parser.add_argument('--tokens', type=int, default=20, help="Tokens per answer")
+    parser.add_argument('--token-delay', type=float, default=0.01, help="Seconds between streamed tokens")
+    parser.add_argument('--capacity', type=int, help="Requests generated at once (others wait), like OLLAMA_NUM_PARALLEL")
+    parser.add_argument('--load-time', type=float, default=0.0, help="Seconds to load an Ollama model that is not loaded")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    
+    settings = MockSettings(args.latency, args.jitter, args.failure_rate, not args.no_stream, args.tokens, args.token_delay, args.seed,
+                            args.capacity, args.load_time)
+    server = start_server(settings, args.host, args.port)
+    # The first line tells a parent process which port was bound (useful with --port 0)
+    print(json.dumps({'url': f"http://{args.host}:{server.server_port}"}), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(json.dumps({'requests': settings.requests, 'failures': settings.failures, 'loads': settings.loads}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Dragon Host
+Copyright © 2025 Seed13 Productions. All rights reserved.
+
+Serve several generated Dragon variants (dragon*_gradio.py from setup_dragon.py)
+from one process, each under its own path (/sight, /song, ...). The variants
+share one DragonRuntime: one I/O event loop, a keep-alive pool per provider, per-provider
+concurrency limits, one model-discovery refresher (the Ollama model list is
+fetched once for all of them) and one /metrics endpoint. Python, gradio and
+pandas are loaded once instead of once per variant.
+
+    python dragon_host.py dragonsight_gradio.py dragonsong_gradio.py --port 7860
+    python dragon_host.py                       # every dragon*_gradio.py in this directory
+    python dragon_host.py dragonsight_gradio.py=/eye dragonsong_gradio.py=/ear
+"""
+
+import os
+import sys
+import glob
+import html
+import hashlib
+import inspect
+import argparse
+import importlib.util
+from pathlib import Path
+
+
+def default_mount(path):
+    """/sight for dragonsight_gradio.py"""
+    stem = Path(path).stem
+    return '/' + (stem.removeprefix('dragon').removesuffix('_gradio') or stem)
+
+
+def parse_variants(specs):
+    """[(file, mount path)] from FILE or FILE=/path arguments (default: every dragon*_gradio.py here)"""
+    variants = []
+    for spec in specs or sorted(glob.glob("dragon*_gradio.py")):
+        file, _, mount = spec.partition('=')
+        variants.append((file, '/' + (mount or default_mount(file)).strip('/')))
+    mounts = [mount for _, mount in variants]
+    duplicates = sorted({mount for mount in mounts if mounts.count(mount) > 1})
+    if duplicates:
+        raise ValueError(f"Mount paths used twice: {', '.join(duplicates)} (give one a FILE=/path)")
+    return variants
+
+
+def load_variant(path):
+    """Import a generated variant from its file (the module is named after the file)"""
+    path = Path(path).resolve()
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[path.stem] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# What the variants share through one runtime: its own code and the objects it hands to every Dragon
+SHARED_RUNTIME = ('DragonRuntime', 'Metrics', 'AdmissionQueue', 'metrics_route')
+
+
+def runtime_fingerprint(module):
+    """Digest of a variant's shared-runtime code; variants can share one runtime only when theirs match"""
+    digest = hashlib.sha256()
+    for name in SHARED_RUNTIME:
+        digest.update(inspect.getsource(getattr(module, name)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def check_shared_runtime(modules):
+    """Refuse to host variants rendered from different template versions (or with different request timeouts)"""
+    groups = {}
+    for module in modules:
+        groups.setdefault(runtime_fingerprint(module), []).append(Path(module.__file__).name)
+    if len(groups) > 1:
+        listing = '; '.join(', '.join(files) for files in groups.values())
+        raise ValueError(f"Variants differ in their shared runtime code ({listing}): render them again from one "
+                         f"dragon_template.py with the same timeout, or run them as separate processes")
+
+
+def build_app(variants, metrics=True):
+    """One FastAPI app with every variant mounted, an index page at / and optionally /metrics; returns (app, dragons, runtime)"""
+    from fastapi import FastAPI
+    from fastapi.responses import HTMLResponse
+    import gradio as gr
+    
+    modules = [(load_variant(file), mount) for file, mount in variants]
+    # Variants rendered from the same template agree on the runtime, so the first one's class serves them all
+    check_shared_runtime([module for module, _ in modules])
+    runtime = modules[0][0].DragonRuntime("dragon-host")
+    
+    app = FastAPI(title="Dragon Host")
+    dragons = []
+    links = []
+    for module, mount in modules:
+        dragon = module.get_dragon(runtime=runtime)
+        demo = module.build_interface(dragon)
+        gr.mount_gradio_app(app, demo, path=mount, show_error=True)
+        dragons.append(dragon)
+        links.append(f'<li><a href="{html.escape(mount)}/">{html.escape(demo.title)}</a></li>')
+    
+    index = f"<!doctype html><title>Dragon Host</title><h1>🐉 Dragon Host</h1><ul>{''.join(links)}</ul>"
+    app.add_api_route("/", lambda: HTMLResponse(index), methods=["GET"], include_in_schema=False)
+    if metrics:
+        # Every Dragon records into the runtime's registry, labelled by variant
+        app.router.routes.insert(0, modules[0][0].metrics_route(runtime.metrics))
+    return app, dragons, runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("variants", nargs="*", metavar="FILE[=/path]",
+                        help="Generated dragon*_gradio.py files, optionally with a mount path (default: all in this directory)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7860)
+    args = parser.parse_args()
+    
+    variants = parse_variants(args.variants)
+    if not variants:
+        parser.error("no dragon*_gradio.py files found; run setup_dragon.py first or name the files")
+    
+    import uvicorn
+    app, dragons, runtime = build_app(variants, metrics=os.getenv('DRAGON_METRICS', '1') != '0')
+    print("🐉 Dragon Host - Copyright © 2025 Seed13 Productions")
+    print("=" * 60)
+    for file, mount in variants:
+        print(f"🌐 {file} → http://localhost:{args.port}{mount}/")
+    print("=" * 60)
+    try:
+        uvicorn.run(app, host=args.host, port=args.port)
+    finally:
+        for dragon in dragons:
+            dragon.close()
+        runtime.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,18 +9,1820 @@ Copyright © 2025 Seed13 Productions. All rights reserved.
 import os
 import json
 import base64
-import requests
-import gradio as gr
-import pandas as pd
+import asyncio
+import httpx
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import hashlib
+import uuid
 import re
 import io
+import math
+import wave
+import threading
+import time
+import sqlite3
+import glob
+import queue
+import atexit
+import gzip
+import shutil
+import bisect
+import random
+import cProfile
+import pstats
+import contextlib
+import contextvars
+from collections import OrderedDict, deque
+import importlib
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 
-class Dragon{{CLASS_SUFFIX}}:
+class LazyModule:
+    """Import a module on first attribute access, so headless use never loads gradio or pandas"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+gr = LazyModule('gradio')
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+Image = LazyModule('PIL.Image')
+ImageOps = LazyModule('PIL.ImageOps')
+
+
+# Read size for streaming ingest: a multiple of 3 so base64 chunks concatenate
+# cleanly, and small enough to stay in CPU cache between hashing and encoding
+INGEST_CHUNK_SIZE = 3 * 256 * 1024
+
+
+def new_content_hash():
+    """Hash used for content addressing (cache keys and log file_hash)"""
+    # SHA-256 is hardware accelerated (SHA-NI / ARMv8) in OpenSSL and outpaces md5 and blake2b there
+    return hashlib.sha256()
+
+
+def encode_bytes(data):
+    """Base64-encode in-memory data and compute its content hash, returning (encoded, digest)"""
+    digest = new_content_hash()
+    digest.update(data)
+    return base64.b64encode(data).decode('ascii'), digest.hexdigest()
+
+
+def encode_file(path, chunk_size=INGEST_CHUNK_SIZE):
+    """Hash and base64-encode a file in one chunked read, returning (encoded, digest)"""
+    digest = new_content_hash()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        # Encode straight into a preallocated buffer instead of holding raw + encoded copies
+        encoded = bytearray(4 * ((size + 2) // 3))
+        chunk = bytearray(chunk_size)
+        view = memoryview(chunk)
+        position = 0
+        while True:
+            filled = 0
+            while filled < chunk_size:
+                count = f.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if not filled:
+                break
+            digest.update(view[:filled])
+            piece = base64.b64encode(view[:filled])
+            encoded[position:position + len(piece)] = piece
+            position += len(piece)
+            if filled < chunk_size:
+                break
+    del encoded[position:]  # File may have shrunk while reading
+    return encoded.decode('ascii'), digest.hexdigest()
+
+
+def hash_bytes(data):
+    """Content hash of in-memory data"""
+    digest = new_content_hash()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def hash_file(path, chunk_size=INGEST_CHUNK_SIZE):
+    """Content hash of a file, read in chunks"""
+    digest = new_content_hash()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def word_trie_pattern(words):
+    """Regex alternation for words, factored into a prefix trie so the engine never backtracks across siblings"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End of a word
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+    
+    return build(trie)
+
+
+def suggest_filename(text, extension, words=4):
+    """Filename from the first few words of an output (only the words used are cleaned)"""
+    parts = []
+    for match in re.finditer(r'\S+', text):
+        part = re.sub(r'[^\w-]', '', match.group().lower())
+        if part:
+            parts.append(part)
+            if len(parts) == words:
+                break
+    return '_'.join(parts) + '.' + extension
+
+
+class MetadataMatcher:
+    """Precompiled whole-word, case-insensitive descriptor matcher that also collects quotes and counts"""
+    
+    TOKEN = re.compile(r'\w+')
+    QUOTE = re.compile(r'"([^"]*)"')
+    
+    def __init__(self, descriptors):
+        self.descriptors = list(dict.fromkeys(descriptors))
+        self._lookup = {}
+        self._rank = {}
+        for rank, descriptor in enumerate(self.descriptors):
+            self._lookup.setdefault(descriptor.lower(), descriptor)
+            self._rank[descriptor] = rank
+        # Single-word descriptors are matched by set lookup over one tokenization of the text;
+        # only multi-word or punctuated ones ("oil painting", "black-and-white") need a regex
+        self._words = frozenset(key for key in self._lookup if self.TOKEN.fullmatch(key))
+        phrases = [key for key in self._lookup if key not in self._words]
+        # A lookahead capture consumes nothing, so overlapping phrases ("new york", "york city") are all found;
+        # at each start it captures the longest phrase, and the shorter ones it begins with are added from _nested
+        self._phrases = re.compile(r'(?<!\w)(?=(' + word_trie_pattern(phrases) + r')(?!\w))') if phrases else None
+        self._nested = {}
+        for phrase in phrases:
+            nested = [key for key in phrases if len(key) < len(phrase) and phrase.startswith(key) and not self.TOKEN.match(phrase[len(key)])]
+            if nested:
+                self._nested[phrase] = nested
+        # The phrase regex only runs when the first word of some phrase occurs in the text
+        heads = [self.TOKEN.search(key) for key in phrases]
+        self._phrase_heads = None if not all(heads) else frozenset(head.group() for head in heads)
+    
+    def match(self, text):
+        """Return (tags in descriptor order, quoted content, word count) for one output"""
+        # Separate C-level scans on purpose: tokens are ~80% of the time, and one fused finditer collecting
+        # tokens, quotes and the count runs per match in Python, 2-3x slower (benchmarks/bench_metadata.py 'passes')
+        lower = text.lower()
+        tokens = set(self.TOKEN.findall(lower))
+        found = self._words.intersection(tokens)
+        if self._phrases is not None and (self._phrase_heads is None or not self._phrase_heads.isdisjoint(tokens)):
+            phrases = set(self._phrases.findall(lower))
+            for phrase in list(phrases):
+                phrases.update(self._nested.get(phrase, ()))
+            found = found.union(phrases)
+        tags = sorted((self._lookup[key] for key in found), key=self._rank.__getitem__)
+        return tags, self.QUOTE.findall(text), len(text.split())
+
+
+class InputStage:
+    """Base for the stages that handle inputs by file extension (preprocessors and chunkers)"""
+    
+    extensions = ()
+    
+    def accepts(self, file_path):
+        """Whether this stage handles the input (raw uploads without a name are always tried)"""
+        return file_path is None or Path(file_path).suffix.lower() in self.extensions
+
+
+class Preprocessor(InputStage):
+    """Preprocessing stage run on raw input bytes before encoding (subclass per data type)"""
+    
+    def signature(self):
+        """Settings that change the output; part of the preprocessed-payload cache key"""
+        return type(self).__name__
+    
+    def process(self, data):
+        """Return the smaller payload, or None to send the original bytes"""
+        return None
+
+
+class ImagePreprocessor(Preprocessor):
+    """Downscale to a maximum dimension and recompress as JPEG (Pillow)"""
+    
+    extensions = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+    
+    def __init__(self, max_dimension=1536, quality=85):
+        self.max_dimension = max_dimension
+        self.quality = quality
+    
+    def signature(self):
+        return f"image:{self.max_dimension}:{self.quality}"
+    
+    def process(self, data):
+        with Image.open(io.BytesIO(data)) as source:
+            if getattr(source, 'is_animated', False):
+                return None
+            image = ImageOps.exif_transpose(source)
+            if max(image.size) > self.max_dimension:
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                # JPEG has no alpha channel: flatten onto white
+                rgba = image.convert('RGBA')
+                image = Image.new('RGB', rgba.size, 'white')
+                image.paste(rgba, mask=rgba.getchannel('A'))
+            elif image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=self.quality, optimize=True)
+        return output.getvalue()
+
+
+def decode_audio(data):
+    """Decode audio to float32 samples shaped (frames, channels), returning (samples, rate)"""
+    try:
+        import soundfile
+    except ImportError:
+        soundfile = None
+    if soundfile is not None:
+        return soundfile.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    
+    # Without soundfile only PCM WAV can be read
+    with wave.open(io.BytesIO(data)) as wav:
+        width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width not in (1, 2, 4):
+        raise ValueError(f"{width * 8}-bit WAV needs the soundfile package")
+    samples = np.frombuffer(frames, dtype={1: np.uint8, 2: np.int16, 4: np.int32}[width]).reshape(-1, channels)
+    samples = samples.astype(np.float32)
+    if width == 1:
+        return (samples - 128) / 128, rate
+    return samples / float(2 ** (8 * width - 1)), rate
+
+
+def encode_wav(samples, rate):
+    """Encode float samples shaped (frames, channels) as 16-bit PCM WAV bytes"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wav:
+        wav.setnchannels(pcm.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return output.getvalue()
+
+
+class AudioPreprocessor(Preprocessor):
+    """Downmix and resample to 16-bit PCM WAV (soundfile for compressed formats, stdlib wave otherwise)"""
+    
+    extensions = ('.wav', '.flac', '.ogg', '.aiff', '.aif', '.mp3')
+    
+    def __init__(self, sample_rate=16000, channels=1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+    
+    def signature(self):
+        return f"audio:{self.sample_rate}:{self.channels}"
+    
+    def _resample(self, samples, rate):
+        try:
+            from scipy.signal import resample_poly
+        except ImportError:
+            resample_poly = None
+        if resample_poly is not None:
+            # Polyphase filter: low-passes before decimating, so no aliasing
+            factor = math.gcd(self.sample_rate, rate)
+            return resample_poly(samples, self.sample_rate // factor, rate // factor, axis=0)
+        
+        frames = int(round(len(samples) * self.sample_rate / rate))
+        positions = np.linspace(0, len(samples) - 1, frames)
+        source = np.arange(len(samples))
+        return np.stack([np.interp(positions, source, samples[:, c]) for c in range(samples.shape[1])], axis=1)
+    
+    def process(self, data):
+        samples, rate = decode_audio(data)
+        if samples.shape[1] > self.channels:
+            samples = samples.mean(axis=1, keepdims=True)
+        if rate > self.sample_rate and len(samples):
+            samples = self._resample(samples, rate)
+            rate = self.sample_rate
+        return encode_wav(samples, rate)
+
+
+class DiskLRU:
+    """Size-bounded directory of cache files (<key[:2]>/<key><suffix>), evicted least recently used first.
+    A file's mtime is its last use; expiry(path), when given, returns an entry's expiry time so expired ones go first"""
+    
+    def __init__(self, cache_dir, suffix, max_bytes, expiry=None):
+        self.cache_dir = Path(cache_dir)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.expiry = expiry
+        self.size = None  # Bytes on disk, counted at the first write
+        self._lock = threading.Lock()
+    
+    def path(self, key):
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+    
+    def files(self):
+        return self.cache_dir.glob(f"*/*{self.suffix}")
+    
+    def read(self, key):
+        """The file's bytes (marking it used), or None"""
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+    
+    def write(self, key, data):
+        """Atomically store data under key, evicting when over budget (raises OSError)"""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self.size is None:
+                self.size = sum(p.stat().st_size for p in self.files())
+            else:
+                self.size += len(data) - previous
+            over_limit = self.size > self.max_bytes
+        if over_limit:
+            self.evict()
+    
+    def remove(self, key):
+        path = self.path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self.size is not None:
+                self.size -= size
+    
+    def evict(self):
+        """Remove expired files, then the least recently used ones, until under 90% of the budget"""
+        now = time.time()
+        files = []
+        for path in self.files():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+        
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if total > target or (self.expiry is not None and self.expiry(path) <= now):
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+        with self._lock:
+            self.size = total
+    
+    def clear(self):
+        for path in self.files():
+            self.remove(path.stem)
+
+
+class PreprocessCache:
+    """On-disk cache of preprocessed payloads keyed by source hash and preprocessor settings"""
+    
+    def __init__(self, cache_dir, max_disk_bytes=1024 * 1024 * 1024):
+        self.disk = DiskLRU(cache_dir, '.bin', max_disk_bytes)
+    
+    @staticmethod
+    def make_key(source_hash, signature):
+        return hashlib.sha256(f"{source_hash}\0{signature}".encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Cached payload (b'' means the original was already smallest), or None"""
+        return self.disk.read(key)
+    
+    def put(self, key, data):
+        try:
+            self.disk.write(key, data)
+        except OSError as e:
+            print(f"Preprocess cache write error: {e}")
+
+
+class Chunker(InputStage):
+    """Splits an oversized input into overlapping segments for map-reduce analysis (subclass per data type)"""
+    
+    def split(self, data):
+        """Return [(label, segment bytes), ...], or None when the input fits in one request"""
+        return None
+
+
+class DocumentChunker(Chunker):
+    """Page windows for PDFs (pypdf/PyPDF2), word windows for plain text"""
+    
+    extensions = ('.pdf', '.txt', '.md', '.rst', '.csv', '.json', '.log', '.html', '.xml', '.py')
+    
+    def __init__(self, pages_per_chunk=10, overlap_pages=1, words_per_chunk=1500, overlap_words=150):
+        self.pages_per_chunk = pages_per_chunk
+        self.overlap_pages = overlap_pages
+        self.words_per_chunk = words_per_chunk
+        self.overlap_words = overlap_words
+    
+    def split(self, data):
+        if data[:5] == b'%PDF-':
+            return self._split_pdf(data)
+        return self._split_text(data)
+    
+    def _split_pdf(self, data):
+        try:
+            from pypdf import PdfReader, PdfWriter
+        except ImportError:
+            try:
+                from PyPDF2 import PdfReader, PdfWriter
+            except ImportError:
+                return None
+        
+        reader = PdfReader(io.BytesIO(data))
+        pages = len(reader.pages)
+        if pages <= self.pages_per_chunk:
+            return None
+        
+        segments = []
+        step = max(self.pages_per_chunk - self.overlap_pages, 1)
+        for start in range(0, pages, step):
+            end = min(start + self.pages_per_chunk, pages)
+            writer = PdfWriter()
+            for index in range(start, end):
+                writer.add_page(reader.pages[index])
+            output = io.BytesIO()
+            writer.write(output)
+            segments.append((f"pages {start + 1}-{end}", output.getvalue()))
+            if end == pages:
+                break
+        return segments
+    
+    def _split_text(self, data):
+        text = data.decode('utf-8', errors='replace')
+        # Word spans, so each segment keeps the original line breaks and spacing
+        words = [match.span() for match in re.finditer(r'\S+', text)]
+        if len(words) <= self.words_per_chunk:
+            return None
+        
+        segments = []
+        step = max(self.words_per_chunk - self.overlap_words, 1)
+        for start in range(0, len(words), step):
+            end = min(start + self.words_per_chunk, len(words))
+            segment = text[words[start][0]:words[end - 1][1]]
+            segments.append((f"words {start + 1}-{end}", segment.encode('utf-8')))
+            if end == len(words):
+                break
+        return segments
+
+
+class AudioChunker(Chunker):
+    """Overlapping time windows, each written as a WAV segment"""
+    
+    extensions = AudioPreprocessor.extensions
+    
+    def __init__(self, window_seconds=120, overlap_seconds=5):
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+    
+    def split(self, data):
+        samples, rate = decode_audio(data)
+        window = int(self.window_seconds * rate)
+        if len(samples) <= window:
+            return None
+        
+        segments = []
+        step = max(window - int(self.overlap_seconds * rate), 1)
+        for start in range(0, len(samples), step):
+            end = min(start + window, len(samples))
+            label = f"{self._clock(start / rate)}-{self._clock(end / rate)}"
+            segments.append((label, encode_wav(samples[start:end], rate)))
+            if end == len(samples):
+                break
+        return segments
+    
+    @staticmethod
+    def _clock(seconds):
+        return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+class StageTimer:
+    """Per-request stage timings (ms); code anywhere on the request path adds to the active timer with StageTimer.stage()"""
+    
+    current = contextvars.ContextVar('dragon_stage_timer', default=None)
+    
+    def __init__(self):
+        self.start = time.monotonic()
+        self.stages = {}
+        self.profile = None
+        self.thread_profiles = None  # A list while the request is being profiled: one profile per worker-thread call
+        self._lock = threading.Lock()
+    
+    @contextlib.contextmanager
+    def active(self):
+        """Make this the request's timer (the context follows to_thread and I/O-loop calls made inside the block)"""
+        token = self.current.set(self)
+        try:
+            yield self
+        finally:
+            self.current.reset(token)
+    
+    @classmethod
+    @contextlib.contextmanager
+    def stage(cls, name):
+        """Add the block's wall time to a stage of the active timer (a no-op when no request is being timed)"""
+        timer = cls.current.get()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            if timer is not None:
+                timer.add(name, time.monotonic() - start)
+    
+    async def track(self, awaitable):
+        """Await inside this timer's context (async generators cannot hold one across their yields)"""
+        with self.active():
+            return await awaitable
+    
+    def call(self, func, *args, **kwargs):
+        """Run func (in a worker thread), under its own profiler when this request is being profiled"""
+        if self.thread_profiles is None:
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return func(*args, **kwargs)  # Python 3.12+ profiles process-wide, so the request's profiler already sees this thread
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                self.thread_profiles.append(profiler)
+    
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = round(self.stages.get(name, 0) + seconds * 1000, 1)
+    
+    def snapshot(self):
+        """Latency so far plus every stage recorded (concurrent calls, e.g. map-reduce segments, are summed)"""
+        with self._lock:
+            timings = {'latency_ms': round((time.monotonic() - self.start) * 1000, 1), 'stages': dict(self.stages)}
+        if self.profile:
+            timings['profile'] = self.profile
+        return timings
+
+
+class Metrics:
+    """Thread-safe counters, histograms and scrape-time gauges, exported in the Prometheus text format"""
+    
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+    
     def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}  # name -> (kind, description, buckets)
+        self._samples = {}  # name -> {labels: value}, or {labels: [bucket counts, sum, count]} for histograms
+        self._gauges = {}  # name -> {labels: callback}
+    
+    def _declare(self, name, kind, description, buckets=None):
+        with self._lock:
+            if name not in self._families:
+                self._families[name] = (kind, description, buckets)
+                self._samples[name] = {}
+                self._gauges[name] = {}
+    
+    def counter(self, name, description):
+        self._declare(name, 'counter', description)
+    
+    def histogram(self, name, description, buckets=LATENCY_BUCKETS):
+        self._declare(name, 'histogram', description, tuple(sorted(buckets)))
+    
+    def gauge(self, name, description, callback, **labels):
+        """Register a gauge read at scrape time (registering the same labels again replaces the callback)"""
+        self._declare(name, 'gauge', description)
+        with self._lock:
+            self._gauges[name][self._key(labels)] = callback
+    
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+    
+    def inc(self, name, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            samples = self._samples[name]
+            samples[key] = samples.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        key = self._key(labels)
+        buckets = self._families[name][2]
+        with self._lock:
+            sample = self._samples[name].get(key)
+            if sample is None:
+                sample = self._samples[name][key] = [[0] * len(buckets), 0.0, 0]
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+    
+    @staticmethod
+    def _format_labels(key, extra=()):
+        items = key + tuple(extra)
+        if not items:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in items)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + '}'
+    
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            families = sorted(self._families.items())
+            samples = {name: {key: [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+                              for key, value in values.items()} for name, values in self._samples.items()}
+            gauges = {name: dict(callbacks) for name, callbacks in self._gauges.items()}
+        
+        lines = []
+        for name, (kind, description, buckets) in families:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'gauge':
+                for key, callback in gauges[name].items():
+                    try:
+                        lines.append(f"{name}{self._format_labels(key)} {callback()}")
+                    except Exception as e:
+                        print(f"Metrics gauge {name} failed: {e}")
+            elif kind == 'counter':
+                for key, value in samples[name].items():
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+            else:
+                for key, (counts, total, count) in samples[name].items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{self._format_labels(key, [('le', repr(float(bound)))])} {cumulative}")
+                    lines.append(f"{name}_bucket{self._format_labels(key, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {total}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def metrics_route(metrics, path="/metrics"):
+    """Starlette route serving a Metrics registry, for mounting on Gradio's app"""
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    
+    def endpoint(request):
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    return Route(path, endpoint, methods=["GET"])
+
+
+class TransportFailure(str):
+    """Error message for a provider that could not be reached (counts against the provider's breaker, not just the model's)"""
+
+
+def provider_error(name, error):
+    """'<name> error: ...' for an exception raised calling a provider, a TransportFailure when no answer came back"""
+    message = f"{name} error: {error}"
+    return TransportFailure(message) if isinstance(error, httpx.TransportError) else message
+
+
+class CircuitBreaker:
+    """Circuit breaker with a health score: closed -> open after N failures -> half-open probe -> closed"""
+    
+    def __init__(self, failure_threshold=3, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.health = 1.0  # Exponentially weighted success rate
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Whether a call may go through now (in half-open state only one probe is let through)"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = 'half_open'
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probe_in_flight = False
+            self.health = 0.8 * self.health + 0.2
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            self.health = 0.8 * self.health
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+    
+    def release(self):
+        """Give back a half-open probe whose call was abandoned"""
+        with self._lock:
+            self.probe_in_flight = False
+    
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(self.recovery_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+
+class AdmissionQueue:
+    """FIFO admission: at most max_active holders at once and max_waiting in line (None: unbounded), the rest turned away"""
+    
+    def __init__(self, max_active, max_waiting=None):
+        self.max_active = max(int(max_active), 1)
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.service_time = None  # Exponentially weighted seconds a holder keeps its slot, for ETAs
+        self._waiting = deque()
+        self._lock = threading.Lock()
+    
+    def enter(self, bounded=True):
+        """A ticket (concurrent Future, awaitable from any thread or loop) resolved on admission, or None when the line is full
+        (bounded=False always joins the line, for callers with a bound of their own such as batch workers)"""
+        ticket = Future()
+        with self._lock:
+            if self.active < self.max_active and not self._waiting:
+                self.active += 1
+                self.admitted += 1
+                ticket.set_result(True)
+            elif bounded and self.max_waiting is not None and len(self._waiting) >= self.max_waiting:
+                self.rejected += 1
+                return None
+            else:
+                self._waiting.append(ticket)
+        return ticket
+    
+    def release(self, ticket, seconds=None):
+        """Leave the line if still waiting, otherwise hand the slot to the next in line"""
+        with self._lock:
+            if ticket.cancelled() or not ticket.done():
+                ticket.cancel()
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                return
+            if seconds is not None:
+                self.service_time = seconds if self.service_time is None else 0.8 * self.service_time + 0.2 * seconds
+            while self._waiting:
+                waiter = self._waiting.popleft()
+                # Skips waiters whose caller gave up (a cancelled await cancels the ticket)
+                if waiter.set_running_or_notify_cancel():
+                    self.admitted += 1
+                    waiter.set_result(True)
+                    return
+            self.active -= 1
+    
+    def position(self, ticket):
+        """1-based place in line (0 once admitted)"""
+        with self._lock:
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+    
+    def eta(self, position):
+        """Estimated seconds until the waiter at this position is admitted (None until a service time is known)"""
+        if self.service_time is None:
+            return None
+        return math.ceil(position / self.max_active) * self.service_time
+    
+    def waiting(self):
+        with self._lock:
+            return len(self._waiting)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'max_active': self.max_active,
+                'max_waiting': self.max_waiting,
+                'active': self.active,
+                'waiting': len(self._waiting),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'service_seconds': round(self.service_time, 3) if self.service_time is not None else None
+            }
+
+
+class ModelResidency:
+    """Ollama model usage (exponentially decayed request counts), when each model is due to be unloaded, and cold versus warm latency"""
+    
+    def __init__(self, half_life=1800.0, cold_threshold=0.5):
+        self.half_life = half_life
+        self.cold_threshold = cold_threshold  # Seconds of model loading above which a response was a cold start
+        self._models = {}
+        self._lock = threading.Lock()
+    
+    def _entry(self, model):
+        entry = self._models.get(model)
+        if entry is None:
+            entry = self._models[model] = {'score': 0.0, 'scored_at': time.monotonic(), 'requests': 0, 'expires': None, 'loads': 0,
+                                           'cold': 0, 'warm': 0, 'cold_seconds': deque(maxlen=200), 'warm_seconds': deque(maxlen=200)}
+        return entry
+    
+    def _score(self, entry, now):
+        return entry['score'] * 0.5 ** ((now - entry['scored_at']) / self.half_life)
+    
+    def used(self, model):
+        """Count one request for the model (a request half_life seconds ago weighs half as much)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(model)
+            entry['score'] = self._score(entry, now) + 1
+            entry['scored_at'] = now
+            entry['requests'] += 1
+    
+    def answered(self, model, keep_alive_seconds, load_seconds=None, seconds=None):
+        """Record a response (Ollama keeps the model loaded keep_alive_seconds from now); returns whether it was a cold start"""
+        cold = load_seconds is not None and load_seconds >= self.cold_threshold
+        with self._lock:
+            entry = self._entry(model)
+            entry['expires'] = time.monotonic() + keep_alive_seconds
+            entry['loads'] += cold
+            if seconds is not None:
+                kind = 'cold' if cold else 'warm'
+                entry[kind] += 1
+                entry[f"{kind}_seconds"].append(seconds)
+        return cold
+    
+    def expiring(self, models, within):
+        """The models not known to be loaded, or due to be unloaded within the given seconds"""
+        deadline = time.monotonic() + within
+        with self._lock:
+            expires = {model: self._models[model]['expires'] if model in self._models else None for model in models}
+        return [model for model, at in expires.items() if at is None or at <= deadline]
+    
+    def hottest(self, limit, min_score=0.0):
+        """Up to limit models by decayed request count (at least min_score), most used first"""
+        now = time.monotonic()
+        with self._lock:
+            scores = [(self._score(entry, now), model) for model, entry in self._models.items()]
+        return [model for score, model in sorted(scores, reverse=True) if score >= min_score][:limit]
+    
+    @staticmethod
+    def _median_ms(values):
+        values = sorted(values)
+        return round(values[len(values) // 2] * 1000, 1) if values else None
+    
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            entries = {model: dict(entry) for model, entry in self._models.items()}
+        stats = {}
+        for model, entry in sorted(entries.items()):
+            expires = entry['expires']
+            stats[model] = {
+                'requests': entry['requests'],
+                'score': round(self._score(entry, now), 2),
+                'loaded': expires is not None and expires > now,
+                'expires_in_s': None if expires is None else -1 if expires == math.inf else round(max(expires - now, 0), 1),
+                'loads': entry['loads'],
+                'cold_requests': entry['cold'],
+                'warm_requests': entry['warm'],
+                'cold_p50_ms': self._median_ms(entry['cold_seconds']),
+                'warm_p50_ms': self._median_ms(entry['warm_seconds'])
+            }
+        return stats
+
+
+class ResultCache:
+    """Two-tier (memory LRU + on-disk) cache of analysis results keyed by content hash, model and prompt"""
+    
+    # Entries are written with their expiry first, so eviction reads a few bytes instead of whole files
+    EXPIRES_HEAD = re.compile(rb'^\{"expires": ([0-9.eE+-]+)')
+    
+    def __init__(self, cache_dir, ttl=86400, max_memory_bytes=32 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.disk = DiskLRU(cache_dir, '.json', max_disk_bytes, expiry=self._stored_expiry)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(content_hash, model, prompt):
+        """Build the cache key for one input/model/prompt combination"""
+        return hashlib.sha256(f"{content_hash}\0{model}\0{prompt}".encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        """Return the cached entry for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry['expires'] > now:
+                    self._memory.move_to_end(key)
+                    self.hits['memory'] += 1
+                    return entry
+                self._drop_memory(key)
+        
+        data = self.disk.read(key)
+        try:
+            entry = json.loads(data) if data is not None else None
+        except ValueError:
+            entry = None
+        if entry is None or entry.get('expires', 0) <= now:
+            if entry is not None:
+                self.disk.remove(key)
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self._store_memory(key, entry)
+            self.hits['disk'] += 1
+        return entry
+    
+    def put(self, key, result, api_used, model, ttl=None):
+        """Store a result in both tiers"""
+        now = time.time()
+        entry = {
+            'expires': now + (self.ttl if ttl is None else ttl),  # First, so eviction can read it from the file's head
+            'result': result,
+            'api_used': api_used,
+            'model': model,
+            'created': now
+        }
+        with self._lock:
+            self._store_memory(key, entry)
+        
+        try:
+            self.disk.write(key, json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            print(f"Result cache write error: {e}")
+    
+    def _entry_size(self, entry):
+        return len(entry['result'].encode('utf-8')) + 256
+    
+    def _store_memory(self, key, entry):
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = entry
+        self._memory_bytes += self._entry_size(entry)
+        # Size-based LRU eviction
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            self._drop_memory(next(iter(self._memory)))
+    
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key)
+        self._memory_bytes -= self._entry_size(entry)
+    
+    @classmethod
+    def _stored_expiry(cls, path):
+        """An entry's own expiry time, read from the head of its file (older entries are parsed whole)"""
+        try:
+            with open(path, 'rb') as f:
+                match = cls.EXPIRES_HEAD.match(f.read(64))
+                if match:
+                    return float(match.group(1))
+                f.seek(0)
+                return float(json.load(f).get('expires', 0))
+        except (OSError, ValueError):
+            return 0.0
+    
+    def clear(self):
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        self.disk.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self.disk.size,
+                'hits': dict(self.hits),
+                'misses': self.misses
+            }
+
+
+class BatchedLogWriter:
+    """Background thread that drains a bounded queue of log entries into batched writes"""
+    
+    def __init__(self, write_batch, max_queue=10000, max_batch=256, linger=0.05, on_idle=None, idle_interval=1.0):
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.linger = linger
+        # Called after idle_interval seconds without entries and once more before the thread exits
+        self.on_idle = on_idle
+        self.idle_interval = idle_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._unwritten = deque()
+        self._unwritten_lock = threading.Lock()
+        # Held across the closed check and the enqueue, so no entry can be queued after the stop marker
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self.batches_written = 0
+        self.entries_written = 0
+        self._thread = threading.Thread(target=self._run, name="dragon-log-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, entry):
+        """Queue an entry for writing (only blocks if the queue is full)"""
+        with self._submit_lock:
+            if not self._closed:
+                with self._unwritten_lock:
+                    self._unwritten.append(entry)
+                self._queue.put(entry)
+                return
+        # Writer already drained - write synchronously rather than lose the entry
+        self.write_batch([entry])
+    
+    def pending(self):
+        """Entries submitted but not yet written"""
+        with self._unwritten_lock:
+            return list(self._unwritten)
+    
+    def queue_depth(self):
+        return self._queue.qsize()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.idle_interval if self.on_idle else None)
+            except queue.Empty:
+                self._idle()
+                continue
+            batch = [] if item is None else [item]
+            stopping = item is None
+            
+            # Group entries that arrive within the linger window
+            deadline = time.monotonic() + self.linger
+            while not stopping and len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            
+            if batch:
+                try:
+                    self.write_batch(batch)
+                    self.batches_written += 1
+                    self.entries_written += len(batch)
+                except Exception as e:
+                    print(f"Logging error: {e}")
+                with self._unwritten_lock:
+                    for _ in batch:
+                        self._unwritten.popleft()
+            if stopping:
+                self._idle()
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+    
+    def _idle(self):
+        if self.on_idle is not None:
+            try:
+                self.on_idle()
+            except Exception as e:
+                print(f"Logging error: {e}")
+    
+    def flush(self):
+        """Block until every queued entry has been written"""
+        self._queue.join()
+    
+    def close(self, timeout=10):
+        """Drain the queue and stop the writer thread"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+
+def entry_latency_ms(entry):
+    """Request latency recorded in a log entry (streamed entries from before stage timing only have total_ms)"""
+    performance = entry.get('performance') or {}
+    return performance.get('latency_ms', performance.get('total_ms'))
+
+
+def log_entry_key(entry):
+    """Stable ID of a JSONL log entry (its timestamp and file hash), unaffected by entries logged after it"""
+    return f"{entry['timestamp']}#{(entry.get('file_hash') or '')[:12]}"
+
+
+class LogSegments:
+    """The active JSONL log plus its gzip-compressed archives (dragon*_logs.<rotated at>.jsonl.gz), read as one log"""
+    
+    STAMP_FORMAT = "%Y%m%d-%H%M%S-%f"
+    # Last lines of the newest archive kept in memory, so tail() rarely has to decompress one
+    TAIL_CACHE_LINES = 500
+    
+    def __init__(self, path, max_bytes=0, max_age=0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Held while listing and opening segments and around renames, so a reader never sees a segment twice or not at all
+        self.lock = threading.RLock()
+        self._started = None
+        self._archive_tail = None  # (archive stamp, last lines, whether they are the whole archive)
+    
+    @staticmethod
+    def open(path, raw=None):
+        """Open a segment (or wrap its already open binary file) for reading text, decompressing archives"""
+        if raw is None:
+            raw = open(path, 'rb')
+        if str(path).endswith('.gz'):
+            raw = gzip.GzipFile(fileobj=raw, mode='rb')
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    
+    def _open_segments(self):
+        """[(path, binary file)] for every segment, newest first. They are opened under the lock and read after it is
+        released: an open file keeps its contents through a later rotation, compression or compaction"""
+        opened = []
+        with self.lock:
+            for path in self.segments():
+                try:
+                    opened.append((path, open(path, 'rb')))
+                except FileNotFoundError:
+                    continue
+        return opened
+    
+    def _stamp(self, path):
+        return path.name[len(self.path.stem) + 1:].split('.', 1)[0]
+    
+    def archives(self):
+        """Archived segments, newest first (a finished .gz wins over the plain file it is replacing)"""
+        by_stamp = {}
+        for name in glob.glob(glob.escape(str(self.path.with_name(self.path.stem))) + '.*' + self.path.suffix + '*'):
+            archive = Path(name)
+            if archive.suffix == '.tmp':
+                continue
+            stamp = self._stamp(archive)
+            if archive.suffix == '.gz' or stamp not in by_stamp:
+                by_stamp[stamp] = archive
+        return [by_stamp[stamp] for stamp in sorted(by_stamp, reverse=True)]
+    
+    def segments(self):
+        """Every segment, newest first: the active file, then the archives"""
+        return ([self.path] if self.path.exists() else []) + self.archives()
+    
+    def exists(self):
+        return bool(self.segments())
+    
+    def due(self):
+        """Whether the active file has reached its size or age limit"""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        if self.max_age and size:
+            if self._started is None:
+                self._started = self._first_timestamp()
+            return time.time() - self._started >= self.max_age
+        return False
+    
+    def _first_timestamp(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return datetime.fromisoformat(json.loads(f.readline())['timestamp']).timestamp()
+        except (ValueError, KeyError, TypeError):
+            return self.path.stat().st_mtime
+    
+    def rotate(self):
+        """Move the active file into a new compressed archive, returning its path (None when there was nothing to rotate)"""
+        with self.lock:
+            if not self.path.exists() or not self.path.stat().st_size:
+                return None
+            plain = self.path.with_name(f"{self.path.stem}.{datetime.now().strftime(self.STAMP_FORMAT)}{self.path.suffix}")
+            with open(self.path, 'rb') as f:
+                lines, whole = self._last_lines(f, self.TAIL_CACHE_LINES, INGEST_CHUNK_SIZE)
+            os.replace(self.path, plain)
+            self._archive_tail = (self._stamp(plain), lines, whole)
+            self._started = None
+        # Compression runs outside the lock (readers use the plain file until it finishes), catching up on any
+        # segment an interrupted rotation left uncompressed
+        compressed = [self._compress(pending) for pending in self.archives() if pending.suffix != '.gz']
+        return compressed[0] if compressed else None
+    
+    def _compress(self, plain):
+        archive = plain.with_name(plain.name + '.gz')
+        tmp = archive.with_name(archive.name + '.tmp')
+        with open(plain, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst, INGEST_CHUNK_SIZE)
+        with self.lock:
+            os.replace(tmp, archive)
+            plain.unlink()
+        return archive
+    
+    def lines(self):
+        """Every raw line, archives oldest first and then the active file"""
+        opened = self._open_segments()
+        try:
+            for path, raw in reversed(opened):
+                yield from self.open(path, raw)
+        finally:
+            for _, raw in opened:
+                raw.close()
+    
+    def find(self, timestamp, match):
+        """The first entry logged at `timestamp` (ISO) for which match(entry) holds, or None, reading only the
+        segments that can hold it"""
+        opened = self._open_segments()
+        try:
+            for path, raw in reversed(opened):
+                # Every entry in an archive predates its rotation stamp
+                if path != self.path and datetime.strptime(self._stamp(path), self.STAMP_FORMAT).isoformat() < timestamp:
+                    continue
+                for line in self.open(path, raw):
+                    # Cheap substring check before paying for a full parse
+                    if timestamp not in line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('timestamp') == timestamp and match(entry):
+                        return entry
+            return None
+        finally:
+            for _, raw in opened:
+                raw.close()
+    
+    def tail(self, limit, block_size=64 * 1024):
+        """The last `limit` entries (oldest first), reading older segments only while more are needed"""
+        entries = []
+        opened = self._open_segments()
+        newest = next((path for path, _ in opened if path != self.path), None)
+        try:
+            for path, raw in opened:
+                if len(entries) >= limit:
+                    break
+                needed = limit - len(entries)
+                if path == self.path:
+                    lines, _ = self._last_lines(raw, needed, block_size)
+                else:
+                    lines = self._archive_lines(path, raw, needed, block_size, newest=path == newest)
+                entries = self._parse_tail(lines, needed) + entries
+        finally:
+            for _, raw in opened:
+                raw.close()
+        return entries
+    
+    def _archive_lines(self, path, raw, count, block_size, newest):
+        """The last `count` lines of an archive, from the in-memory tail of the newest one when it holds enough"""
+        stamp = self._stamp(path)
+        cached = self._archive_tail
+        if cached is not None and cached[0] == stamp and (cached[2] or len(cached[1]) >= count):
+            return cached[1]
+        if path.suffix != '.gz':
+            return self._last_lines(raw, count, block_size)[0]
+        
+        # Gzip cannot seek backward, so stream the archive keeping only the last lines (bounded by the rotation size)
+        keep = max(count, self.TAIL_CACHE_LINES) if newest else count
+        read = 0
+        lines = deque(maxlen=keep)
+        for line in self.open(path, raw):
+            lines.append(line)
+            read += 1
+        lines = list(lines)
+        if newest:
+            with self.lock:
+                self._archive_tail = (stamp, lines, read <= keep)
+        return lines
+    
+    @staticmethod
+    def _parse_tail(lines, limit):
+        entries = []
+        for line in reversed(lines):
+            if len(entries) >= limit:
+                break
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # Skip a partially written line
+        entries.reverse()
+        return entries
+    
+    @staticmethod
+    def _last_lines(f, count, block_size):
+        """The last `count` raw lines of a plain binary file and whether they are all of it, seeking backward from
+        the end: cost depends on count (and line size), not on the size of the file"""
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b''
+        while position > 0 and buffer.count(b'\n') <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+        
+        lines = buffer.splitlines()
+        if position > 0:
+            lines = lines[1:]  # First line may start mid-entry
+        return lines[-count:] if count else [], position == 0 and len(lines) <= count
+    
+    def compact(self, drop_before, trim_before, trim_chars, marker, output_key):
+        """Drop entries older than drop_before and trim outputs older than trim_before (ISO timestamps) in the archives"""
+        stats = {'segments': 0, 'segments_removed': 0, 'entries_dropped': 0, 'outputs_trimmed': 0, 'bytes_before': 0, 'bytes_after': 0}
+        for archive in self.archives():
+            stats['segments'] += 1
+            size = archive.stat().st_size
+            stats['bytes_before'] += size
+            
+            # Every entry predates the rotation stamp, so whole segments past retention go unread
+            rotated_at = datetime.strptime(self._stamp(archive), self.STAMP_FORMAT).isoformat()
+            if rotated_at < drop_before:
+                with self.open(archive) as f:
+                    stats['entries_dropped'] += sum(1 for line in f if line.strip())
+                with self.lock:
+                    archive.unlink()
+                stats['segments_removed'] += 1
+                continue
+            
+            # A plain (not yet compressed) archive is replaced by its compacted .gz
+            target = archive if archive.suffix == '.gz' else archive.with_name(archive.name + '.gz')
+            tmp = target.with_name(target.name + '.tmp')
+            changed = False
+            kept = 0
+            with self.open(archive) as src, gzip.open(tmp, 'wt', encoding='utf-8') as dst:
+                for line in src:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        changed = True  # Drop unreadable lines
+                        continue
+                    timestamp = entry.get('timestamp') or ''
+                    if timestamp < drop_before:
+                        stats['entries_dropped'] += 1
+                        changed = True
+                        continue
+                    output = entry.get(output_key) or ''
+                    if timestamp < trim_before and len(output) > trim_chars + len(marker):
+                        entry[output_key] = output[:trim_chars] + marker
+                        line = json.dumps(entry, ensure_ascii=False) + '\n'
+                        stats['outputs_trimmed'] += 1
+                        changed = True
+                    dst.write(line)
+                    kept += 1
+            
+            with self.lock:
+                if changed and self._archive_tail is not None and self._archive_tail[0] == self._stamp(archive):
+                    self._archive_tail = None
+                if not changed:
+                    tmp.unlink()
+                    stats['bytes_after'] += size
+                elif not kept:
+                    tmp.unlink()
+                    archive.unlink()
+                    stats['segments_removed'] += 1
+                else:
+                    os.replace(tmp, target)
+                    if archive != target:
+                        archive.unlink()
+                    stats['bytes_after'] += target.stat().st_size
+        return stats
+
+
+class SQLiteLogStore:
+    """Indexed SQLite store for analysis history with full-text search over outputs and tags"""
+    
+    COLUMNS = ('timestamp', 'file_path', 'file_name', 'file_hash', 'model_used', 'api_used', 'prompt', 'output', 'tags', 'word_count', 'metadata',
+               'comparison_id', 'performance', 'latency_ms')
+    # Columns added after the first release, with their types (created on older databases at startup)
+    ADDED_COLUMNS = (('comparison_id', 'TEXT'), ('performance', 'TEXT'), ('latency_ms', 'REAL'))
+    
+    def __init__(self, db_path, output_key):
+        self.db_path = Path(db_path)
+        self.output_key = output_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+    
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    file_path TEXT,
+                    file_name TEXT,
+                    file_hash TEXT,
+                    model_used TEXT,
+                    api_used TEXT,
+                    prompt TEXT,
+                    output TEXT,
+                    tags TEXT,
+                    word_count INTEGER,
+                    metadata TEXT,
+                    comparison_id TEXT,
+                    performance TEXT,
+                    latency_ms REAL,
+                    UNIQUE (timestamp, file_name, model_used)
+                );
+                CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_analyses_model ON analyses (model_used);
+                CREATE INDEX IF NOT EXISTS idx_analyses_api ON analyses (api_used);
+                CREATE INDEX IF NOT EXISTS idx_analyses_file_hash ON analyses (file_hash);
+            """)
+            # Databases created by earlier versions lack the newer columns
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(analyses)")}
+            for column, column_type in self.ADDED_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE analyses ADD COLUMN {column} {column_type}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_comparison ON analyses (comparison_id)")
+            try:
+                self._conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5 (
+                        output, tags, content='analyses', content_rowid='id'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS analyses_ai AFTER INSERT ON analyses BEGIN
+                        INSERT INTO analyses_fts (rowid, output, tags) VALUES (new.id, new.output, new.tags);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS analyses_ad AFTER DELETE ON analyses BEGIN
+                        INSERT INTO analyses_fts (analyses_fts, rowid, output, tags) VALUES ('delete', old.id, old.output, old.tags);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS analyses_au AFTER UPDATE OF output, tags ON analyses BEGIN
+                        INSERT INTO analyses_fts (analyses_fts, rowid, output, tags) VALUES ('delete', old.id, old.output, old.tags);
+                        INSERT INTO analyses_fts (rowid, output, tags) VALUES (new.id, new.output, new.tags);
+                    END;
+                """)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5 - fall back to LIKE searches
+                self.has_fts = False
+    
+    def _row_values(self, entry):
+        metadata = entry.get('metadata') or {}
+        return (
+            entry.get('timestamp'),
+            entry.get('file_path'),
+            entry.get('file_name'),
+            entry.get('file_hash'),
+            entry.get('model_used'),
+            entry.get('api_used'),
+            entry.get('prompt'),
+            entry.get(self.output_key, ''),
+            ' '.join(metadata.get('tags', [])),
+            metadata.get('word_count'),
+            json.dumps(metadata, ensure_ascii=False),
+            entry.get('comparison_id'),
+            json.dumps(entry['performance']) if entry.get('performance') else None,
+            entry_latency_ms(entry)
+        )
+    
+    def insert_many(self, entries):
+        """Insert log entries (duplicates of already stored entries are ignored)"""
+        sql = f"INSERT OR IGNORE INTO analyses ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})"
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(sql, [self._row_values(e) for e in entries])
+        return cursor.rowcount
+    
+    def insert(self, entry):
+        return self.insert_many([entry])
+    
+    def _to_entry(self, row):
+        """Rebuild a JSONL-shaped log entry from a row"""
+        entry = {key: row[key] for key in row.keys()
+                 if key not in ('output', 'tags', 'word_count', 'metadata', 'comparison_id', 'performance', 'latency_ms')}
+        if row['comparison_id']:
+            entry['comparison_id'] = row['comparison_id']
+        if row['performance']:
+            entry['performance'] = json.loads(row['performance'])
+        entry[self.output_key] = row['output']
+        entry['metadata'] = json.loads(row['metadata']) if row['metadata'] else {'tags': []}
+        return entry
+    
+    def recent(self, limit):
+        """Most recent entries, oldest first (same order as the JSONL tail)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM analyses ORDER BY timestamp DESC, id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_entry(row) for row in reversed(rows)]
+    
+    def _where(self, search, model):
+        clauses, params = [], []
+        if search:
+            if self.has_fts:
+                clauses.append("id IN (SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH ?)")
+                # Quote each term so user input is never parsed as FTS syntax
+                params.append(' '.join('"' + term.replace('"', '""') + '"' for term in search.split()))
+            else:
+                clauses.append("(output LIKE ? OR tags LIKE ?)")
+                params.extend([f"%{search}%"] * 2)
+        if model:
+            clauses.append("model_used = ?")
+            params.append(model)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def page(self, page=1, page_size=25, search='', model=None):
+        """One page of summaries (without full outputs), newest first, plus the total match count"""
+        where, params = self._where(search, model)
+        offset = max(page - 1, 0) * page_size
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT id, timestamp, file_name, model_used, api_used, tags, word_count, latency_ms FROM analyses{where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [page_size, offset]
+            ).fetchall()
+        return [dict(row) for row in rows], total
+    
+    def logged_hashes(self, model, prompt):
+        """File hashes already analyzed with this model and prompt"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT file_hash FROM analyses WHERE model_used = ? AND prompt = ? AND file_hash IS NOT NULL",
+                (model, prompt)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def get_output(self, entry_id):
+        """Load one full output on demand"""
+        with self._lock:
+            row = self._conn.execute("SELECT output FROM analyses WHERE id = ?", (entry_id,)).fetchone()
+        return row['output'] if row else None
+    
+    def import_jsonl(self, path, batch_size=1000):
+        """Migrate a JSONL log file into the store, returning the number of new rows"""
+        imported = 0
+        batch = []
+        with LogSegments.open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= batch_size:
+                    imported += self.insert_many(batch)
+                    batch = []
+        if batch:
+            imported += self.insert_many(batch)
+        return imported
+    
+    def compact(self, drop_before, trim_before, trim_chars, marker):
+        """Delete rows older than drop_before and trim outputs older than trim_before (ISO timestamps), then reclaim space"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # Fold the WAL in first, so both sizes are the whole store
+            bytes_before = self._size()
+            with self._conn:
+                dropped = self._conn.execute("DELETE FROM analyses WHERE timestamp < ?", (drop_before,)).rowcount
+                trimmed = self._conn.execute(
+                    "UPDATE analyses SET output = substr(output, 1, ?) || ? WHERE timestamp < ? AND length(output) > ?",
+                    (trim_chars, marker, trim_before, trim_chars + len(marker))
+                ).rowcount
+            if dropped or trimmed:
+                self._conn.execute("VACUUM")
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            bytes_after = self._size()
+        return {'entries_dropped': dropped, 'outputs_trimmed': trimmed, 'bytes_before': bytes_before, 'bytes_after': bytes_after}
+    
+    def _size(self):
+        """Bytes on disk: the database file plus its write-ahead log"""
+        wal = self.db_path.with_name(self.db_path.name + '-wal')
+        return self.db_path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DragonRuntime:
+    """Event loop, per-provider connection pools and limits, model discovery and metrics behind one or more Dragons
+    (each Dragon creates its own unless given one, e.g. by dragon_host.py serving several variants)"""
+    
+    # Seconds a provider's model listing is reused, so one refresh round queries each provider once for every Dragon
+    LISTING_TTL = 5.0
+    # Keep-alive connections for a provider no registered Dragon configures a pool_maxsize for
+    DEFAULT_POOL_MAXSIZE = 4
+    
+    def __init__(self, name="dragon", metrics=None, model_cache_ttl=60):
+        self.name = name
+        self.metrics = metrics or Metrics()
+        self.model_cache_ttl = model_cache_ttl
+        self.keepalive = {}  # provider -> keep-alive budget summed over the registered Dragons
+        self.clients = {}  # provider -> its own connection pool, so one provider cannot use up another's connections
+        self._client_keepalive = {}
+        self._retired_clients = []
+        self.provider_queues = {}
+        self._dragons = []
+        self._listings = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresher = None
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name=f"{name}-io", daemon=True)
+        self.loop_thread.start()
+    
+    def register(self, dragon, discover_models=True):
+        """Add a Dragon: its keep-alive budgets join each provider's pool and the refresher keeps its model list warm"""
+        with self._lock:
+            for provider, settings in dragon.http_config.items():
+                self.keepalive[provider] = self.keepalive.get(provider, 0) + settings.get('pool_maxsize', self.DEFAULT_POOL_MAXSIZE)
+            if discover_models:
+                self._dragons.append(dragon)
+                if self._refresher is None:
+                    self._refresher = threading.Thread(target=self._refresh_models_loop, name=f"{self.name}-models", daemon=True)
+                    self._refresher.start()
+    
+    def unregister(self, dragon):
+        with self._lock:
+            if dragon in self._dragons:
+                self._dragons.remove(dragon)
+    
+    def _refresh_models_loop(self):
+        """Background thread: refresh every registered Dragon's model registry every TTL seconds"""
+        while not self._stop_event.is_set():
+            with self._lock:
+                dragons = list(self._dragons)
+            for dragon in dragons:
+                dragon.refresh_models()
+            self._stop_event.wait(max(self.model_cache_ttl, 1))
+    
+    def listing(self, key, fetch):
+        """fetch() result shared by every Dragon asking for the same key within LISTING_TTL (failures are not cached)"""
+        with self._lock:
+            cached = self._listings.get(key)
+        if cached and time.monotonic() - cached[0] < self.LISTING_TTL:
+            return cached[1]
+        value = fetch()
+        with self._lock:
+            self._listings[key] = (time.monotonic(), value)
+        return value
+    
+    def http_client(self, provider):
+        """The provider's async connection pool, created on the I/O loop at first use and rebuilt when Dragons registered
+        since then have grown its keep-alive budget"""
+        keepalive = max(self.keepalive.get(provider, self.DEFAULT_POOL_MAXSIZE), 1)
+        client = self.clients.get(provider)
+        if client is None or keepalive > self._client_keepalive[provider]:
+            if client is not None:
+                # Requests already under way finish on the old pool, which is closed with the runtime
+                self._retired_clients.append(client)
+            client = self.clients[provider] = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=keepalive),
+                timeout={{TIMEOUT_SECONDS}}
+            )
+            self._client_keepalive[provider] = keepalive
+        return client
+    
+    def provider_queue(self, provider, limit):
+        """The provider's concurrency limiter, shared by every Dragon calling it (the first limit configured wins)"""
+        with self._lock:
+            if provider not in self.provider_queues:
+                admission = self.provider_queues[provider] = AdmissionQueue(limit) if limit else None
+                if admission is not None:
+                    self.metrics.gauge('dragon_provider_active', "Provider calls holding a concurrency slot",
+                                       lambda: admission.active, provider=provider)
+                    self.metrics.gauge('dragon_provider_waiting', "Provider calls waiting for a concurrency slot",
+                                       admission.waiting, provider=provider)
+            return self.provider_queues[provider]
+    
+    def close(self):
+        """Stop the refresher, close the connection pools and stop the I/O loop"""
+        self._stop_event.set()
+        if self.loop.is_running():
+            for client in self._retired_clients + list(self.clients.values()):
+                asyncio.run_coroutine_threadsafe(client.aclose(), self.loop).result()
+            # Finish closing async generators left by abandoned streams (httpx's chain under a response), as asyncio.run does
+            asyncio.run_coroutine_threadsafe(self.loop.shutdown_asyncgens(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join(timeout=5)
+        if not self.loop.is_running() and not self.loop.is_closed():
+            self.loop.close()
+
+
+class Dragon{{CLASS_SUFFIX}}:
+    # Keep-alive connections, retry policy and concurrent requests per provider (override with http_config);
+    # calls beyond max_concurrency wait in line, so a local Ollama is not handed more than it can run
+    HTTP_DEFAULTS = {
+        'ollama': {'pool_maxsize': 8, 'retries': 2, 'backoff_factor': 0.2, 'max_concurrency': 4},
+        'openai': {'pool_maxsize': 4, 'retries': 3, 'backoff_factor': 0.5, 'max_concurrency': 16},
+        'google': {'pool_maxsize': 4, 'retries': 3, 'backoff_factor': 0.5, 'max_concurrency': 16},
+    }
+    RETRY_STATUSES = (429, 502, 503, 504)
+    # Seconds before the cached model list is refreshed in the background
+    MODEL_CACHE_TTL = 60
+    # Result cache: per-entry TTL (seconds) and size budgets for each tier
+    RESULT_CACHE_TTL = 24 * 60 * 60
+    RESULT_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+    RESULT_CACHE_DISK_BYTES = 512 * 1024 * 1024
+    # Background log writer: queue bound, batch size, and fsync policy ("always", "interval" or "never")
+    LOG_QUEUE_SIZE = 10000
+    LOG_BATCH_SIZE = 256
+    LOG_FSYNC = 'interval'
+    LOG_FSYNC_INTERVAL = 1.0
+    # JSONL rotation: archive the active file (gzip) once it reaches this size or age in seconds (0 disables either)
+    LOG_ROTATE_BYTES = 64 * 1024 * 1024
+    LOG_ROTATE_SECONDS = 30 * 24 * 60 * 60
+    # Retention applied by compact_logs() / --compact-logs: drop entries after N days, trim outputs after M days
+    LOG_RETENTION_DAYS = 365
+    LOG_TRIM_AFTER_DAYS = 90
+    LOG_TRIM_CHARS = 1000
+    LOG_TRIM_MARKER = " … [trimmed]"
+    # Hedged requests: start the next fallback when the primary is slower than this latency percentile
+    HEDGE_PERCENTILE = 95
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_DEFAULT_DELAY = 10.0
+    HEDGE_MIN_DELAY = 0.5
+    # Circuit breakers (per provider and per model)
+    BREAKER_FAILURE_THRESHOLD = 3
+    BREAKER_RECOVERY_TIMEOUT = 30.0
+    # Admission control: analyses running at once, and how many may wait for a slot before new ones are rejected
+    MAX_CONCURRENT_ANALYSES = 8
+    MAX_QUEUED_ANALYSES = 32
+    QUEUE_STATUS_INTERVAL = 1.0
+    # Ollama model residency: keep_alive sent with every request (seconds or a duration like "30m"; -1 keeps a model
+    # loaded, 0 unloads it at once), per-model overrides, models loaded at startup and kept loaded, and a scheduler
+    # that every interval reloads or refreshes the most used models before Ollama would unload them
+    OLLAMA_KEEP_ALIVE = "30m"
+    OLLAMA_MODEL_KEEP_ALIVE = {}
+    OLLAMA_PINNED_MODELS = []
+    OLLAMA_RESIDENT_MODELS = 2
+    OLLAMA_RESIDENT_MIN_SCORE = 2.0
+    OLLAMA_RESIDENCY_INTERVAL = 60.0
+    OLLAMA_USAGE_HALF_LIFE = 30 * 60
+    # A response whose model load took at least this long (seconds) counts as a cold start
+    OLLAMA_COLD_LOAD_SECONDS = 0.5
+    # Batch mode: worker pool size and concurrent requests allowed per provider
+    BATCH_MAX_WORKERS = 4
+    BATCH_PROVIDER_LIMITS = {'ollama': 2, 'openai': 8, 'google': 8}
+    # Relevant descriptors for your data type, tagged when they appear as whole words in an output
+    METADATA_DESCRIPTORS = {{METADATA_DESCRIPTORS}}
+    # Preprocessing before encoding: image size/quality, audio rate/channels, and the payload cache budget
+    PREPROCESS_MAX_DIMENSION = 1536
+    PREPROCESS_JPEG_QUALITY = 85
+    PREPROCESS_SAMPLE_RATE = 16000
+    PREPROCESS_CHANNELS = 1
+    PREPROCESS_CACHE_DISK_BYTES = 1024 * 1024 * 1024
+    # Map-reduce for oversized inputs: segment sizes/overlaps, concurrent segments, and reduce fan-in
+    CHUNK_PDF_PAGES = 10
+    CHUNK_PDF_OVERLAP_PAGES = 1
+    CHUNK_TEXT_WORDS = 1500
+    CHUNK_TEXT_OVERLAP_WORDS = 150
+    CHUNK_AUDIO_SECONDS = 120
+    CHUNK_AUDIO_OVERLAP_SECONDS = 5
+    CHUNK_MAX_CONCURRENCY = 4
+    CHUNK_REDUCE_FAN_IN = 8
+    CHUNK_MAP_PROMPT = "{prompt}\n\nThis is part {part} of {parts} ({label}) of a larger {{data_type}}. Analyze only this part."
+    CHUNK_REDUCE_PROMPT = (
+        "{prompt}\n\nThe {{data_type}} was too large to analyze at once, so each part was analyzed separately. "
+        "Combine these partial analyses into one coherent answer, removing repetition from overlapping parts:\n\n{notes}"
+    )
+    
+    def __init__(self, http_config=None, model_cache_ttl=None, use_result_cache=True, log_backend=None, log_fsync=None,
+                 hedging=None, discover_models=True, preprocessor=None, chunker=None, metrics=None, profile_rate=None,
+                 max_concurrency=None, max_queue=None, runtime=None, keep_alive=None, model_keep_alive=None, pinned_models=None,
+                 warm_up=None, resident_models=None, batch_root=None):
         self.ollama_url = "http://localhost:11434"
         # Add your API keys here
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
@@ -28,17 +1830,345 @@ class Dragon{{CLASS_SUFFIX}}:
         self.google_api_key = os.getenv('GOOGLE_{{API_TYPE}}_API_KEY')
         # Add more API keys as needed
         self.log_file = Path("dragon{{type}}_logs.jsonl")
+        self.log_segments = LogSegments(self.log_file, max_bytes=self.LOG_ROTATE_BYTES, max_age=self.LOG_ROTATE_SECONDS)
+        
+        # Optional indexed history ("jsonl" or "sqlite", also via DRAGON_LOG_BACKEND)
+        self.log_backend = log_backend or os.getenv('DRAGON_LOG_BACKEND', 'jsonl')
+        self.log_store = SQLiteLogStore(Path("dragon{{type}}_logs.db"), '{{output_key}}') if self.log_backend == 'sqlite' else None
+        
+        # Log writes happen off the request path, in batches
+        self.log_fsync = log_fsync or self.LOG_FSYNC
+        self._last_fsync = 0.0
+        self._unsynced = None  # Log file written since the last fsync ('interval' mode)
+        self.log_writer = BatchedLogWriter(self._write_log_batch, max_queue=self.LOG_QUEUE_SIZE, max_batch=self.LOG_BATCH_SIZE,
+                                           on_idle=self._sync_log, idle_interval=self.LOG_FSYNC_INTERVAL)
+        atexit.register(self.log_writer.close)
+        
+        # Optional hedging of slow primaries (also via DRAGON_HEDGING=1)
+        self.hedging = hedging if hedging is not None else os.getenv('DRAGON_HEDGING', '0') == '1'
+        self._latencies = {}
+        self._latencies_lock = threading.Lock()
+        
+        # Circuit breakers keyed by provider ("ollama") and by model ("ollama:llava")
+        self.breakers = {}
+        self._breakers_lock = threading.Lock()
+        
+        # Content-addressed cache so repeated uploads skip inference
+        self.result_cache = ResultCache(
+            Path("dragon{{type}}_cache"),
+            ttl=self.RESULT_CACHE_TTL,
+            max_memory_bytes=self.RESULT_CACHE_MEMORY_BYTES,
+            max_disk_bytes=self.RESULT_CACHE_DISK_BYTES
+        ) if use_result_cache else None
+        
+        # Shrink inputs before encoding (pass a Preprocessor to customize, False or DRAGON_PREPROCESS=0 to disable)
+        if preprocessor is None and os.getenv('DRAGON_PREPROCESS', '1') != '0':
+            preprocessor = self._default_preprocessor()
+        self.preprocessor = preprocessor or None
+        self.preprocess_cache = PreprocessCache(
+            Path("dragon{{type}}_cache") / "preprocessed",
+            max_disk_bytes=self.PREPROCESS_CACHE_DISK_BYTES
+        )
+        self.preprocess_stats = {'inputs': 0, 'processed': 0, 'cache_hits': 0, 'source_bytes': 0, 'payload_bytes': 0}
+        self._preprocess_lock = threading.Lock()
+        
+        # Split oversized inputs into segments (pass a Chunker to customize, False or DRAGON_CHUNKING=0 to disable)
+        if chunker is None and os.getenv('DRAGON_CHUNKING', '1') != '0':
+            chunker = self._default_chunker()
+        self.chunker = chunker or None
+        
+        # The one server folder the Batch tab may read from (also via DRAGON_BATCH_ROOT). Unset, batches take uploads only,
+        # since a shared app would otherwise let any visitor analyze any file the server can read
+        batch_root = batch_root if batch_root is not None else os.getenv('DRAGON_BATCH_ROOT', '')
+        self.batch_root = Path(batch_root).expanduser().resolve() if batch_root else None
+        
+        # Compiled once: tagging is one tokenization pass per output however many descriptors there are
+        self.metadata_matcher = MetadataMatcher(self.METADATA_DESCRIPTORS)
+        
+        # Bounded admission so a burst queues (and overflow is rejected fast) instead of every request timing out together
+        # (also via DRAGON_MAX_CONCURRENCY and DRAGON_MAX_QUEUE)
+        self.admission = AdmissionQueue(
+            max_concurrency if max_concurrency is not None else int(os.getenv('DRAGON_MAX_CONCURRENCY', self.MAX_CONCURRENT_ANALYSES)),
+            max_queue if max_queue is not None else int(os.getenv('DRAGON_MAX_QUEUE', self.MAX_QUEUED_ANALYSES))
+        )
+        
+        # Operational metrics, served at /metrics (pass a shared Metrics, or a shared runtime, to aggregate several Dragons)
+        self.metrics = metrics or (runtime.metrics if runtime is not None else Metrics())
+        self._register_metrics()
+        
+        # cProfile a sampled fraction of requests into dragon{{type}}_profiles/ (also via DRAGON_PROFILE_RATE, 0-1)
+        self.profile_dir = Path("dragon{{type}}_profiles")
+        self._profile_lock = threading.Lock()
+        self.set_profile_rate(profile_rate if profile_rate is not None else float(os.getenv('DRAGON_PROFILE_RATE', '0')))
+        
+        # All provider I/O runs as coroutines on one event loop sharing one keep-alive pool per provider;
+        # async callers await it from their own loop and the sync API blocks on it
+        self.http_config = {name: dict(settings) for name, settings in self.HTTP_DEFAULTS.items()}
+        for name, overrides in (http_config or {}).items():
+            self.http_config.setdefault(name, {}).update(overrides)
+        self.connection_stats = {name: {'requests': 0, 'connections_opened': 0} for name in self.http_config}
+        self.model_cache_ttl = model_cache_ttl if model_cache_ttl is not None else self.MODEL_CACHE_TTL
+        self._owns_runtime = runtime is None
+        self.runtime = runtime or DragonRuntime("dragon{{type}}", self.metrics, self.model_cache_ttl)
+        self._loop = self.runtime.loop
+        self._loop_thread = self.runtime.loop_thread
+        
+        # Model registry, kept warm by the runtime's refresher thread
+        # (headless callers that pass an explicit model can skip discovery entirely)
+        self._models = None
+        self._models_updated = 0.0
+        self._models_lock = threading.Lock()
+        self.runtime.register(self, discover_models)
+        
+        # Keep Ollama models loaded between requests (also via DRAGON_KEEP_ALIVE, DRAGON_MODEL_KEEP_ALIVE="llava=1h,llama3=-1"
+        # and DRAGON_PINNED_MODELS="llava,llama3"). By default, long-running Dragons (those discovering models) also load the default
+        # and pinned models at startup (DRAGON_WARMUP) and keep the most used ones resident (DRAGON_RESIDENT_MODELS, 0 disables)
+        if model_keep_alive is None:
+            model_keep_alive = dict(item.split('=', 1) for item in os.getenv('DRAGON_MODEL_KEEP_ALIVE', '').split(',') if '=' in item)
+        if pinned_models is None:
+            pinned_models = [name for name in os.getenv('DRAGON_PINNED_MODELS', '').split(',') if name.strip()]
+        self.keep_alive = self._keep_alive_value(keep_alive if keep_alive is not None else os.getenv('DRAGON_KEEP_ALIVE', self.OLLAMA_KEEP_ALIVE))
+        self.model_keep_alive = {self._ollama_tag(name): self._keep_alive_value(value)
+                                 for name, value in {**self.OLLAMA_MODEL_KEEP_ALIVE, **model_keep_alive}.items()}
+        self.pinned_models = list(dict.fromkeys(self._ollama_tag(name) for name in self.OLLAMA_PINNED_MODELS + pinned_models))
+        if warm_up is None:
+            warm_up = os.getenv('DRAGON_WARMUP', '1' if discover_models else '0') != '0'
+        if resident_models is None:
+            resident_models = int(os.getenv('DRAGON_RESIDENT_MODELS', self.OLLAMA_RESIDENT_MODELS if discover_models else 0))
+        self.resident_models = resident_models
+        self.residency = ModelResidency(self.OLLAMA_USAGE_HALF_LIFE, self.OLLAMA_COLD_LOAD_SECONDS)
+        self._residency_task = None
+        if warm_up or resident_models or self.pinned_models:
+            self._residency_task = asyncio.run_coroutine_threadsafe(self._amanage_residency(warm_up), self._loop)
+    
+    def _http_client(self, provider):
+        """The provider's async connection pool (created on the I/O loop at first use)"""
+        return self.runtime.http_client(provider)
+    
+    def _run_sync(self, coro):
+        """Run a coroutine on the I/O loop and block until it finishes (used by the sync API)"""
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("Sync Dragon API called from its own event loop; await the async method instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _run_async(self, coro):
+        """Await a coroutine on the I/O loop from any event loop (e.g. Gradio's)"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+    
+    @staticmethod
+    async def _next_item(agen):
+        try:
+            return False, await agen.__anext__()
+        except StopAsyncIteration:
+            return True, None
+    
+    def _iterate_sync(self, agen):
+        """Drive an async generator on the I/O loop from a plain generator"""
+        try:
+            while True:
+                done, item = self._run_sync(self._next_item(agen))
+                if done:
+                    return
+                yield item
+        finally:
+            self._run_sync(agen.aclose())
+    
+    async def _iterate_async(self, agen):
+        """Drive an async generator on the I/O loop from any event loop"""
+        try:
+            while True:
+                done, item = await self._run_async(self._next_item(agen))
+                if done:
+                    return
+                yield item
+        finally:
+            await self._run_async(agen.aclose())
+    
+    async def _request(self, provider, method, url, stream=False, **kwargs):
+        """Send a request through the shared pool, retrying with backoff per the provider's policy"""
+        settings = self.http_config.setdefault(provider, {})
+        stats = self.connection_stats.setdefault(provider, {'requests': 0, 'connections_opened': 0})
+        retries = settings.get('retries', 0)
+        backoff = settings.get('backoff_factor', 0)
+        
+        async def trace(event, info):
+            if event == 'connection.connect_tcp.complete':
+                stats['connections_opened'] += 1
+        
+        client = self._http_client(provider)
+        request = client.build_request(method, url, extensions={'trace': trace}, **kwargs)
+        delay = 0
+        for attempt in range(retries + 1):
+            if attempt:
+                with StageTimer.stage('backoff'):
+                    await asyncio.sleep(delay)
+            stats['requests'] += 1
+            self._count('dragon_payload_bytes_sent_total', len(request.content), provider=provider)
+            try:
+                with StageTimer.stage('network'):
+                    response = await client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt == retries:
+                    raise
+                delay = backoff * (2 ** attempt)
+                continue
+            
+            if attempt == retries or response.status_code not in self.RETRY_STATUSES:
+                return response
+            await response.aclose()
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else backoff * (2 ** attempt)
+    
+    def get_connection_stats(self):
+        """Report connection reuse per provider"""
+        stats = {}
+        for provider, counts in self.connection_stats.items():
+            stats[provider] = {
+                'requests': counts['requests'],
+                'connections_opened': counts['connections_opened'],
+                'connections_reused': max(counts['requests'] - counts['connections_opened'], 0)
+            }
+        return stats
+    
+    def _register_metrics(self):
+        """Declare this Dragon's metrics (every sample carries a dragon="{{type}}" label)"""
+        self.metric_labels = {'dragon': '{{type}}'}
+        self.metrics.counter('dragon_provider_requests_total', "Provider calls by provider, model and outcome")
+        self.metrics.histogram('dragon_provider_request_seconds', "Provider call latency by provider and model")
+        self.metrics.counter('dragon_analyses_total', "Analyses by outcome (success, cached or failure)")
+        self.metrics.histogram('dragon_analysis_seconds', "End-to-end analysis latency by outcome")
+        self.metrics.counter('dragon_payload_bytes_sent_total', "Request body bytes sent to each provider, retries included")
+        self.metrics.counter('dragon_fallbacks_total', "Fallback activations by primary model, fallback model and reason")
+        self.metrics.counter('dragon_cache_requests_total', "Cache lookups by cache (result, segment, preprocess) and outcome")
+        self.metrics.histogram('dragon_log_write_seconds', "Background log writer batch write latency")
+        self.metrics.counter('dragon_log_rotations_total', "JSONL log files rotated into compressed archives")
+        self.metrics.gauge('dragon_log_queue_depth', "Log entries waiting for the background writer",
+                           self.log_writer.queue_depth, **self.metric_labels)
+        self.metrics.histogram('dragon_queue_wait_seconds', "Time spent waiting for a slot (queue=analysis, or the provider's name)")
+        self.metrics.gauge('dragon_admission_active', "Analyses holding an admission slot",
+                           lambda: self.admission.active, **self.metric_labels)
+        self.metrics.gauge('dragon_admission_waiting', "Analyses waiting for an admission slot",
+                           self.admission.waiting, **self.metric_labels)
+        self.metrics.histogram('dragon_model_request_seconds', "Ollama request latency by model and start (cold: the model had to be loaded)")
+        self.metrics.counter('dragon_model_loads_total', "Ollama model loads by model and reason (request, warmup or keepalive)")
+        self.metrics.histogram('dragon_model_load_seconds', "Time Ollama spent loading a model before answering")
+    
+    def _count(self, name, amount=1, **labels):
+        self.metrics.inc(name, amount, **self.metric_labels, **labels)
+    
+    def _observe(self, name, value, **labels):
+        self.metrics.observe(name, value, **self.metric_labels, **labels)
+    
+    def _observe_call(self, model, outcome, seconds=None):
+        """Count one provider call, with its latency when it ran to completion"""
+        provider = self._provider_name(model)
+        self._count('dragon_provider_requests_total', provider=provider, model=model, outcome=outcome)
+        if seconds is not None:
+            self._observe('dragon_provider_request_seconds', seconds, provider=provider, model=model)
+    
+    def _observe_analysis(self, start, outcome):
+        self._count('dragon_analyses_total', outcome=outcome)
+        self._observe('dragon_analysis_seconds', time.monotonic() - start, outcome=outcome)
+    
+    def set_profile_rate(self, rate):
+        """Profile this fraction of requests from now on (0 turns profiling off)"""
+        self.profile_rate = min(max(float(rate or 0), 0.0), 1.0)
+        return self.profile_rate
+    
+    @contextlib.contextmanager
+    def _profiled(self, timer):
+        """cProfile the enclosed request when it is sampled (one at a time), saving a .prof file loadable with pstats.
+        The file merges the calling thread (the event loop, so it includes any other coroutines that ran meanwhile)
+        with the request's worker-thread calls made through _to_thread; use the stage timings for per-request figures"""
+        if not self.profile_rate or random.random() >= self.profile_rate or not self._profile_lock.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            # Profiles the calling thread: the event loop that runs the request's coroutines
+            profiler.enable()
+            enabled = True
+        except ValueError:
+            enabled = False  # Another profiler (e.g. a debugger) is already active
+        path = self.profile_dir / f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.prof"
+        timer.profile = str(path) if enabled else None
+        timer.thread_profiles = [] if enabled else None
+        try:
+            yield
+        finally:
+            self._profile_lock.release()
+            if enabled:
+                profiler.disable()
+                thread_profiles, timer.thread_profiles = timer.thread_profiles, None
+                try:
+                    self.profile_dir.mkdir(exist_ok=True)
+                    stats = pstats.Stats(profiler)
+                    if thread_profiles:
+                        stats.add(*thread_profiles)
+                    stats.dump_stats(path)
+                except OSError as e:
+                    print(f"Profile write error: {e}")
+    
+    async def _to_thread(self, func, *args, **kwargs):
+        """asyncio.to_thread, profiling the call when the active request is sampled"""
+        timer = StageTimer.current.get()
+        if timer is None or timer.thread_profiles is None:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return await asyncio.to_thread(timer.call, func, *args, **kwargs)
+    
+    def close(self):
+        """Stop background work, drain the log writer and close the provider connection pools (unless the runtime is shared)"""
+        if self._residency_task is not None:
+            self._residency_task.cancel()
+        self.runtime.unregister(self)
+        self.log_writer.close()
+        atexit.unregister(self.log_writer.close)  # The exit hook would otherwise keep this Dragon alive
+        if self._owns_runtime:
+            self.runtime.close()
+        if self.log_store is not None:
+            self.log_store.close()
+    
+    def refresh_models(self):
+        """Query every provider now and store the result in the registry"""
+        models = self._discover_models()
+        with self._models_lock:
+            self._models = models
+            self._models_updated = time.monotonic()
+        return list(models)
+    
+    def get_available_models(self, force_refresh=False):
+        """Get cached list of available {{data_type}} models (force_refresh queries providers now)"""
+        if force_refresh:
+            return self.refresh_models()
+        
+        with self._models_lock:
+            models = self._models
         
-    def get_available_models(self):
+        if models is None:
+            # Discovery still running - serve defaults instead of blocking startup
+            return self._fallback_models()
+        return list(models)
+    
+    def _fallback_models(self):
+        """Models offered before discovery has completed"""
+        models = ['ollama:{{DEFAULT_MODEL}}']
+        if self.openai_api_key:
+            models.extend({{OPENAI_MODELS}})
+        if self.google_api_key:
+            models.extend({{GOOGLE_MODELS}})
+        return models
+    
+    def _discover_models(self):
         """Get list of available {{data_type}} processing models from all sources"""
         models = []
         
-        # Get Ollama models
+        # Get Ollama models (one listing serves every Dragon sharing the runtime)
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                ollama_models = response.json().get('models', [])
-                model_names = [f"ollama:{m['name']}" for m in ollama_models]
+            model_names = self.runtime.listing(f"ollama:{self.ollama_url}", self._list_ollama_models)
+            if model_names is not None:
                 # Prioritize relevant models
                 relevant_models = [m for m in model_names if any(k in m.lower() for k in {{MODEL_KEYWORDS}})]
                 models.extend(relevant_models + [m for m in model_names if m not in relevant_models])
@@ -56,35 +2186,232 @@ class Dragon{{CLASS_SUFFIX}}:
         
         return models if models else ['ollama:{{DEFAULT_MODEL}}']
     
-    def try_ollama_{{method_suffix}}(self, {{input_param}}, model, prompt):
-        """Try Ollama for {{data_type}} processing"""
+    def _list_ollama_models(self):
+        response = self._run_sync(self._request('ollama', 'GET', f"{self.ollama_url}/api/tags", timeout=5))
+        if response.status_code != 200:
+            return None
+        return [f"ollama:{m['name']}" for m in response.json().get('models', [])]
+    
+    @staticmethod
+    def _ollama_tag(model):
+        """Ollama's full name for a model ("ollama:llava" -> "llava:latest")"""
+        name = model[len('ollama:'):] if model.startswith('ollama:') else model
+        name = name.strip()
+        return name if ':' in name else f"{name}:latest"
+    
+    @staticmethod
+    def _keep_alive_value(value):
+        """keep_alive as Ollama accepts it: a number of seconds or a duration string ("30m", "1h")"""
+        if isinstance(value, str) and re.fullmatch(r"-?\d+(\.\d+)?", value.strip()):
+            return float(value) if '.' in value else int(value)
+        return value.strip() if isinstance(value, str) else value
+    
+    @staticmethod
+    def _keep_alive_seconds(value):
+        """Seconds a keep_alive keeps a model loaded (negative: forever; unparsable: Ollama's 5 minute default)"""
+        if isinstance(value, (int, float)):
+            return math.inf if value < 0 else value
+        if value.startswith('-'):
+            return math.inf
+        units = {'ns': 1e-9, 'us': 1e-6, 'µs': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600}
+        parts = re.findall(r"(\d+(?:\.\d+)?)(ns|us|µs|ms|s|m|h)", value)
+        return sum(float(number) * units[unit] for number, unit in parts) if parts else 300
+    
+    def _keep_alive(self, model):
+        """keep_alive sent with requests for a model: its own setting, forever (-1) when pinned, otherwise the default"""
+        tag = self._ollama_tag(model)
+        if tag in self.model_keep_alive:
+            return self.model_keep_alive[tag]
+        return -1 if tag in self.pinned_models else self.keep_alive
+    
+    def _note_model_response(self, model, load_seconds, seconds=None, reason='request'):
+        """Record an Ollama response for residency tracking and metrics; returns whether the model had to be loaded"""
+        tag = self._ollama_tag(model)
+        cold = self.residency.answered(tag, self._keep_alive_seconds(self._keep_alive(tag)), load_seconds, seconds)
+        if cold:
+            self._count('dragon_model_loads_total', model=tag, reason=reason)
+            self._observe('dragon_model_load_seconds', load_seconds, model=tag)
+            timer = StageTimer.current.get()
+            if timer is not None and reason == 'request':
+                timer.add('model_load', load_seconds)
+        if seconds is not None:
+            self._observe('dragon_model_request_seconds', seconds, model=tag, start='cold' if cold else 'warm')
+        return cold
+    
+    async def _aload_model(self, model, reason):
+        """Ask Ollama to load a model (a request without a prompt) and restart its keep-alive; returns load ms or an error"""
+        tag = self._ollama_tag(model)
+        try:
+            async with self._provider_slot(f"ollama:{tag}"):
+                start = time.monotonic()
+                response = await self._request(
+                    'ollama', 'POST',
+                    f"{self.ollama_url}/api/generate",
+                    json={"model": tag, "keep_alive": self._keep_alive(tag)},
+                    timeout={{TIMEOUT_SECONDS}}
+                )
+            if response.status_code != 200:
+                return f"Ollama failed: {response.status_code}"
+            load = response.json().get('load_duration')
+        except Exception as e:
+            return provider_error("Ollama", e)
+        # A load-only answer may not report load_duration; the round trip is then the load time
+        load_seconds = load / 1e9 if load is not None else time.monotonic() - start
+        self._note_model_response(tag, load_seconds, reason=reason)
+        return round(load_seconds * 1000, 1)
+    
+    async def awarm_up(self, models=None, reason='warmup'):
+        """Load Ollama models now (default: the default and pinned models) so no request waits for them; returns {model: load ms or error}"""
+        if models is None:
+            models = [self._ollama_tag('{{DEFAULT_MODEL}}')] + self.pinned_models
+        loaded = {}
+        # One at a time: loading several models at once only makes them compete for memory
+        for model in dict.fromkeys(self._ollama_tag(model) for model in models):
+            loaded[model] = await self._run_async(self._aload_model(model, reason))
+        return loaded
+    
+    def warm_up(self, models=None):
+        """Load Ollama models now (default: the default and pinned models); returns {model: load ms or error}"""
+        return self._run_sync(self.awarm_up(models))
+    
+    async def _amanage_residency(self, warm_up):
+        """Background task on the I/O loop: warm up at startup, then keep pinned and frequently used models loaded"""
+        if warm_up:
+            await self.awarm_up()
+        while self.resident_models or self.pinned_models:
+            await asyncio.sleep(self.OLLAMA_RESIDENCY_INTERVAL)
+            try:
+                await self._akeep_resident()
+            except Exception as e:
+                print(f"Model residency error: {e}")
+    
+    async def _akeep_resident(self):
+        """Reload or refresh the pinned and most used models that Ollama would unload before the next round"""
+        hot = self.residency.hottest(self.resident_models, self.OLLAMA_RESIDENT_MIN_SCORE) if self.resident_models else []
+        models = [model for model in dict.fromkeys(self.pinned_models + hot) if self._keep_alive_seconds(self._keep_alive(model)) > 0]
+        due = self.residency.expiring(models, self.OLLAMA_RESIDENCY_INTERVAL * 1.5)
+        if due:
+            await self.awarm_up(due, reason='keepalive')
+    
+    def get_residency_stats(self):
+        """Ollama model residency: keep-alive settings, which models are loaded, and cold versus warm request latency"""
+        models = self.residency.stats()
+        for model, stats in models.items():
+            stats['keep_alive'] = self._keep_alive(model)
+        return {'keep_alive': self.keep_alive, 'pinned': list(self.pinned_models), 'resident_models': self.resident_models,
+                'models': models}
+    
+    async def atry_ollama_{{method_suffix}}(self, {{input_param}}, model, prompt):
+        """Try Ollama for {{data_type}} processing (async)"""
         try:
             ollama_model = model.replace('ollama:', '') if model.startswith('ollama:') else model
             
             payload = {
                 "model": ollama_model,
                 "prompt": prompt,
-                "{{input_key}}": {{input_param}},  # Base64 encoded data
-                "stream": False
+                "stream": False,
+                "keep_alive": self._keep_alive(ollama_model)
             }
+            if {{input_param}} is not None:
+                # Base64 encoded data (text-only requests, like the map-reduce merge, send none)
+                payload["{{input_key}}"] = {{input_param}}
             
-            response = requests.post(
+            self.residency.used(self._ollama_tag(ollama_model))
+            start = time.monotonic()
+            response = await self._request(
+                'ollama', 'POST',
                 f"{self.ollama_url}/api/generate",
                 json=payload,
                 timeout={{TIMEOUT_SECONDS}}
             )
             
             if response.status_code == 200:
-                result = response.json()
+                with StageTimer.stage('parse'):
+                    result = response.json()
+                load = result.get('load_duration')
+                self._note_model_response(ollama_model, load / 1e9 if load is not None else None, time.monotonic() - start)
                 return result.get('response', 'No {{output_type}} returned'), f'Ollama ({ollama_model})', None
             else:
                 return None, None, f"Ollama failed: {response.status_code}"
-                
+        
         except Exception as e:
-            return None, None, f"Ollama error: {str(e)}"
+            return None, None, provider_error("Ollama", e)
     
-    def try_openai_{{method_suffix}}(self, {{input_param}}, model, prompt):
-        """Try OpenAI API for {{data_type}} processing"""
+    def try_ollama_{{method_suffix}}(self, {{input_param}}, model, prompt):
+        """Try Ollama for {{data_type}} processing"""
+        return self._run_sync(self.atry_ollama_{{method_suffix}}({{input_param}}, model, prompt))
+    
+    async def astream_ollama_{{method_suffix}}(self, {{input_param}}, model, prompt, performance=None):
+        """Stream Ollama {{data_type}} processing, yielding text as it is generated (async)"""
+        ollama_model = model.replace('ollama:', '') if model.startswith('ollama:') else model
+        performance = {} if performance is None else performance
+        
+        payload = {
+            "model": ollama_model,
+            "prompt": prompt,
+            "{{input_key}}": {{input_param}},  # Base64 encoded data
+            "stream": True,
+            "keep_alive": self._keep_alive(ollama_model)
+        }
+        
+        self.residency.used(self._ollama_tag(ollama_model))
+        start = time.monotonic()
+        chunks = 0
+        response = await self._request(
+            'ollama', 'POST',
+            f"{self.ollama_url}/api/generate",
+            stream=True,
+            json=payload,
+            timeout={{TIMEOUT_SECONDS}}
+        )
+        try:
+            if response.status_code != 200:
+                raise RuntimeError(f"Ollama failed: {response.status_code}")
+            
+            # Ollama streams one JSON object per line (NDJSON)
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise RuntimeError(f"Ollama failed: {chunk['error']}")
+                
+                token = chunk.get('response', '')
+                if token:
+                    if chunks == 0:
+                        performance['ttft_ms'] = round((time.monotonic() - start) * 1000, 1)
+                    chunks += 1
+                    yield token
+                
+                if chunk.get('done'):
+                    performance['eval_count'] = chunk.get('eval_count')
+                    performance['eval_duration_ms'] = round(chunk.get('eval_duration', 0) / 1e6, 1)
+                    if chunk.get('load_duration') is not None:
+                        performance['load_ms'] = round(chunk['load_duration'] / 1e6, 1)
+                    break
+        finally:
+            # Closing the connection early also stops Ollama generating
+            await response.aclose()
+        
+        elapsed = time.monotonic() - start
+        performance['total_ms'] = round(elapsed * 1000, 1)
+        load_ms = performance.get('load_ms')
+        performance['cold_start'] = self._note_model_response(ollama_model, load_ms / 1000 if load_ms is not None else None, elapsed)
+        # Prefer Ollama's own token accounting; fall back to counted chunks
+        if performance.get('eval_count') and performance.get('eval_duration_ms'):
+            performance['tokens'] = performance['eval_count']
+            performance['tokens_per_sec'] = round(performance['eval_count'] / (performance['eval_duration_ms'] / 1000), 2)
+        else:
+            performance['tokens'] = chunks
+            generation_time = elapsed - performance.get('ttft_ms', 0) / 1000
+            performance['tokens_per_sec'] = round(chunks / generation_time, 2) if chunks and generation_time > 0 else None
+    
+    def stream_ollama_{{method_suffix}}(self, {{input_param}}, model, prompt, performance=None):
+        """Stream Ollama {{data_type}} processing, yielding text as it is generated"""
+        yield from self._iterate_sync(self.astream_ollama_{{method_suffix}}({{input_param}}, model, prompt, performance))
+    
+    async def atry_openai_{{method_suffix}}(self, {{input_param}}, model, prompt):
+        """Try OpenAI API for {{data_type}} processing (async)"""
         if not self.openai_api_key:
             return None, None, "OpenAI API key not found"
         
@@ -102,7 +2429,8 @@ class Dragon{{CLASS_SUFFIX}}:
                 # Add model-specific parameters
             }
             
-            response = requests.post(
+            response = await self._request(
+                'openai', 'POST',
                 "{{OPENAI_ENDPOINT}}",
                 headers=headers,
                 json=payload,
@@ -110,19 +2438,24 @@ class Dragon{{CLASS_SUFFIX}}:
             )
             
             if response.status_code == 200:
-                result = response.json()
+                with StageTimer.stage('parse'):
+                    result = response.json()
                 return result.get('{{result_key}}', 'No {{output_type}} returned'), f'OpenAI ({openai_model})', None
             else:
                 return None, None, f"OpenAI failed: {response.status_code}"
-                
+        
         except Exception as e:
-            return None, None, f"OpenAI error: {str(e)}"
+            return None, None, provider_error("OpenAI", e)
     
-    def try_google_{{method_suffix}}(self, {{input_param}}, model):
-        """Try Google API for {{data_type}} processing"""
+    def try_openai_{{method_suffix}}(self, {{input_param}}, model, prompt):
+        """Try OpenAI API for {{data_type}} processing"""
+        return self._run_sync(self.atry_openai_{{method_suffix}}({{input_param}}, model, prompt))
+    
+    async def atry_google_{{method_suffix}}(self, {{input_param}}, model, prompt=None):
+        """Try Google API for {{data_type}} processing (async)"""
         if not self.google_api_key:
             return None, None, "Google API key not found"
-            
+        
         try:
             url = f"{{GOOGLE_ENDPOINT}}?key={self.google_api_key}"
             
@@ -130,52 +2463,50 @@ class Dragon{{CLASS_SUFFIX}}:
                 # Add Google-specific payload structure
             }
             
-            response = requests.post(url, json=payload, timeout={{API_TIMEOUT}})
+            response = await self._request('google', 'POST', url, json=payload, timeout={{API_TIMEOUT}})
             
             if response.status_code == 200:
-                result = response.json()
+                with StageTimer.stage('parse'):
+                    result = response.json()
                 # Process Google-specific response
                 return "{{output_type}} result", 'Google {{SERVICE_NAME}}', None
             else:
                 return None, None, f"Google {{SERVICE_NAME}} failed: {response.status_code}"
-                
+        
         except Exception as e:
-            return None, None, f"Google {{SERVICE_NAME}} error: {str(e)}"
+            return None, None, provider_error("Google {{SERVICE_NAME}}", e)
+    
+    def try_google_{{method_suffix}}(self, {{input_param}}, model, prompt=None):
+        """Try Google API for {{data_type}} processing"""
+        return self._run_sync(self.atry_google_{{method_suffix}}({{input_param}}, model, prompt))
     
     def extract_{{type}}_metadata(self, {{output_param}}, file_path=None):
         """Extract metadata for {{data_type}} logging"""
-        # Define relevant descriptors for your data type
-        descriptors = {{METADATA_DESCRIPTORS}}
-        
-        content_lower = {{output_param}}.lower()
-        tags = [desc for desc in descriptors if desc in content_lower]
-        
-        # Extract quoted content
-        quoted_content = re.findall(r'"([^"]*)"', {{output_param}})
-        
-        # Generate filename suggestion
-        clean_content = re.sub(r'[^\w\s-]', '', {{output_param}}.lower())
-        words = clean_content.split()[:4]
-        suggested_filename = '_'.join(words) + '.{{FILE_EXTENSION}}'
+        # Tags (METADATA_DESCRIPTORS as whole words), quoted content and word count
+        tags, quoted_content, word_count = self.metadata_matcher.match({{output_param}})
         
         return {
-            'tags': list(set(tags)),
+            'tags': tags,
             'quoted_content': quoted_content,
-            'suggested_filename': suggested_filename,
-            'word_count': len({{output_param}}.split()),
+            'suggested_filename': suggest_filename({{output_param}}, '{{FILE_EXTENSION}}'),
+            'word_count': word_count,
             'char_count': len({{output_param}})
         }
     
-    def log_analysis(self, file_path, {{output_param}}, model, api_used, prompt):
+    def log_analysis(self, file_path, {{output_param}}, model, api_used, prompt, file_hash=None, performance=None, comparison_id=None):
         """Log the {{data_type}} analysis"""
         try:
-            # Calculate file hash if we have the path
-            file_hash = None
-            if file_path and Path(file_path).exists():
-                with open(file_path, 'rb') as f:
-                    file_hash = hashlib.md5(f.read()).hexdigest()
+            # Calculate file hash if the caller has not already done so
+            if file_hash is None and file_path and Path(file_path).exists():
+                file_hash = hash_file(file_path)
+            
+            with StageTimer.stage('metadata'):
+                metadata = self.extract_{{type}}_metadata({{output_param}}, file_path)
             
-            metadata = self.extract_{{type}}_metadata({{output_param}}, file_path)
+            # Latency and per-stage timings of the request being logged, when it is timed
+            timer = StageTimer.current.get()
+            if timer is not None:
+                performance = {**(performance or {}), **timer.snapshot()}
             
             log_entry = {
                 'timestamp': datetime.now().isoformat(),
@@ -188,28 +2519,75 @@ class Dragon{{CLASS_SUFFIX}}:
                 '{{output_key}}': {{output_param}},
                 'metadata': metadata
             }
+            if performance:
+                log_entry['performance'] = performance
+            if comparison_id:
+                log_entry['comparison_id'] = comparison_id
             
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
-                
+            self.log_writer.submit(log_entry)
             return True
         except Exception as e:
             print(f"Logging error: {e}")
             return False
     
+    def _write_log_batch(self, entries):
+        """Append a batch of entries to the log backend (runs on the writer thread)"""
+        start = time.monotonic()
+        if self.log_store is not None:
+            self.log_store.insert_many(entries)
+        else:
+            if self.log_segments.due():
+                try:
+                    self.log_segments.rotate()
+                    self._count('dragon_log_rotations_total')
+                except OSError as e:
+                    print(f"Log rotation error: {e}")
+            data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+            with open(self.log_segments.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                now = time.monotonic()
+                if self.log_fsync == 'always' or (self.log_fsync == 'interval' and now - self._last_fsync >= self.LOG_FSYNC_INTERVAL):
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._last_fsync = now
+                    self._unsynced = None
+                elif self.log_fsync == 'interval':
+                    self._unsynced = self.log_segments.path
+        self._observe('dragon_log_write_seconds', time.monotonic() - start)
+    
+    def _sync_log(self):
+        """Fsync writes the 'interval' policy has not synced yet (runs on the writer thread when it goes idle and on close)"""
+        path, self._unsynced = self._unsynced, None
+        if path is None:
+            return
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                os.fsync(f.fileno())
+        except FileNotFoundError:
+            return  # Rotated away in the meantime
+        self._last_fsync = time.monotonic()
+    
+    def _tail_log_entries(self, limit, block_size=64 * 1024):
+        """Read the last `limit` log entries, seeking backward through the active file and then the archives"""
+        return self.log_segments.tail(limit, block_size)
+    
     def get_recent_logs(self, limit=20):
         """Get recent logs for display"""
         try:
-            if not self.log_file.exists():
-                return pd.DataFrame()
-                
-            logs = []
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        logs.append(json.loads(line))
+            # Snapshot unwritten entries first so nothing slips between the two reads
+            pending = self.log_writer.pending()
+            if self.log_store is not None:
+                recent_logs = self.log_store.recent(limit)
+            elif self.log_segments.exists():
+                recent_logs = self._tail_log_entries(limit)
+            else:
+                recent_logs = []
             
-            recent_logs = logs[-limit:]
+            written = {(log['timestamp'], log['file_name'], log['model_used']) for log in recent_logs}
+            recent_logs.extend(log for log in pending if (log['timestamp'], log['file_name'], log['model_used']) not in written)
+            recent_logs = recent_logs[-limit:]
+            if not recent_logs:
+                return pd.DataFrame()
             
             df_data = []
             for log in reversed(recent_logs):  # Newest first
@@ -218,6 +2596,7 @@ class Dragon{{CLASS_SUFFIX}}:
                     'File': log['file_name'],
                     'Model': log['model_used'],
                     'API': log['api_used'],
+                    'Latency ms': entry_latency_ms(log),
                     'Tags': ', '.join(log['metadata']['tags'][:5]),
                     '{{OUTPUT_COLUMN}}': log['{{output_key}}'][:100] + '...' if len(log['{{output_key}}']) > 100 else log['{{output_key}}']
                 })
@@ -228,73 +2607,922 @@ class Dragon{{CLASS_SUFFIX}}:
             print(f"Error reading logs: {e}")
             return pd.DataFrame()
     
-    def analyze_{{type}}(self, {{input_param}}, model, prompt):
-        """Main analysis function for Gradio"""
-        if {{input_param}} is None:
-            return "❌ Please upload a {{data_type}} file", "", pd.DataFrame()
+    def get_history_page(self, page=1, page_size=25, search=''):
+        """Get one page of the analysis history for the Detailed Logs tab"""
+        columns = ["ID", "Time", "File", "Model", "Latency ms", "Tags", "Word Count"]
+        page = max(int(page or 1), 1)
+        try:
+            if self.log_store is not None:
+                rows, total = self.log_store.page(page, page_size, search.strip())
+                records = [{
+                    'ID': row['id'],
+                    'Time': row['timestamp'][:19].replace('T', ' '),
+                    'File': row['file_name'],
+                    'Model': row['model_used'],
+                    'Latency ms': row['latency_ms'],
+                    'Tags': ', '.join((row['tags'] or '').split()[:5]),
+                    'Word Count': row['word_count']
+                } for row in rows]
+            elif self.log_segments.exists() or self.log_writer.pending():
+                # JSONL fallback: page backward from the end of the log, across archived segments (no search),
+                # including entries still waiting in the writer
+                pending = self.log_writer.pending()
+                entries = self._tail_log_entries(page * page_size) if self.log_segments.exists() else []
+                written = {log_entry_key(log) for log in entries}
+                entries.extend(log for log in pending if log_entry_key(log) not in written)
+                entries = list(reversed(entries[-page * page_size:]))
+                start = (page - 1) * page_size
+                total = len(entries) if len(entries) < page * page_size else None
+                records = [{
+                    'ID': log_entry_key(log),
+                    'Time': log['timestamp'][:19].replace('T', ' '),
+                    'File': log['file_name'],
+                    'Model': log['model_used'],
+                    'Latency ms': entry_latency_ms(log),
+                    'Tags': ', '.join(log['metadata']['tags'][:5]),
+                    'Word Count': log['metadata'].get('word_count')
+                } for log in entries[start:]]
+            else:
+                records, total = [], 0
+            return pd.DataFrame(records, columns=columns), total
+        
+        except Exception as e:
+            print(f"Error reading history: {e}")
+            return pd.DataFrame(columns=columns), 0
+    
+    def get_full_output(self, entry_id):
+        """Load the complete output for one history row"""
+        try:
+            if self.log_store is not None:
+                return self.log_store.get_output(int(entry_id)) or ""
+            for log in self.log_writer.pending():
+                if log_entry_key(log) == entry_id:
+                    return log['{{output_key}}']
+            timestamp = str(entry_id).partition('#')[0]
+            log = self.log_segments.find(timestamp, lambda log: log_entry_key(log) == entry_id)
+            return log['{{output_key}}'] if log else ""
+        except Exception as e:
+            return f"❌ Error loading entry: {e}"
+    
+    def compact_logs(self, retention_days=None, trim_after_days=None, trim_chars=None):
+        """Apply the retention policy to the log: drop entries past retention_days, trim outputs past trim_after_days
+        (JSONL: archived segments only; the active file is left to the writer)"""
+        retention_days = self.LOG_RETENTION_DAYS if retention_days is None else retention_days
+        trim_after_days = self.LOG_TRIM_AFTER_DAYS if trim_after_days is None else trim_after_days
+        trim_chars = self.LOG_TRIM_CHARS if trim_chars is None else trim_chars
+        now = datetime.now()
+        # Entry timestamps are ISO strings, so string comparison is chronological ('' keeps everything)
+        drop_before = (now - timedelta(days=retention_days)).isoformat() if retention_days else ''
+        trim_before = (now - timedelta(days=trim_after_days)).isoformat() if trim_after_days else ''
+        self.log_writer.flush()
+        if self.log_store is not None:
+            return self.log_store.compact(drop_before, trim_before, trim_chars, self.LOG_TRIM_MARKER)
+        return self.log_segments.compact(drop_before, trim_before, trim_chars, self.LOG_TRIM_MARKER, '{{output_key}}')
+    
+    def import_jsonl_logs(self, pattern="dragon*_logs.jsonl"):
+        """Migrate existing JSONL logs into the SQLite backend"""
+        store = self.log_store or SQLiteLogStore(Path("dragon{{type}}_logs.db"), '{{output_key}}')
+        imported = {}
+        for path in sorted(glob.glob(pattern)):
+            # Archived segments first, oldest to newest, then the active file
+            for segment in reversed(LogSegments(path).segments()):
+                imported[str(segment)] = store.import_jsonl(segment)
+        if store is not self.log_store:
+            store.close()
+        return imported
+    
+    def collect_batch_inputs(self, paths=None, directory=None, pattern="*"):
+        """Expand uploaded files and/or a folder under batch_root (searched recursively) into a sorted list of input paths"""
+        inputs = []
+        for path in paths or []:
+            path = getattr(path, 'name', path)  # Gradio file objects
+            if path and Path(path).is_file():
+                inputs.append(str(path))
+        if directory:
+            if self.batch_root is None:
+                raise ValueError("Server folders are disabled (set DRAGON_BATCH_ROOT to allow one)")
+            if '..' in Path(directory).parts or '..' in Path(pattern or "*").parts:
+                raise ValueError("'..' is not allowed in batch folders or patterns")
+            # Relative folders are taken under the root; anything resolving outside it (absolute paths, symlinks) is refused
+            folder = (self.batch_root / directory).resolve()
+            if not folder.is_relative_to(self.batch_root):
+                raise ValueError(f"Not under the batch folder {self.batch_root}: {directory}")
+            inputs.extend(path for path in self.expand_directory(folder, pattern) if Path(path).resolve().is_relative_to(self.batch_root))
+        return sorted(dict.fromkeys(inputs))
+    
+    def expand_directory(self, directory, pattern="*"):
+        """Every file under a directory (searched recursively) matching pattern, unrestricted (used by the CLI)"""
+        directory = Path(directory).expanduser()
+        if not directory.is_dir():
+            raise ValueError(f"Not a directory: {directory}")
+        return sorted(str(p) for p in directory.rglob(pattern or "*") if p.is_file())
+    
+    def _logged_hashes(self, model, prompt):
+        """Hashes of inputs already analyzed with this model and prompt (used to resume batches)"""
+        if self.log_store is not None:
+            return self.log_store.logged_hashes(model, prompt)
+        
+        hashes = set()
+        for line in self.log_segments.lines():
+            # Cheap substring check before paying for a full parse
+            if model not in line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('model_used') == model and entry.get('prompt') == prompt and entry.get('file_hash'):
+                hashes.add(entry['file_hash'])
+        for entry in self.log_writer.pending():
+            if entry.get('model_used') == model and entry.get('prompt') == prompt and entry.get('file_hash'):
+                hashes.add(entry['file_hash'])
+        return hashes
+    
+    def _analyze_batch_item(self, path, model, prompt, done_hashes, provider_slots):
+        """Analyze one batch input, returning a results-table row"""
+        start = time.monotonic()
+        row = {'File': Path(path).name, 'Status': '', 'API': '', 'Seconds': 0.0, 'Tags': '', '{{OUTPUT_COLUMN}}': '', 'Path': str(path)}
+        with StageTimer().active():
+            try:
+                data = None
+                if done_hashes:
+                    # The bytes hashed for the resume check are the ones analyzed: one read per file
+                    with StageTimer.stage('read_encode'):
+                        data = Path(path).read_bytes()
+                    if hash_bytes(data) in done_hashes:
+                        row['Status'] = 'skipped (already logged)'
+                        return row
+                
+                payload_info = {}
+                file_path, {{input_data}}, content_hash = self._prepare_input(path, payload_info, data=data)
+                {{output_var}}, api_used = self._get_cached(file_path, content_hash, model, prompt)
+                error = None
+                if not {{output_var}}:
+                    with provider_slots[self._provider_name(model)]:
+                        # Batch items share the analysis slots with interactive requests (waiting past a full line,
+                        # since the worker pool already bounds how many join it)
+                        ticket = self.admission.enter(bounded=False)
+                        {{output_var}}, api_used, error, answered_model = self._run_sync(
+                            self._arun_admitted(ticket, 'batch', self._arun_input(
+                                file_path, {{input_data}}, model, prompt, payload_info.get('payload'))))
+                    if {{output_var}}:
+                        self._record_result(file_path, {{output_var}}, model, api_used, prompt, content_hash, answered_model)
+                
+                if {{output_var}}:
+                    row.update({
+                        'Status': 'ok',
+                        'API': api_used,
+                        'Tags': ', '.join(self.extract_{{type}}_metadata({{output_var}})['tags'][:5]),
+                        '{{OUTPUT_COLUMN}}': {{output_var}}
+                    })
+                else:
+                    row['Status'] = f"failed: {error}"
+            except Exception as e:
+                row['Status'] = f"error: {e}"
+        row['Seconds'] = round(time.monotonic() - start, 2)
+        return row
+    
+    def run_batch(self, paths, model, prompt, max_workers=None, resume=True):
+        """Analyze many inputs on a bounded worker pool, yielding (completed, total, row) as each finishes"""
+        if not prompt.strip():
+            prompt = "{{DEFAULT_PROMPT}}"
+        
+        done_hashes = self._logged_hashes(model, prompt) if resume else set()
+        provider_slots = {name: threading.BoundedSemaphore(limit) for name, limit in self.BATCH_PROVIDER_LIMITS.items()}
+        for provider in ('ollama', model.split(':', 1)[0]):
+            provider_slots.setdefault(provider, threading.BoundedSemaphore(self.BATCH_MAX_WORKERS))
+        
+        total = len(paths)
+        executor = ThreadPoolExecutor(max_workers=max_workers or self.BATCH_MAX_WORKERS, thread_name_prefix="dragon{{type}}-batch")
+        try:
+            futures = [executor.submit(self._analyze_batch_item, path, model, prompt, done_hashes, provider_slots) for path in paths]
+            completed = 0
+            for future in as_completed(futures):
+                completed += 1
+                yield completed, total, future.result()
+        finally:
+            # Stop queued work if the caller stops consuming (e.g. the browser tab closed)
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def export_batch_results(self, rows, output_file=None):
+        """Write batch results to CSV and return the file path"""
+        output_file = Path(output_file or f"dragon{{type}}_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        pd.DataFrame(rows).to_csv(output_file, index=False)
+        return str(output_file)
+    
+    async def _acollect_ollama(self, {{input_data}}, model, prompt, performance):
+        """Whole Ollama answer read off the stream, so TTFT and token rate land in performance"""
+        ollama_model = model.replace('ollama:', '')
+        tokens = []
+        try:
+            async for token in self.astream_ollama_{{method_suffix}}({{input_data}}, model, prompt, performance):
+                tokens.append(token)
+        except RuntimeError as e:
+            return None, None, str(e)
+        except Exception as e:
+            return None, None, provider_error("Ollama", e)
+        if not tokens:
+            return None, None, f"{model} returned no {{output_type}}"
+        return ''.join(tokens), f'Ollama ({ollama_model})', None
+    
+    async def _acompare_model(self, file_path, {{input_data}}, content_hash, model, prompt, comparison_id):
+        """Run one model of a comparison, returning a results-table row (no fallbacks: each row is the model asked)"""
+        start = time.monotonic()
+        performance = {}
+        row = {
+            'Model': model, 'Status': '', 'Seconds': 0.0,
+            'Payload KB': round((len({{input_data}}) + len(prompt.encode('utf-8'))) / 1024, 1),
+            'TTFT ms': None, 'Tokens/s': None, 'API': '', '{{OUTPUT_COLUMN}}': ''
+        }
+        with StageTimer().active():
+            try:
+                {{output_var}}, api_used = await self._to_thread(self._get_cached, file_path, content_hash, model, prompt, comparison_id)
+                status = 'ok (cached)'
+                error = None
+                if not {{output_var}}:
+                    status = 'ok'
+                    if model.startswith(('openai:', 'google:')):
+                        method = self._provider_method(model)
+                    else:
+                        method = lambda encoded, name, text: self._acollect_ollama(encoded, name, text, performance)
+                    {{output_var}}, api_used, error = await self._acall_model(method, {{input_data}}, model, prompt)
+                    if {{output_var}}:
+                        await self._to_thread(self._record_result, file_path, {{output_var}}, model, api_used, prompt, content_hash, model,
+                                                performance, comparison_id)
+                
+                if {{output_var}}:
+                    row.update({'Status': status, 'API': api_used, '{{OUTPUT_COLUMN}}': {{output_var}}})
+                else:
+                    row['Status'] = f"failed: {error}"
+            except Exception as e:
+                row['Status'] = f"error: {e}"
+        row.update({
+            'Seconds': round(time.monotonic() - start, 2),
+            'TTFT ms': performance.get('ttft_ms'),
+            'Tokens/s': performance.get('tokens_per_sec')
+        })
+        return row
+    
+    async def _compare_models(self, {{input_param}}, models, prompt):
+        """Comparison fan-out shared by compare_models() and acompare_models()"""
+        if not prompt or not prompt.strip():
+            prompt = "{{DEFAULT_PROMPT}}"
+        comparison_id = uuid.uuid4().hex[:12]
+        
+        # A comparison takes one admission slot; its calls then queue per provider like any other
+        ticket = self.admission.enter()
+        if ticket is None:
+            raise RuntimeError(self._busy_message())
+        
+        async with self._admitted(self.admission, ticket, 'analysis'):
+            # Encode once, then fan out to every model concurrently
+            file_path, {{input_data}}, content_hash = await self._to_thread(self._prepare_input, {{input_param}})
+            tasks = [
+                asyncio.create_task(self._acompare_model(file_path, {{input_data}}, content_hash, model, prompt, comparison_id))
+                for model in dict.fromkeys(models)
+            ]
+            try:
+                for next_row in asyncio.as_completed(tasks):
+                    yield comparison_id, await next_row
+            finally:
+                for task in tasks:
+                    task.cancel()
+    
+    async def acompare_models(self, {{input_param}}, models, prompt=""):
+        """Send one input to several models at once, yielding (comparison_id, row) as each answers (async)"""
+        async for item in self._iterate_async(self._compare_models({{input_param}}, models, prompt)):
+            yield item
+    
+    def compare_models(self, {{input_param}}, models, prompt=""):
+        """Send one input to several models at once, yielding (comparison_id, row) as each answers"""
+        yield from self._iterate_sync(self._compare_models({{input_param}}, models, prompt))
+    
+    def _default_preprocessor(self):
+        """Preprocessing stage for this Dragon's data type (None when the type has none)"""
+        data_type = '{{data_type}}'.lower()
+        if 'image' in data_type:
+            return ImagePreprocessor(self.PREPROCESS_MAX_DIMENSION, self.PREPROCESS_JPEG_QUALITY)
+        if 'audio' in data_type or 'sound' in data_type:
+            return AudioPreprocessor(self.PREPROCESS_SAMPLE_RATE, self.PREPROCESS_CHANNELS)
+        return None
+    
+    def _preprocess(self, file_path, raw, info):
+        """Shrink one input (served from the payload cache when seen before), returning (payload bytes, source hash)"""
+        data = bytes(raw) if isinstance(raw, (bytes, bytearray, memoryview)) else Path(file_path).read_bytes()
+        content_hash = hash_bytes(data)
+        
+        key = PreprocessCache.make_key(content_hash, self.preprocessor.signature())
+        payload = self.preprocess_cache.get(key)
+        cache_hit = payload is not None
+        self._count('dragon_cache_requests_total', cache='preprocess', outcome='hit' if cache_hit else 'miss')
+        if payload is None:
+            try:
+                payload = self.preprocessor.process(data)
+            except Exception as e:
+                # Unreadable or unsupported input: send it as-is (and retry next time)
+                print(f"Preprocessing skipped for {Path(file_path).name if file_path else 'upload'}: {e}")
+                payload = data
+            else:
+                if payload is None or len(payload) >= len(data):
+                    payload = b''  # Remember that the original is already the smallest
+                self.preprocess_cache.put(key, payload)
+        payload = payload or data
         
+        with self._preprocess_lock:
+            self.preprocess_stats['inputs'] += 1
+            self.preprocess_stats['processed'] += payload is not data
+            self.preprocess_stats['cache_hits'] += cache_hit
+            self.preprocess_stats['source_bytes'] += len(data)
+            self.preprocess_stats['payload_bytes'] += len(payload)
+        info.update({'source_bytes': len(data), 'payload_bytes': len(payload)})
+        return payload, content_hash
+    
+    def _default_chunker(self):
+        """Chunker for this Dragon's data type (None when the type is never split)"""
+        data_type = '{{data_type}}'.lower()
+        if any(kind in data_type for kind in ('document', 'text', 'script', 'code')):
+            return DocumentChunker(self.CHUNK_PDF_PAGES, self.CHUNK_PDF_OVERLAP_PAGES, self.CHUNK_TEXT_WORDS, self.CHUNK_TEXT_OVERLAP_WORDS)
+        if 'audio' in data_type or 'sound' in data_type:
+            return AudioChunker(self.CHUNK_AUDIO_SECONDS, self.CHUNK_AUDIO_OVERLAP_SECONDS)
+        return None
+    
+    def _chunkable(self, file_path):
+        return self.chunker is not None and self.chunker.accepts(file_path)
+    
+    def _split_input(self, file_path, payload):
+        """Segments of an oversized payload (raw bytes kept by _prepare_input) as [(label, encoded, hash)], or None"""
+        if payload is None or not self._chunkable(file_path):
+            return None
         try:
-            # Handle different input types
-            file_path = None
-            if isinstance({{input_param}}, str):
-                # File path from Gradio
-                file_path = {{input_param}}
-                with open({{input_param}}, 'rb') as f:
-                    {{input_data}} = base64.b64encode(f.read()).decode('utf-8')
-            elif hasattr({{input_param}}, 'name'):
-                # File object
-                file_path = {{input_param}}.name
-                with open({{input_param}}.name, 'rb') as f:
-                    {{input_data}} = base64.b64encode(f.read()).decode('utf-8')
+            with StageTimer.stage('split'):
+                segments = self.chunker.split(payload)
+        except Exception as e:
+            print(f"Chunking skipped for {Path(file_path).name if file_path else 'upload'}: {e}")
+            return None
+        if not segments:
+            return None
+        return [(label,) + encode_bytes(segment) for label, segment in segments]
+    
+    def get_preprocess_stats(self):
+        """Totals for the preprocessing stage, including bytes saved before encoding"""
+        with self._preprocess_lock:
+            stats = dict(self.preprocess_stats)
+        stats['bytes_saved'] = stats['source_bytes'] - stats['payload_bytes']
+        return stats
+    
+    @staticmethod
+    def _payload_note(info):
+        """Status suffix describing how much preprocessing shrank the payload"""
+        source, payload = info.get('source_bytes'), info.get('payload_bytes')
+        if not source or payload >= source:
+            return ""
+        return f" | 🗜️ {source / 1048576:.1f} MB → {payload / 1048576:.1f} MB sent"
+    
+    def _prepare_input(self, {{input_param}}, info=None, data=None):
+        """Resolve the input (data: its bytes if the caller already read them), returning (file_path, encoded payload, content hash)"""
+        # info also receives the unencoded payload (info['payload']) when the chunker may split it
+        # Handle different input types
+        file_path = None
+        if isinstance({{input_param}}, str):
+            # File path from Gradio
+            file_path = {{input_param}}
+        elif hasattr({{input_param}}, 'name'):
+            # File object
+            file_path = {{input_param}}.name
+        
+        info = {} if info is None else info
+        chunkable = self._chunkable(file_path)
+        if self.preprocessor is not None and self.preprocessor.accepts(file_path):
+            with StageTimer.stage('preprocess'):
+                payload, content_hash = self._preprocess(file_path, {{input_param}} if data is None else data, info)
+                {{input_data}} = base64.b64encode(payload).decode('ascii')
+            if chunkable:
+                info['payload'] = payload
+            return file_path, {{input_data}}, content_hash
+        
+        # One pass over the input yields both the payload and its content hash
+        with StageTimer.stage('read_encode'):
+            if chunkable:
+                # Splitting needs the raw bytes anyway: keep them rather than decoding the payload again
+                if data is None:
+                    data = Path(file_path).read_bytes() if file_path is not None else bytes({{input_param}})
+                info['payload'] = data
+            if data is not None:
+                {{input_data}}, content_hash = encode_bytes(data)
+            elif file_path is not None:
+                {{input_data}}, content_hash = encode_file(file_path)
             else:
                 # Raw data
-                {{input_data}} = base64.b64encode({{input_param}}).decode('utf-8')
-            
-            if not prompt.strip():
+                {{input_data}}, content_hash = encode_bytes({{input_param}})
+        return file_path, {{input_data}}, content_hash
+    
+    def _get_cached(self, file_path, content_hash, model, prompt, comparison_id=None):
+        """Serve repeated input/model/prompt combinations from the result cache (logging the hit)"""
+        if self.result_cache is None:
+            return None, None
+        with StageTimer.stage('cache'):
+            cached = self.result_cache.get(ResultCache.make_key(content_hash, model, prompt))
+        self._count('dragon_cache_requests_total', cache='result', outcome='hit' if cached else 'miss')
+        if not cached:
+            return None, None
+        api_used = f"cached ({cached['api_used']})"
+        self.log_analysis(file_path, cached['result'], model, api_used, prompt, file_hash=content_hash, comparison_id=comparison_id)
+        return cached['result'], api_used
+    
+    def _provider_method(self, model):
+        """Async provider method for a model name"""
+        if model.startswith('openai:'):
+            return self.atry_openai_{{method_suffix}}
+        if model.startswith('google:'):
+            return self.atry_google_{{method_suffix}}
+        # Default to Ollama
+        return self.atry_ollama_{{method_suffix}}
+    
+    def _fallback_chain(self, model):
+        """Fallback models to try, in order, when the primary fails or is slow"""
+        fallback_methods = [
+            ('ollama:{{DEFAULT_MODEL}}', self.atry_ollama_{{method_suffix}}),
+        ]
+        return [(fallback_model, method) for fallback_model, method in fallback_methods if fallback_model != model]
+    
+    def breaker(self, key):
+        """Get (or create) the circuit breaker for a provider or model"""
+        with self._breakers_lock:
+            if key not in self.breakers:
+                self.breakers[key] = CircuitBreaker(self.BREAKER_FAILURE_THRESHOLD, self.BREAKER_RECOVERY_TIMEOUT)
+            return self.breakers[key]
+    
+    @staticmethod
+    def _provider_name(model):
+        return model.split(':', 1)[0] if ':' in model else 'ollama'
+    
+    def _breakers_for(self, model):
+        return self.breaker(self._provider_name(model)), self.breaker(model)
+    
+    def _breaker_allows(self, model):
+        """Check provider then model breaker; open circuits are skipped without a request"""
+        provider_breaker, model_breaker = self._breakers_for(model)
+        if not provider_breaker.allow():
+            return False
+        if not model_breaker.allow():
+            provider_breaker.release()
+            return False
+        return True
+    
+    def _record_outcome(self, model, success, transport=False):
+        """Update breakers: transport failures count against the provider, every failure against the model"""
+        provider_breaker, model_breaker = self._breakers_for(model)
+        if success:
+            provider_breaker.record_success()
+            model_breaker.record_success()
+            return
+        if transport:
+            provider_breaker.record_failure()
+        else:
+            provider_breaker.release()
+        model_breaker.record_failure()
+    
+    def breaker_status(self):
+        """One-line summary of unhealthy backends for the UI status line"""
+        with self._breakers_lock:
+            breakers = list(self.breakers.items())
+        parts = []
+        for key, breaker in sorted(breakers):
+            if breaker.state == 'open':
+                parts.append(f"🔴 {key} open ({breaker.retry_in():.0f}s)")
+            elif breaker.state == 'half_open':
+                parts.append(f"🟡 {key} probing")
+            elif breaker.health < 0.5:
+                parts.append(f"🟠 {key} health {breaker.health:.0%}")
+        return " | ".join(parts)
+    
+    def _status(self, message):
+        health = self.breaker_status()
+        return f"{message} | {health}" if health else message
+    
+    def _provider_queue(self, provider):
+        """The provider's concurrency limiter, shared through the runtime (None when http_config sets no max_concurrency)"""
+        return self.runtime.provider_queue(provider, self.http_config.get(provider, {}).get('max_concurrency'))
+    
+    @contextlib.asynccontextmanager
+    async def _admitted(self, admission, ticket, queue_name, since=None):
+        """Wait for a ticket's turn, then hold its slot for the enclosed block (works from any event loop)"""
+        start = since or time.monotonic()
+        try:
+            with StageTimer.stage('queue'):
+                await asyncio.wrap_future(ticket)
+            self._observe('dragon_queue_wait_seconds', time.monotonic() - start, queue=queue_name)
+            start = time.monotonic()
+            yield
+        finally:
+            admission.release(ticket, time.monotonic() - start)
+    
+    async def _arun_admitted(self, ticket, queue_name, coro):
+        """Await coro once the analysis ticket is admitted, holding its slot until it finishes"""
+        async with self._admitted(self.admission, ticket, queue_name):
+            return await coro
+    
+    @contextlib.asynccontextmanager
+    async def _provider_slot(self, model):
+        """Hold one of the provider's concurrent-request slots for the enclosed call"""
+        provider = self._provider_name(model)
+        admission = self._provider_queue(provider)
+        if admission is None:
+            yield
+            return
+        async with self._admitted(admission, admission.enter(), provider):
+            yield
+    
+    def _queue_note(self, ticket):
+        """Status text for an analysis waiting in line"""
+        position = self.admission.position(ticket)
+        eta = self.admission.eta(position)
+        wait = f", ~{math.ceil(eta)} s" if eta is not None else ""
+        return f"⏳ Queued: position {position} of {self.admission.waiting()}{wait}"
+    
+    def _busy_message(self):
+        return f"Server busy: {self.admission.max_waiting} analyses already waiting, try again shortly"
+    
+    def get_admission_stats(self):
+        """Analysis admission plus per-provider concurrency: slots in use, queue lengths, rejections"""
+        queues = dict(self.runtime.provider_queues)
+        return {'analyses': self.admission.stats(),
+                'providers': {name: queue.stats() for name, queue in queues.items() if queue is not None}}
+    
+    async def _acall_model(self, method, {{input_data}}, model, prompt):
+        """Call one provider through its circuit breakers, recording latency on success"""
+        if not self._breaker_allows(model):
+            self._observe_call(model, 'circuit_open')
+            return None, None, f"{model} skipped: circuit open"
+        
+        try:
+            async with self._provider_slot(model):
+                # Latency excludes time waiting for the slot, so hedge delays track the backend
+                start = time.monotonic()
+                {{output_var}}, api_used, error = await method({{input_data}}, model, prompt)
+        except asyncio.CancelledError:
+            # Lost a hedge race - not the backend's fault
+            for breaker in self._breakers_for(model):
+                breaker.release()
+            self._observe_call(model, 'cancelled')
+            raise
+        
+        elapsed = time.monotonic() - start
+        if {{output_var}}:
+            self._record_latency(model, elapsed)
+            self._record_outcome(model, True)
+        else:
+            self._record_outcome(model, False, transport=isinstance(error, TransportFailure))
+        self._observe_call(model, 'success' if {{output_var}} else 'failure', elapsed)
+        return {{output_var}}, api_used, error
+    
+    def _record_latency(self, model, seconds):
+        with self._latencies_lock:
+            self._latencies.setdefault(model, deque(maxlen=500)).append(seconds)
+    
+    def _hedge_delay(self, model):
+        """Seconds to wait for a model before hedging: its latency percentile, or a default until warmed up"""
+        with self._latencies_lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < self.HEDGE_MIN_SAMPLES:
+            return self.HEDGE_DEFAULT_DELAY
+        index = min(int(len(samples) * self.HEDGE_PERCENTILE / 100), len(samples) - 1)
+        return max(samples[index], self.HEDGE_MIN_DELAY)
+    
+    async def _arun_providers(self, {{input_data}}, model, prompt):
+        """Route to the selected provider, then the fallback chain; returns (result, api_used, error, answered_model)"""
+        if self.hedging and self._fallback_chain(model):
+            return await self._arun_hedged({{input_data}}, model, prompt)
+        
+        # Route to appropriate API based on model selection
+        {{output_var}}, api_used, error = await self._acall_model(self._provider_method(model), {{input_data}}, model, prompt)
+        
+        # Fallback chain if primary method fails
+        if not {{output_var}}:
+            return await self._arun_fallbacks({{input_data}}, model, prompt, error)
+        
+        return {{output_var}}, api_used, error, model
+    
+    async def _arun_fallbacks(self, {{input_data}}, model, prompt, error=None):
+        """Try each fallback provider in turn after the primary has failed"""
+        for fallback_model, fallback_method in self._fallback_chain(model):
+            self._count('dragon_fallbacks_total', model=model, fallback=fallback_model, reason='error')
+            {{output_var}}, api_used, error = await self._acall_model(fallback_method, {{input_data}}, fallback_model, prompt)
+            if {{output_var}}:
+                return {{output_var}}, api_used, None, fallback_model
+        return None, None, error, model
+    
+    async def _arun_hedged(self, {{input_data}}, model, prompt):
+        """Race the fallback chain against a slow primary and keep the first good answer"""
+        candidates = deque([(model, self._provider_method(model))] + self._fallback_chain(model))
+        running = {}
+        error = None
+        next_launch = 0.0
+        
+        try:
+            while candidates or running:
+                now = time.monotonic()
+                # Launch the next candidate when the current ones are slow, or all have failed
+                if candidates and (not running or now >= next_launch):
+                    candidate_model, method = candidates.popleft()
+                    if candidate_model != model:
+                        self._count('dragon_fallbacks_total', model=model, fallback=candidate_model, reason='hedge' if running else 'error')
+                    task = asyncio.create_task(self._acall_model(method, {{input_data}}, candidate_model, prompt))
+                    running[task] = candidate_model
+                    next_launch = now + self._hedge_delay(candidate_model)
+                
+                timeout = max(next_launch - time.monotonic(), 0) if candidates else None
+                done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    candidate_model = running.pop(task)
+                    {{output_var}}, api_used, error = task.result()
+                    if {{output_var}}:
+                        return {{output_var}}, api_used, None, candidate_model
+        finally:
+            # Cancel whichever requests lost the race (dropping the connection stops the backend generating)
+            for task in running:
+                task.cancel()
+        
+        return None, None, error, model
+    
+    async def _arun_input(self, file_path, {{input_data}}, model, prompt, payload=None):
+        """Analyze a prepared payload, switching to map-reduce when it is too large for one request"""
+        segments = await self._to_thread(self._split_input, file_path, payload)
+        if segments:
+            return await self._arun_chunked(segments, model, prompt)
+        return await self._arun_providers({{input_data}}, model, prompt)
+    
+    async def _arun_chunked(self, segments, model, prompt):
+        """Map every segment concurrently (each result cached), then reduce the partial results into one"""
+        limit = asyncio.Semaphore(self.CHUNK_MAX_CONCURRENCY)
+        
+        async def analyze_segment(index, label, encoded, segment_hash):
+            segment_prompt = self.CHUNK_MAP_PROMPT.format(prompt=prompt, part=index + 1, parts=len(segments), label=label)
+            # Keyed by the requested model so a retry finds every segment that already succeeded
+            key = ResultCache.make_key(segment_hash, model, segment_prompt)
+            if self.result_cache is not None:
+                cached = await self._to_thread(self.result_cache.get, key)
+                self._count('dragon_cache_requests_total', cache='segment', outcome='hit' if cached else 'miss')
+                if cached:
+                    return cached['result'], None, True
+            async with limit:
+                {{output_var}}, api_used, error, answered_model = await self._arun_providers(encoded, model, segment_prompt)
+            if {{output_var}} and self.result_cache is not None:
+                await self._to_thread(self.result_cache.put, key, {{output_var}}, api_used, answered_model)
+            return {{output_var}}, error, False
+        
+        mapped = await asyncio.gather(*[analyze_segment(index, *segment) for index, segment in enumerate(segments)])
+        failed = [(segment[0], error) for segment, (text, error, _) in zip(segments, mapped) if not text]
+        if failed:
+            label, error = failed[0]
+            return None, None, f"{len(failed)}/{len(segments)} segments failed ({label}: {error}); retrying reprocesses only those", model
+        
+        partials = [(segment[0], text) for segment, (text, _, _) in zip(segments, mapped)]
+        {{output_var}}, api_used, error, answered_model = await self._areduce(partials, model, prompt)
+        if not {{output_var}}:
+            return None, None, f"reduce step failed: {error}", model
+        cached = sum(1 for _, _, hit in mapped if hit)
+        return {{output_var}}, f"{api_used} (map-reduce: {len(segments)} segments, {cached} cached)", None, answered_model
+    
+    async def _areduce(self, partials, model, prompt):
+        """Merge partial results with text-only requests, in groups of CHUNK_REDUCE_FAN_IN so each merge fits too"""
+        fan_in = max(self.CHUNK_REDUCE_FAN_IN, 2)
+        while True:
+            groups = [partials[i:i + fan_in] for i in range(0, len(partials), fan_in)]
+            merged = await asyncio.gather(*[self._amerge(group, model, prompt) for group in groups])
+            for {{output_var}}, api_used, error, answered_model in merged:
+                if not {{output_var}}:
+                    return None, None, error, model
+            if len(groups) == 1:
+                return merged[0]
+            partials = [(f"{group[0][0]} .. {group[-1][0]}", text) for group, (text, _, _, _) in zip(groups, merged)]
+    
+    async def _amerge(self, group, model, prompt):
+        """One reduce request over a group of partial results (a lone result passes through)"""
+        if len(group) == 1:
+            return group[0][1], None, None, model
+        notes = "\n\n".join(f"[{label}]\n{text}" for label, text in group)
+        return await self._arun_providers(None, model, self.CHUNK_REDUCE_PROMPT.format(prompt=prompt, notes=notes))
+    
+    def _record_result(self, file_path, {{output_var}}, model, api_used, prompt, content_hash, answered_model, performance=None,
+                       comparison_id=None, cache=True):
+        """Cache and log a fresh result (cache=False logs without caching, e.g. an answer cut off mid-stream)"""
+        # Cache under the model that actually answered
+        if cache and self.result_cache is not None:
+            self.result_cache.put(ResultCache.make_key(content_hash, answered_model, prompt), {{output_var}}, api_used, answered_model)
+        
+        # Log the result
+        self.log_analysis(file_path, {{output_var}}, model, api_used, prompt, file_hash=content_hash, performance=performance,
+                          comparison_id=comparison_id)
+    
+    async def _analyze(self, {{input_param}}, model, prompt):
+        """Shared async analysis path behind analyze() and aanalyze()"""
+        timer = StageTimer()
+        with timer.active(), self._profiled(timer):
+            model = model or 'ollama:{{DEFAULT_MODEL}}'
+            if not prompt or not prompt.strip():
                 prompt = "{{DEFAULT_PROMPT}}"
             
-            # Route to appropriate API based on model selection
-            {{output_var}}, api_used, error = None, None, None
+            ticket = self.admission.enter()
+            if ticket is None:
+                # Queue full: answer at once rather than join a line that would time out anyway
+                self._observe_analysis(timer.start, 'rejected')
+                return {'file': None, 'file_hash': None, 'model': model, 'prompt': prompt, '{{output_key}}': None, 'api_used': None,
+                        'answered_model': None, 'cached': False, 'error': self._busy_message(), 'timings': timer.snapshot()}
             
-            if model.startswith('ollama:'):
-                {{output_var}}, api_used, error = self.try_ollama_{{method_suffix}}({{input_data}}, model, prompt)
-            elif model.startswith('openai:'):
-                {{output_var}}, api_used, error = self.try_openai_{{method_suffix}}({{input_data}}, model, prompt)
-            elif model.startswith('google:'):
-                {{output_var}}, api_used, error = self.try_google_{{method_suffix}}({{input_data}}, model)
-            else:
-                # Default to Ollama
-                {{output_var}}, api_used, error = self.try_ollama_{{method_suffix}}({{input_data}}, model, prompt)
-            
-            # Fallback chain if primary method fails
-            if not {{output_var}}:
-                fallback_methods = [
-                    ('ollama:{{DEFAULT_MODEL}}', self.try_ollama_{{method_suffix}}),
-                ]
+            async with self._admitted(self.admission, ticket, 'analysis'):
+                # File reads and cache I/O run in threads so the event loop only ever waits on the network
+                payload_info = {}
+                file_path, {{input_data}}, content_hash = await self._to_thread(self._prepare_input, {{input_param}}, payload_info)
+                analysis = {
+                    'file': str(file_path) if file_path else None,
+                    'file_hash': content_hash,
+                    'model': model,
+                    'prompt': prompt,
+                    'source_bytes': payload_info.get('source_bytes'),
+                    'payload_bytes': payload_info.get('payload_bytes')
+                }
+                
+                cached, api_used = await self._to_thread(self._get_cached, file_path, content_hash, model, prompt)
+                if cached:
+                    analysis.update({'{{output_key}}': cached, 'api_used': api_used, 'answered_model': model, 'cached': True, 'error': None,
+                                     'timings': timer.snapshot()})
+                    self._observe_analysis(timer.start, 'cached')
+                    return analysis
+                
+                {{output_var}}, api_used, error, answered_model = await self._arun_input(
+                    file_path, {{input_data}}, model, prompt, payload_info.get('payload'))
+                if {{output_var}}:
+                    await self._to_thread(self._record_result, file_path, {{output_var}}, model, api_used, prompt, content_hash, answered_model)
+                self._observe_analysis(timer.start, 'success' if {{output_var}} else 'failure')
                 
-                for fallback_model, fallback_method in fallback_methods:
-                    if fallback_model != model:
-                        {{output_var}}, api_used, error = fallback_method({{input_data}}, fallback_model, prompt)
-                        if {{output_var}}:
-                            break
+                analysis.update({'{{output_key}}': {{output_var}}, 'api_used': api_used, 'answered_model': answered_model, 'cached': False, 'error': error,
+                                 'timings': timer.snapshot()})
+                return analysis
+    
+    def analyze(self, {{input_param}}, model=None, prompt=""):
+        """Headless analysis returning a result dict (no gradio or pandas involved)"""
+        return self._run_sync(self._analyze({{input_param}}, model, prompt))
+    
+    async def aanalyze(self, {{input_param}}, model=None, prompt=""):
+        """Async headless analysis returning a result dict (await from any event loop)"""
+        return await self._run_async(self._analyze({{input_param}}, model, prompt))
+    
+    async def aanalyze_{{type}}(self, {{input_param}}, model, prompt):
+        """Main analysis function for Gradio (async handler)"""
+        if {{input_param}} is None:
+            return "❌ Please upload a {{data_type}} file", "", pd.DataFrame()
+        
+        try:
+            analysis = await self.aanalyze({{input_param}}, model, prompt)
+            {{output_var}} = analysis['{{output_key}}']
             
             if {{output_var}}:
-                # Log the result
-                self.log_analysis(file_path, {{output_var}}, model, api_used, prompt)
-                
                 # Get updated logs
-                logs_df = self.get_recent_logs(5)
+                logs_df = await self._to_thread(self.get_recent_logs, 5)
                 
-                return {{output_var}}, f"✨ Analysis complete using {api_used}", logs_df
+                saved = self._payload_note(analysis)
+                # This handler answers once, so the time spent in line is reported afterwards
+                queued = analysis['timings']['stages'].get('queue', 0)
+                waited = f" after {queued / 1000:.1f} s in the queue" if queued >= 1000 else ""
+                return {{output_var}}, self._status(f"✨ Analysis complete using {analysis['api_used']}{waited}{saved}"), logs_df
             else:
-                return f"❌ Analysis failed: {error}", "❌ All {{data_type}} APIs failed", pd.DataFrame()
-                
+                return f"❌ Analysis failed: {analysis['error']}", self._status("❌ All {{data_type}} APIs failed"), pd.DataFrame()
+        
         except Exception as e:
             return f"❌ Error: {str(e)}", "❌ Analysis failed", pd.DataFrame()
-
-
-# Initialize the dragon
-dragon_{{instance}} = Dragon{{CLASS_SUFFIX}}()
+    
+    def analyze_{{type}}(self, {{input_param}}, model, prompt):
+        """Main analysis function for Gradio"""
+        return self._run_sync(self.aanalyze_{{type}}({{input_param}}, model, prompt))
+    
+    async def aanalyze_{{type}}_stream(self, {{input_param}}, model, prompt):
+        """Streaming analysis for Gradio: yields partial output while Ollama generates (async)"""
+        if {{input_param}} is None:
+            yield "❌ Please upload a {{data_type}} file", "", pd.DataFrame()
+            return
+        
+        timer = StageTimer()
+        ticket = self.admission.enter()
+        if ticket is None:
+            self._observe_analysis(timer.start, 'rejected')
+            yield f"❌ {self._busy_message()}", self._status("🚦 Queue full"), pd.DataFrame()
+            return
+        
+        # Show the place in line until a slot frees up (leaving the page gives the place up)
+        waiter = asyncio.wrap_future(ticket)
+        try:
+            while not ticket.done():
+                yield "", self._status(self._queue_note(ticket)), None
+                await asyncio.wait([waiter], timeout=self.QUEUE_STATUS_INTERVAL)
+        except BaseException:
+            self.admission.release(ticket)
+            raise
+        timer.add('queue', time.monotonic() - timer.start)
+        
+        async with self._admitted(self.admission, ticket, 'analysis', since=timer.start):
+            with self._profiled(timer):
+                try:
+                    payload_info = {}
+                    file_path, {{input_data}}, content_hash = await timer.track(self._to_thread(self._prepare_input, {{input_param}}, payload_info))
+                    saved = self._payload_note(payload_info)
+                    
+                    if not prompt.strip():
+                        prompt = "{{DEFAULT_PROMPT}}"
+                    
+                    cached, api_used = await timer.track(self._to_thread(self._get_cached, file_path, content_hash, model, prompt))
+                    if cached:
+                        self._observe_analysis(timer.start, 'cached')
+                        yield cached, f"✨ Analysis complete using {api_used}", await self._to_thread(self.get_recent_logs, 5)
+                        return
+                    
+                    # Oversized inputs are analyzed segment by segment, then merged
+                    segments = await timer.track(self._to_thread(self._split_input, file_path, payload_info.get('payload')))
+                    routed = None
+                    if segments:
+                        yield "", self._status(f"⏳ Analyzing {len(segments)} segments with {model}..."), None
+                        routed = self._arun_chunked(segments, model, prompt)
+                    elif model.startswith(('openai:', 'google:')):
+                        # Only Ollama streams; other providers answer in one piece
+                        yield "", self._status(f"⏳ Waiting for {model}..."), None
+                        routed = self._arun_providers({{input_data}}, model, prompt)
+                    else:
+                        ollama_model = model.replace('ollama:', '')
+                        api_used = f'Ollama ({ollama_model})'
+                        performance = {}
+                        {{output_var}} = ""
+                        error = None
+                        incomplete = False
+                        if not self._breaker_allows(model):
+                            error = f"{model} skipped: circuit open"
+                            self._observe_call(model, 'circuit_open')
+                        else:
+                            call_start = time.monotonic()
+                            try:
+                                async with self._provider_slot(model):
+                                    call_start = time.monotonic()
+                                    tokens = self._iterate_async(self.astream_ollama_{{method_suffix}}({{input_data}}, model, prompt, performance))
+                                    try:
+                                        async for token in tokens:
+                                            {{output_var}} += token
+                                            yield {{output_var}}, self._status(f"⏳ Streaming from {api_used}..."), None  # None: logs unchanged
+                                    finally:
+                                        # A client that stops reading closes the Ollama response now, not when the generator is collected
+                                        await tokens.aclose()
+                                self._record_outcome(model, True)
+                                self._observe_call(model, 'success', time.monotonic() - call_start)
+                            except Exception as e:
+                                error = str(e) if isinstance(e, RuntimeError) else provider_error("Ollama", e)
+                                self._record_outcome(model, False, transport=isinstance(e, httpx.TransportError))
+                                self._observe_call(model, 'failure', time.monotonic() - call_start)
+                                if {{output_var}}:
+                                    # Keep what was generated rather than discarding a partial answer (logged, not cached)
+                                    api_used = f"{api_used} (incomplete: {e})"
+                                    error = None
+                                    incomplete = True
+                            except BaseException:
+                                # The consumer went away mid-stream (GeneratorExit, cancellation): no verdict on the backend,
+                                # but a half-open probe slot must be handed back or the breaker stays shut for good
+                                for breaker in self._breakers_for(model):
+                                    breaker.release()
+                                self._observe_call(model, 'cancelled')
+                                raise
+                            # Request plus streamed answer (includes time the consumer spent on each partial output)
+                            timer.add('stream', time.monotonic() - call_start)
+                            if not {{output_var}} and not error:
+                                error = f"{model} returned no {{output_type}}"
+                        if error:
+                            routed = self._arun_fallbacks({{input_data}}, model, prompt, error)
+                    
+                    if routed is not None:
+                        {{output_var}}, api_used, error, answered_model = await timer.track(self._run_async(routed))
+                        if not {{output_var}}:
+                            self._observe_analysis(timer.start, 'failure')
+                            yield f"❌ Analysis failed: {error}", self._status("❌ All {{data_type}} APIs failed"), pd.DataFrame()
+                            return
+                        await timer.track(self._to_thread(self._record_result, file_path, {{output_var}}, model, api_used, prompt, content_hash, answered_model))
+                        self._observe_analysis(timer.start, 'success')
+                        yield {{output_var}}, self._status(f"✨ Analysis complete using {api_used}{saved}"), await self._to_thread(self.get_recent_logs, 5)
+                        return
+                    
+                    await timer.track(self._to_thread(self._record_result, file_path, {{output_var}}, model, api_used, prompt, content_hash, model, performance,
+                                                        cache=not incomplete))
+                    self._observe_analysis(timer.start, 'incomplete' if incomplete else 'success')
+                    
+                    rate = performance.get('tokens_per_sec')
+                    speed = f" ({performance.get('ttft_ms', 0):.0f} ms to first token, {rate:.1f} tok/s)" if rate else ""
+                    if performance.get('cold_start'):
+                        speed += f" 🧊 cold start: {performance['load_ms'] / 1000:.1f} s loading the model"
+                    yield {{output_var}}, self._status(f"✨ Analysis complete using {api_used}{speed}{saved}"), await self._to_thread(self.get_recent_logs, 5)
+                
+                except Exception as e:
+                    self._observe_analysis(timer.start, 'failure')
+                    yield f"❌ Error: {str(e)}", "❌ Analysis failed", pd.DataFrame()
+    
+    def analyze_{{type}}_stream(self, {{input_param}}, model, prompt):
+        """Streaming analysis for Gradio: yields partial output while Ollama generates"""
+        yield from self._iterate_sync(self.aanalyze_{{type}}_stream({{input_param}}, model, prompt))
+    
 
 # Custom CSS for {{type}}-themed dragon interface
 css = """
@@ -333,102 +3561,363 @@ button:has-text("🔄 Refresh Models"), button[aria-label*="Refresh"] {
 }
 """
 
-# Create Gradio interface for Dragon{{TYPE}}
-with gr.Blocks(css=css, title="{{EMOJI}} Dragon{{TYPE}}") as demo:
-    gr.Markdown("# {{EMOJI}} Dragon{{TYPE}}")
-    
-    with gr.Tabs():
-        with gr.TabItem("{{TAB_ICON}} Analyze"):
-            with gr.Row():
-                with gr.Column(scale=1):
-                    # {{DATA_TYPE}} input
-                    {{input_component}} = gr.{{GRADIO_COMPONENT}}(
-                        label="{{INPUT_LABEL}}", 
-                        type="{{GRADIO_TYPE}}",
-                        {{COMPONENT_PARAMS}}
-                    )
-                    
-                    # Model selection
-                    model_dropdown = gr.Dropdown(
-                        choices=dragon_{{instance}}.get_available_models(),
-                        value=dragon_{{instance}}.get_available_models()[0] if dragon_{{instance}}.get_available_models() else "{{DEFAULT_MODEL}}",
-                        label="🤖 Model",
-                        interactive=True
-                    )
-                    
-                    # Refresh models button
-                    refresh_btn = gr.Button("🔄 Refresh Models", size="sm")
-                    
-                    # Custom prompt
-                    prompt_input = gr.Textbox(
-                        label="📝 Custom Prompt",
-                        placeholder="{{DEFAULT_PROMPT}}",
-                        value="{{DEFAULT_PROMPT}}",
-                        lines=2
-                    )
+def build_interface(dragon_{{instance}}):
+    """Create the Gradio interface for Dragon{{TYPE}}"""
+    with gr.Blocks(css=css, title="{{EMOJI}} Dragon{{TYPE}}") as demo:
+        gr.Markdown("# {{EMOJI}} Dragon{{TYPE}}")
+        
+        with gr.Tabs():
+            with gr.TabItem("{{TAB_ICON}} Analyze"):
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        # {{DATA_TYPE}} input
+                        {{input_component}} = gr.{{GRADIO_COMPONENT}}(
+                            label="{{INPUT_LABEL}}", 
+                            type="{{GRADIO_TYPE}}",
+                            {{COMPONENT_PARAMS}}
+                        )
+                        
+                        # Model selection (read from the cached registry, never blocks startup)
+                        initial_models = dragon_{{instance}}.get_available_models()
+                        model_dropdown = gr.Dropdown(
+                            choices=initial_models,
+                            value=initial_models[0] if initial_models else "{{DEFAULT_MODEL}}",
+                            label="🤖 Model",
+                            interactive=True
+                        )
+                        
+                        # Refresh models button
+                        refresh_btn = gr.Button("🔄 Refresh Models", size="sm")
+                        
+                        # Custom prompt
+                        prompt_input = gr.Textbox(
+                            label="📝 Custom Prompt",
+                            placeholder="{{DEFAULT_PROMPT}}",
+                            value="{{DEFAULT_PROMPT}}",
+                            lines=2
+                        )
+                        
+                        # Stream tokens into the output box as they are generated (Ollama)
+                        stream_checkbox = gr.Checkbox(label="⚡ Stream output", value=True)
+                        
+                        # Analyze button
+                        analyze_btn = gr.Button("{{ANALYZE_BUTTON}}", variant="primary", size="lg")
                     
-                    # Analyze button
-                    analyze_btn = gr.Button("{{ANALYZE_BUTTON}}", variant="primary", size="lg")
+                    with gr.Column(scale=1):
+                        # Results
+                        status_output = gr.Textbox(label="🔮 Status", interactive=False)
+                        {{output_component}} = gr.Textbox(
+                            label="{{OUTPUT_LABEL}}", 
+                            lines=10,
+                            max_lines=15,
+                            interactive=False
+                        )
                 
-                with gr.Column(scale=1):
-                    # Results
-                    status_output = gr.Textbox(label="🔮 Status", interactive=False)
-                    {{output_component}} = gr.Textbox(
-                        label="{{OUTPUT_LABEL}}", 
-                        lines=10,
-                        max_lines=15,
-                        interactive=False
-                    )
-            
-            # Quick logs preview
-            gr.Markdown("## 📝 Recent Analysis (Quick View)")
-            logs_output = gr.Dataframe(
-                headers=["Timestamp", "File", "Model", "API", "Tags"],
-                label="Last 5 Analyses",
-                interactive=False
-            )
+                # Quick logs preview
+                gr.Markdown("## 📝 Recent Analysis (Quick View)")
+                logs_output = gr.Dataframe(
+                    headers=["Timestamp", "File", "Model", "API", "Latency ms", "Tags"],
+                    label="Last 5 Analyses",
+                    interactive=False
+                )
+            
+            with gr.TabItem("⚖️ Compare"):
+                gr.Markdown("### ⚖️ Compare Models Side by Side")
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        compare_input = gr.{{GRADIO_COMPONENT}}(
+                            label="{{INPUT_LABEL}}", 
+                            type="{{GRADIO_TYPE}}",
+                            {{COMPONENT_PARAMS}}
+                        )
+                    with gr.Column(scale=1):
+                        compare_models = gr.CheckboxGroup(choices=initial_models, value=initial_models[:2], label="🤖 Models")
+                        compare_prompt = gr.Textbox(label="📝 Prompt", value="{{DEFAULT_PROMPT}}", lines=2)
+                        compare_btn = gr.Button("⚖️ Compare", variant="primary")
+                
+                compare_status = gr.Markdown()
+                compare_results = gr.Dataframe(label="Results (one row per model)", interactive=False, wrap=True)
+            
+            with gr.TabItem("📦 Batch"):
+                gr.Markdown("### 📦 Batch {{DATA_TYPE}} Analysis")
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        batch_files = gr.File(label="📁 Upload {{DATA_TYPE}} Files", file_count="multiple", type="filepath")
+                        # Only offered when the Dragon was given a folder to read from (DRAGON_BATCH_ROOT)
+                        batch_directory = gr.Textbox(label=f"📂 Or a folder under {dragon_{{instance}}.batch_root}", placeholder="{{data_type}}_files",
+                                                     visible=dragon_{{instance}}.batch_root is not None)
+                        batch_pattern = gr.Textbox(label="Filename pattern", value="*.{{FILE_EXTENSION}}")
+                    with gr.Column(scale=1):
+                        batch_model = gr.Dropdown(
+                            choices=initial_models,
+                            value=initial_models[0] if initial_models else "{{DEFAULT_MODEL}}",
+                            label="🤖 Model",
+                            interactive=True
+                        )
+                        batch_prompt = gr.Textbox(label="📝 Prompt", value="{{DEFAULT_PROMPT}}", lines=2)
+                        batch_workers = gr.Slider(1, 32, value=dragon_{{instance}}.BATCH_MAX_WORKERS, step=1, label="Workers")
+                        batch_resume = gr.Checkbox(label="⏭️ Skip inputs already in the log", value=True)
+                        batch_btn = gr.Button("📦 Run Batch", variant="primary")
+                
+                batch_progress = gr.Markdown()
+                batch_results = gr.Dataframe(label="Batch Results", interactive=False)
+                batch_export = gr.File(label="⬇️ Export (CSV)")
+            
+            with gr.TabItem("📊 Detailed Logs"):
+                gr.Markdown("### 🗂️ Complete {{DATA_TYPE}} Analysis History")
+                
+                with gr.Row():
+                    history_search = gr.Textbox(label="🔎 Search outputs and tags", scale=3)
+                    history_page = gr.Number(label="Page", value=1, precision=0, minimum=1, scale=1)
+                with gr.Row():
+                    prev_page_btn = gr.Button("⬅️ Previous", size="sm")
+                    next_page_btn = gr.Button("Next ➡️", size="sm")
+                history_info = gr.Markdown()
+                profile_rate = gr.Slider(
+                    0, 1, value=dragon_{{instance}}.profile_rate, step=0.01,
+                    label="🔬 Profile this fraction of requests (cProfile files in dragon{{type}}_profiles/)"
+                )
+                
+                # Detailed logs table
+                detailed_logs = gr.Dataframe(
+                    headers=["ID", "Time", "File", "Model", "Latency ms", "Tags", "Word Count"],
+                    label="Click a row to see full details",
+                    interactive=True
+                )
+                
+                # Full output display
+                full_output = gr.Textbox(
+                    label="Complete {{OUTPUT_TYPE}}",
+                    lines=8,
+                    interactive=False
+                )
+        
+        # Footer
+        gr.Markdown("---")
+        gr.Markdown("<center><i>Powered by Ollama with cloud {{data_type}} API fallbacks</i></center>")
+        gr.Markdown("*Copyright © 2025 Seed13 Productions. All rights reserved.*", elem_classes="footer")
         
-        with gr.TabItem("📊 Detailed Logs"):
-            gr.Markdown("### 🗂️ Complete {{DATA_TYPE}} Analysis History")
+        # Event handlers
+        def refresh_models():
+            new_models = dragon_{{instance}}.get_available_models()
+            current_value = new_models[0] if new_models else "ollama:{{DEFAULT_MODEL}}"
+            return gr.Dropdown(choices=new_models, value=current_value)
+        
+        def refresh_compare_models(selected):
+            new_models = dragon_{{instance}}.get_available_models()
+            kept = [m for m in selected or [] if m in new_models]
+            return gr.CheckboxGroup(choices=new_models, value=kept or new_models[:2])
+        
+        async def run_compare({{input_component}}, models, prompt):
+            if {{input_component}} is None:
+                yield "❌ Please upload a {{data_type}} file", pd.DataFrame()
+                return
+            if not models:
+                yield "❌ Select at least one model", pd.DataFrame()
+                return
             
-            # Detailed logs table
-            detailed_logs = gr.Dataframe(
-                headers=["Time", "File", "Model", "Tags", "Word Count"],
-                label="Click a row to see full details",
-                interactive=True
-            )
+            rows = []
+            comparison_id = None
+            try:
+                async for comparison_id, row in dragon_{{instance}}.acompare_models({{input_component}}, models, prompt):
+                    rows.append(row)
+                    yield f"⏳ {len(rows)}/{len(models)} models answered", pd.DataFrame(rows)
+            except RuntimeError as e:
+                yield f"❌ {e}", pd.DataFrame(rows)
+                return
             
-            # Full output display
-            full_output = gr.Textbox(
-                label="Complete {{OUTPUT_TYPE}}",
-                lines=8,
-                interactive=False
-            )
-    
-    # Footer
-    gr.Markdown("---")
-    gr.Markdown("<center><i>Powered by Ollama with cloud {{data_type}} API fallbacks</i></center>")
-    gr.Markdown("*Copyright © 2025 Seed13 Productions. All rights reserved.*", elem_classes="footer")
+            # Final table in the order the models were picked
+            rows.sort(key=lambda row: models.index(row['Model']))
+            answered = sum(1 for row in rows if row['Status'].startswith('ok'))
+            yield f"✨ Comparison `{comparison_id}`: {answered}/{len(rows)} models answered", pd.DataFrame(rows)
+        
+        def run_batch(files, directory, pattern, model, prompt, workers, resume):
+            try:
+                paths = dragon_{{instance}}.collect_batch_inputs(files, directory, pattern)
+            except ValueError as e:
+                yield f"❌ {e}", pd.DataFrame(), None
+                return
+            if not paths:
+                yield "❌ No input files found", pd.DataFrame(), None
+                return
+            
+            rows = []
+            started = last_update = time.monotonic()
+            for completed, total, row in dragon_{{instance}}.run_batch(paths, model, prompt, int(workers), resume):
+                rows.append(row)
+                # Throttle UI updates for large batches
+                if completed == total or time.monotonic() - last_update > 0.5:
+                    last_update = time.monotonic()
+                    rate = completed / max(last_update - started, 1e-6)
+                    progress = f"⏳ {completed}/{total} done ({rate:.1f}/s)"
+                    yield progress, pd.DataFrame(rows), None
+            
+            failed = sum(1 for row in rows if not row['Status'].startswith(('ok', 'skipped')))
+            skipped = sum(1 for row in rows if row['Status'].startswith('skipped'))
+            summary = f"✨ Batch complete: {len(rows) - failed - skipped} analyzed, {skipped} skipped, {failed} failed"
+            yield summary, pd.DataFrame(rows), dragon_{{instance}}.export_batch_results(rows)
+        
+        HISTORY_PAGE_SIZE = 25
+        
+        def load_history(page, search):
+            page = max(int(page or 1), 1)
+            table, total = dragon_{{instance}}.get_history_page(page, HISTORY_PAGE_SIZE, search or "")
+            if total is None:
+                info = f"Page {page}"
+            else:
+                pages = max((total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE, 1)
+                info = f"Page {page} of {pages} ({total} analyses)"
+            return table, page, info
+        
+        def set_profile_rate(rate):
+            dragon_{{instance}}.set_profile_rate(rate)
+        
+        def show_full_output(table, evt: gr.SelectData):
+            # Fetch the full text only for the clicked row
+            row = evt.row_value if evt.row_value else table.iloc[evt.index[0]].tolist()
+            return dragon_{{instance}}.get_full_output(row[0])
+        
+        # Wire up events
+        refresh_btn.click(refresh_models, outputs=model_dropdown)
+        
+        compare_btn.click(
+            run_compare,
+            inputs=[compare_input, compare_models, compare_prompt],
+            outputs=[compare_status, compare_results],
+            concurrency_limit=None  # Admission control happens in the Dragon
+        )
+        
+        batch_btn.click(
+            run_batch,
+            inputs=[batch_files, batch_directory, batch_pattern, batch_model, batch_prompt, batch_workers, batch_resume],
+            outputs=[batch_progress, batch_results, batch_export]
+        )
+        
+        history_outputs = [detailed_logs, history_page, history_info]
+        history_search.submit(lambda search: load_history(1, search), inputs=history_search, outputs=history_outputs)
+        history_page.submit(load_history, inputs=[history_page, history_search], outputs=history_outputs)
+        prev_page_btn.click(lambda page, search: load_history((page or 1) - 1, search), inputs=[history_page, history_search], outputs=history_outputs)
+        next_page_btn.click(lambda page, search: load_history((page or 1) + 1, search), inputs=[history_page, history_search], outputs=history_outputs)
+        detailed_logs.select(show_full_output, inputs=detailed_logs, outputs=full_output)
+        profile_rate.release(set_profile_rate, inputs=profile_rate)
+        
+        async def run_analysis({{input_component}}, model, prompt, stream):
+            # Async generator handler: in-flight inferences wait as coroutines, not worker threads
+            if stream:
+                async for output, status, logs in dragon_{{instance}}.aanalyze_{{type}}_stream({{input_component}}, model, prompt):
+                    yield output, status, gr.skip() if logs is None else logs
+            else:
+                yield await dragon_{{instance}}.aanalyze_{{type}}({{input_component}}, model, prompt)
+        
+        analyze_btn.click(
+            run_analysis,
+            inputs=[{{input_component}}, model_dropdown, prompt_input, stream_checkbox],
+            outputs=[{{output_component}}, status_output, logs_output],
+            concurrency_limit=None  # Async handler; the Dragon admits, queues (showing position/ETA) or rejects each analysis
+        )
+        
+        # Load initial logs and the latest cached model list
+        demo.load(lambda: dragon_{{instance}}.get_recent_logs(5), outputs=logs_output)
+        demo.load(refresh_models, outputs=model_dropdown)
+        demo.load(refresh_models, outputs=batch_model)
+        demo.load(refresh_compare_models, inputs=compare_models, outputs=compare_models)
+        demo.load(lambda: load_history(1, ""), outputs=history_outputs)
     
-    # Event handlers
-    def refresh_models():
-        new_models = dragon_{{instance}}.get_available_models()
-        current_value = new_models[0] if new_models else "ollama:{{DEFAULT_MODEL}}"
-        return gr.Dropdown(choices=new_models, value=current_value)
+    # Gradio's own queue is only a backstop above the Dragon's admission limits (other events, e.g. history, share it)
+    admission = dragon_{{instance}}.admission
+    demo.queue(max_size=2 * (admission.max_active + admission.max_waiting))
+    return demo
+
+
+_lazy_lock = threading.Lock()
+
+
+def get_dragon(**options):
+    """Shared Dragon{{CLASS_SUFFIX}} instance used by the UI (created on first use, with options such as runtime=)"""
+    with _lazy_lock:
+        if 'dragon_{{instance}}' not in globals():
+            globals()['dragon_{{instance}}'] = Dragon{{CLASS_SUFFIX}}(**options)
+        return globals()['dragon_{{instance}}']
+
+
+def __getattr__(name):
+    # Build the dragon and the UI lazily so `import` stays fast for headless use
+    if name == 'dragon_{{instance}}':
+        return get_dragon()
+    if name == 'demo':
+        dragon = get_dragon()
+        with _lazy_lock:
+            if 'demo' not in globals():
+                globals()['demo'] = build_interface(dragon)
+            return globals()['demo']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def run_cli(args):
+    """Headless analysis: inputs from files, directories or stdin ("-"), results as JSON lines on stdout"""
+    import sys
+    dragon = Dragon{{CLASS_SUFFIX}}(discover_models=False)
     
-    # Wire up events
-    refresh_btn.click(refresh_models, outputs=model_dropdown)
+    def analyze_one(source):
+        start = time.monotonic()
+        try:
+            data = sys.stdin.buffer.read() if source == '-' else source
+            result = dragon.analyze(data, args.model, args.prompt)
+        except Exception as e:
+            result = {'file': source, 'error': str(e), '{{output_key}}': None}
+        result['seconds'] = round(time.monotonic() - start, 3)
+        return result
     
-    analyze_btn.click(
-        dragon_{{instance}}.analyze_{{type}},
-        inputs=[{{input_component}}, model_dropdown, prompt_input],
-        outputs=[{{output_component}}, status_output, logs_output]
-    )
+    inputs = []
+    for source in args.inputs:
+        if source != '-' and Path(source).is_dir():
+            inputs.extend(dragon.expand_directory(source, args.pattern))
+        else:
+            inputs.append(source)
     
-    # Load initial logs
-    demo.load(lambda: dragon_{{instance}}.get_recent_logs(5), outputs=logs_output)
+    failures = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            for result in executor.map(analyze_one, inputs):
+                failures += 0 if result.get('{{output_key}}') else 1
+                sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+                sys.stdout.flush()
+    finally:
+        dragon.close()
+    return 1 if failures else 0
+
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Dragon{{TYPE}} - AI {{DATA_TYPE}} Analysis Tool")
+    parser.add_argument("--import-logs", nargs="?", const="dragon*_logs.jsonl", metavar="PATTERN",
+                        help="Migrate JSONL logs into dragon{{type}}_logs.db and exit")
+    parser.add_argument("--compact-logs", action="store_true",
+                        help="Drop and trim old log entries per the retention policy, print what changed and exit")
+    parser.add_argument("--retention-days", type=int, help="Days of history --compact-logs keeps (0 keeps everything)")
+    parser.add_argument("--trim-days", type=int, help="Days after which --compact-logs trims outputs (0 never trims)")
+    parser.add_argument("--cli", dest="inputs", nargs="+", metavar="INPUT",
+                        help="Analyze files/directories (or - for stdin) without the UI, printing JSON lines")
+    parser.add_argument("--model", default="ollama:{{DEFAULT_MODEL}}", help="Model for --cli (default: %(default)s)")
+    parser.add_argument("--prompt", default="", help="Prompt for --cli (default: built-in prompt)")
+    parser.add_argument("--pattern", default="*", help="Filename pattern for directories given to --cli")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent analyses for --cli")
+    args = parser.parse_args()
+    
+    if args.import_logs:
+        for path, count in Dragon{{CLASS_SUFFIX}}(discover_models=False).import_jsonl_logs(args.import_logs).items():
+            print(f"✅ Imported {count} entries from {path}")
+        raise SystemExit(0)
+    
+    if args.compact_logs:
+        dragon = Dragon{{CLASS_SUFFIX}}(discover_models=False)
+        print(json.dumps(dragon.compact_logs(args.retention_days, args.trim_days)))
+        dragon.close()
+        raise SystemExit(0)
+    
+    if args.inputs:
+        raise SystemExit(run_cli(args))
+    
     print("{{EMOJI}} Dragon{{TYPE}} Gradio - Copyright © 2025 Seed13 Productions")
     print("=" * 60)
     print("Starting Dragon{{TYPE}} with public sharing enabled...")
@@ -436,11 +3925,18 @@ if __name__ == "__main__":
     print("🔒 Your {{data_type}} files are processed locally, only the interface is shared")
     print("=" * 60)
     
+    dragon = get_dragon()
+    demo = build_interface(dragon)
+    
+    # Prometheus metrics are served from the same app at /metrics (DRAGON_METRICS=0 disables)
+    app_kwargs = {'routes': [metrics_route(dragon.metrics)]} if os.getenv('DRAGON_METRICS', '1') != '0' else {}
+    
     # Launch the interface with sharing enabled
     demo.launch(
         server_name="0.0.0.0",
         server_port={{PORT}},  # Unique port for each Dragon variant
         share=True,
         show_error=True,
-        favicon_path=None
-    )
\ No newline at end of file
+        favicon_path=None,
+        app_kwargs=app_kwargs
+    )
@@ -4,15 +4,55 @@ Dragon Template Setup Script
 Copyright © 2025 Seed13 Productions. All rights reserved.
 
 Interactive setup script to customize the Dragon template for your specific use case.
+With --manifest, renders a whole fleet of variants from a JSON file instead:
+
+    python setup_dragon.py --manifest dragons.json --output-dir build/
 """
 
 import os
+import sys
 import json
 import re
 from pathlib import Path
 
 
+class TemplateRenderer:
+    """A template tokenized once into literal and {{NAME}} placeholder segments, so each render is a single join"""
+    
+    PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+    
+    def __init__(self, content):
+        # With one capture group, re.split alternates literal, name, literal, ... and always starts and ends with a literal
+        parts = self.PLACEHOLDER.split(content)
+        self.literals = parts[0::2]
+        self.names = parts[1::2]
+        self.placeholders = set(self.names)
+        # Template line of each placeholder, for reporting ones a config leaves unreplaced
+        self.lines = []
+        line = 1
+        for literal in self.literals[:-1]:
+            line += literal.count('\n')
+            self.lines.append(line)
+    
+    def render(self, config):
+        """Fill the placeholders from config, returning (text, {unreplaced name: first template line})"""
+        values = {name: str(config[name]) for name in self.placeholders if name in config}
+        unreplaced = {}
+        pieces = [self.literals[0]]
+        for name, line, literal in zip(self.names, self.lines, self.literals[1:]):
+            if name in values:
+                pieces.append(values[name])
+            else:
+                unreplaced.setdefault(name, line)
+                pieces.append(f"{{{{{name}}}}}")
+            pieces.append(literal)
+        return ''.join(pieces), unreplaced
+
+
 class DragonSetup:
+    MANIFEST_KEYS = {'name', 'data_type', 'description', 'emoji', 'default_model', 'model_keywords', 'openai_models',
+                     'color_scheme', 'port', 'input_param', 'output_param', 'prompt', 'descriptors', 'placeholders'}
+    
     def __init__(self):
         self.config = {}
         self.template_file = "dragon_template.py"
@@ -95,14 +135,17 @@ class DragonSetup:
         
         # Description
         description = input(f"Brief description of Dragon{dragon_name}: ").strip()
-        if not description:
-            description = f"AI-powered {data_type.lower()} analysis tool"
         
         # Emoji
         emoji = input(f"Choose an emoji for Dragon{dragon_name} (e.g., 📄, 🎬, 💻): ").strip()
         if not emoji:
             emoji = "🐉"
         
+        self.apply_basic_config(dragon_name, data_type, description, emoji)
+    
+    def apply_basic_config(self, dragon_name, data_type="Data", description=None, emoji="🐉"):
+        """Set the basic placeholders from a Dragon name and data type"""
+        description = description or f"AI-powered {data_type.lower()} analysis tool"
         self.config.update({
             "TYPE": dragon_name,
             "type": dragon_name.lower(),
@@ -148,24 +191,29 @@ class DragonSetup:
         
         # Model keywords for discovery
         keywords_input = input("Keywords to identify relevant models (comma-separated): ").strip()
-        if keywords_input:
-            keywords = [f"'{k.strip()}'" for k in keywords_input.split(',')]
-        else:
-            keywords = ["'llama'", "'chat'"]
+        keywords = [k.strip() for k in keywords_input.split(',')] if keywords_input else None
         
         # OpenAI models
         openai_input = input("OpenAI models to include (comma-separated, or 'none'): ").strip()
         if openai_input.lower() == 'none':
-            openai_models = "[]"
+            openai_models = []
         elif openai_input:
-            openai_models = [f"'openai:{m.strip()}'" for m in openai_input.split(',')]
+            openai_models = [m.strip() for m in openai_input.split(',')]
         else:
-            openai_models = ["'openai:gpt-4', 'openai:gpt-3.5-turbo'"]
+            openai_models = None
+        
+        self.apply_api_config(default_model, keywords, openai_models)
+    
+    def apply_api_config(self, default_model="llama2", keywords=None, openai_models=None):
+        """Set the model placeholders (keywords and OpenAI model names as plain lists)"""
+        keywords = keywords or ['llama', 'chat']
+        if openai_models is None:
+            openai_models = ['gpt-4', 'gpt-3.5-turbo']
         
         self.config.update({
             "DEFAULT_MODEL": default_model,
-            "MODEL_KEYWORDS": f"[{', '.join(keywords)}]",
-            "OPENAI_MODELS": str(openai_models) if isinstance(openai_models, list) else openai_models,
+            "MODEL_KEYWORDS": repr(list(keywords)),
+            "OPENAI_MODELS": repr([f"openai:{model}" for model in openai_models]),
             "GOOGLE_MODELS": "['google:gemini-pro']",  # Default
             "method_suffix": self.config["type"],
             "DEFAULT_OPENAI_MODEL": "gpt-4",
@@ -190,10 +238,9 @@ class DragonSetup:
                     choice = int(choice)
                     if 1 <= choice <= len(self.color_schemes):
                         scheme_name = list(self.color_schemes.keys())[choice - 1]
-                        color_config = self.color_schemes[scheme_name]
                         break
                 elif choice.lower() in self.color_schemes:
-                    color_config = self.color_schemes[choice.lower()]
+                    scheme_name = choice.lower()
                     break
                 print("Invalid choice. Please try again.")
             except ValueError:
@@ -206,6 +253,14 @@ class DragonSetup:
         if not port.isdigit():
             port = str(suggested_port)
         
+        self.apply_ui_config(scheme_name, port)
+    
+    def apply_ui_config(self, color_scheme="purple", port=7860):
+        """Set the color, port and Gradio component placeholders"""
+        if color_scheme not in self.color_schemes:
+            raise ValueError(f"Unknown color scheme {color_scheme!r} (choose from {', '.join(self.color_schemes)})")
+        color_config = self.color_schemes[color_scheme]
+        
         # Gradio component
         component_map = {
             "image": ("Image", "pil", "height=300"),
@@ -222,7 +277,7 @@ class DragonSetup:
         
         self.config.update(color_config)
         self.config.update({
-            "PORT": port,
+            "PORT": str(port),
             "GRADIO_COMPONENT": comp,
             "GRADIO_TYPE": comp_type,
             "COMPONENT_PARAMS": comp_params,
@@ -239,30 +294,29 @@ class DragonSetup:
         
         # Input/output parameters
         input_param = input("Input parameter name (e.g., 'image_data', 'audio_file'): ").strip()
-        if not input_param:
-            input_param = f"{self.config['type']}_data"
-        
         output_param = input("Output parameter name (e.g., 'description', 'transcription'): ").strip()
-        if not output_param:
-            output_param = "analysis_result"
         
         # Default prompt
         default_prompt = input("Default analysis prompt: ").strip()
-        if not default_prompt:
-            default_prompt = f"Analyze this {self.config['data_type']} in detail."
         
         # Metadata descriptors
         descriptors_input = input("Relevant descriptors for metadata (comma-separated): ").strip()
-        if descriptors_input:
-            descriptors = [f"'{d.strip()}'" for d in descriptors_input.split(',')]
-        else:
-            descriptors = ["'data'", "'content'", "'information'"]
+        descriptors = [d.strip() for d in descriptors_input.split(',')] if descriptors_input else None
+        
+        self.apply_data_flow_config(input_param, output_param, default_prompt, descriptors)
+    
+    def apply_data_flow_config(self, input_param=None, output_param=None, default_prompt=None, descriptors=None):
+        """Set the parameter, prompt and metadata placeholders (needs the basic config first)"""
+        input_param = input_param or f"{self.config['type']}_data"
+        output_param = output_param or "analysis_result"
+        default_prompt = default_prompt or f"Analyze this {self.config['data_type']} in detail."
+        descriptors = descriptors or ['data', 'content', 'information']
         
         self.config.update({
             "input_param": input_param,
             "output_param": output_param,
             "DEFAULT_PROMPT": default_prompt,
-            "METADATA_DESCRIPTORS": f"[{', '.join(descriptors)}]",
+            "METADATA_DESCRIPTORS": repr(list(descriptors)),
             "FILE_EXTENSION": self.suggest_file_extension(),
             "input_data": f"{input_param}_encoded",
             "output_var": "result",
@@ -272,6 +326,7 @@ class DragonSetup:
             "output_component": f"{output_param}_output",
             "OUTPUT_COLUMN": output_param.title(),
             "OUTPUT_TYPE": output_param.replace('_', ' ').title(),
+            "output_type": output_param.replace('_', ' '),
             "result_key": "result"
         })
     
@@ -301,10 +356,7 @@ class DragonSetup:
     
     def replace_placeholders(self, content):
         """Replace all placeholders in content with config values"""
-        for key, value in self.config.items():
-            placeholder = f"{{{{{key}}}}}"
-            content = content.replace(placeholder, str(value))
-        return content
+        return TemplateRenderer(content).render(self.config)[0]
     
     def create_dragon_file(self):
         """Create the customized dragon file"""
@@ -332,7 +384,7 @@ class DragonSetup:
         requirements = [
             "gradio>=5.42.0",
             "pandas",
-            "requests", 
+            "httpx",
             "Pillow",  # For image processing
             "pathlib"
         ]
@@ -359,10 +411,15 @@ dragon{self.config['type']}_env/
 # Log files
 *.log
 *.jsonl
+dragon{self.config['type']}_logs.db*
 
 # Data files (temporary processing)
 temp_{self.config['type']}/
 
+# Result cache and batch exports
+dragon{self.config['type']}_cache/
+dragon{self.config['type']}_batch_*.csv
+
 # Python cache
 __pycache__/
 *.py[cod]
@@ -455,6 +512,25 @@ GOOGLE_CLOUD_API_KEY=your_key
         
         print("✅ Created CLAUDE.md")
     
+    @classmethod
+    def from_spec(cls, spec, port=7860):
+        """Configure a setup non-interactively from one manifest entry (same defaults as the questions)"""
+        unknown = set(spec) - cls.MANIFEST_KEYS
+        if unknown:
+            raise ValueError(f"Unknown manifest keys: {', '.join(sorted(unknown))}")
+        if not spec.get('name'):
+            raise ValueError("Every variant needs a name")
+        
+        setup = cls()
+        setup.apply_basic_config(spec['name'], spec.get('data_type', "Data"), spec.get('description'), spec.get('emoji', "🐉"))
+        setup.apply_api_config(spec.get('default_model', "llama2"), spec.get('model_keywords'), spec.get('openai_models'))
+        setup.apply_ui_config(spec.get('color_scheme', "purple"), spec.get('port', port))
+        setup.apply_data_flow_config(spec.get('input_param'), spec.get('output_param'), spec.get('prompt'), spec.get('descriptors'))
+        setup.finalize_config()
+        # Raw placeholder values win over everything derived above
+        setup.config.update(spec.get('placeholders', {}))
+        return setup
+    
     def run_setup(self):
         """Run the complete setup process"""
         try:
@@ -493,6 +569,87 @@ GOOGLE_CLOUD_API_KEY=your_key
             print(f"\n❌ Setup failed with error: {e}")
 
 
+def render_manifest(manifest_file, output_dir=None, check=False):
+    """Render every variant of a JSON manifest from one tokenized template, compiling each; returns a report per variant"""
+    manifest_file = Path(manifest_file)
+    manifest = json.loads(manifest_file.read_text(encoding='utf-8'))
+    if isinstance(manifest, list):
+        manifest = {'variants': manifest}
+    
+    # Paths in the manifest are relative to it; the template defaults to the one next to this script
+    if 'template' in manifest:
+        template_file = manifest_file.parent / manifest['template']
+    else:
+        template_file = Path(__file__).with_name(DragonSetup().template_file)
+    output_dir = Path(output_dir) if output_dir else manifest_file.parent / manifest.get('output_dir', '.')
+    renderer = TemplateRenderer(template_file.read_text(encoding='utf-8'))
+    defaults = manifest.get('defaults', {})
+    
+    reports = []
+    seen = set()
+    for index, variant in enumerate(manifest.get('variants', [])):
+        spec = {**defaults, **variant, 'placeholders': {**defaults.get('placeholders', {}), **variant.get('placeholders', {})}}
+        report = {'variant': spec.get('name') or f"#{index + 1}", 'file': None, 'unreplaced': {}, 'error': None, 'written': False}
+        reports.append(report)
+        try:
+            setup = DragonSetup.from_spec(spec, port=7860 + index)
+        except ValueError as e:
+            report['error'] = str(e)
+            continue
+        
+        output_file = output_dir / f"dragon{setup.config['type']}_gradio.py"
+        report['file'] = str(output_file)
+        if output_file in seen:
+            report['error'] = f"Another variant already renders {output_file.name}"
+            continue
+        seen.add(output_file)
+        
+        content, report['unreplaced'] = renderer.render(setup.config)
+        try:
+            compile(content, str(output_file), 'exec')
+        except SyntaxError as e:
+            report['error'] = f"Does not compile: {e.msg} (line {e.lineno})"
+            continue
+        
+        if not check:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            output_file.write_text(content, encoding='utf-8')
+            report['written'] = True
+    return reports
+
+
+def run_manifest(manifest_file, output_dir=None, check=False):
+    """Render a manifest and print one line per variant; returns the exit status (1 if any variant has problems)"""
+    reports = render_manifest(manifest_file, output_dir, check)
+    print(f"🐉 Rendering {len(reports)} Dragon variants from {manifest_file}")
+    print("=" * 50)
+    problems = 0
+    for report in reports:
+        name = Path(report['file']).name if report['file'] else report['variant']
+        if report['error']:
+            print(f"❌ {name}: {report['error']}")
+        elif report['unreplaced']:
+            found = ', '.join(f"{{{{{key}}}}} (template line {line})" for key, line in sorted(report['unreplaced'].items()))
+            print(f"⚠️ {name}: compiles, but left unreplaced: {found}")
+        else:
+            print(f"✅ {name}: {'compiles' if check else 'written'}")
+        problems += bool(report['error'] or report['unreplaced'])
+    print("=" * 50)
+    print(f"{len(reports) - problems} of {len(reports)} variants clean")
+    return 1 if problems else 0
+
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Dragon Template Setup (interactive unless --manifest is given)")
+    parser.add_argument("--manifest", metavar="FILE",
+                        help="Render every variant in this JSON manifest non-interactively")
+    parser.add_argument("--output-dir", help="Where --manifest writes the dragon*_gradio.py files (default: the manifest's output_dir)")
+    parser.add_argument("--check", action="store_true", help="With --manifest, render and compile without writing files")
+    args = parser.parse_args()
+    
+    if args.manifest:
+        sys.exit(run_manifest(args.manifest, args.output_dir, args.check))
+    
     setup = DragonSetup()
     setup.run_setup()
\ No newline at end of file